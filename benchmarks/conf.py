@@ -0,0 +1,68 @@
+"""
+Standalone Django configuration for running the benchmarks offline against the
+sample resources in benchmarks/resources.
+
+    $ python benchmarks/list_endpoint.py
+
+"""
+import os
+import sys
+import timeit
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+for path in (BENCHMARKS_DIR, REPO_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def setup(**overrides):
+    import django
+    from django.conf import settings
+
+    if not settings.configured:
+        options = dict(
+            DEBUG=False,
+            SECRET_KEY='benchmarks',
+            ALLOWED_HOSTS=['*'],
+            ROOT_URLCONF='urls',
+            INSTALLED_APPS=['rest_framework'],
+            MIDDLEWARE_CLASSES=[],
+            DATABASES={},
+            MS_DEFAULT_LIST_LENGTH=10,
+            MS_PAGE_SIZE=10,
+            REST_FRAMEWORK={
+                'UNAUTHENTICATED_USER': None,
+                'DEFAULT_AUTHENTICATION_CLASSES': [],
+                'DEFAULT_PERMISSION_CLASSES': [],
+                'DEFAULT_METADATA_CLASS': 'jsonapi_mock_server.base_metadata.MockServerMetadata',
+            },
+        )
+        options.update(overrides)
+        settings.configure(**options)
+        django.setup()
+
+
+def autorange(timer, min_seconds=0.2):
+    """Returns the number of calls of `timer` that take at least `min_seconds`."""
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_seconds:
+            return number
+        number *= 2
+
+
+def measure(func, number=None, repeat=3):
+    """Returns the best per-call time of `func` in seconds."""
+    timer = timeit.Timer(func)
+    if number is None:
+        number = autorange(timer)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def report(name, seconds, items=None, unit="objects"):
+    line = "{:<48} {:>10.4f} ms".format(name, seconds * 1000)
+    if items:
+        line += " {:>12.0f} {}/s".format(items / seconds, unit)
+    print(line)
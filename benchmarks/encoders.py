@@ -0,0 +1,67 @@
+"""
+Compares the JSON backends available to the renderer on list, detail and include
+payloads, with resource lists encoded value by value and as pre-encoded fragments.
+
+    $ python benchmarks/encoders.py
+
+"""
+import conf
+conf.setup()
+
+from django.test import RequestFactory
+
+from jsonapi_mock_server.encoding import JSONRenderer, json_backends
+from jsonapi_mock_server.json_api_builder import (
+    JsonAPIResourceDetailBuilder, JsonAPIResourceListBuilder, JsonAPIIncludedResourceListBuilder
+)
+
+
+def build_list_payloads(request, length, config):
+    list_builder = JsonAPIResourceListBuilder(request, 'Caterer', length, length, config=config)
+    fragment_list = list_builder.build_resource_list_object()
+    plain_list = dict(fragment_list, data=list(fragment_list['data']))
+    return fragment_list, plain_list
+
+
+def build_payloads(length=500):
+    request = RequestFactory().get('/caterers')
+    config = {}
+
+    fragment_list, plain_list = build_list_payloads(request, length, config)
+    fragment_static_list, plain_static_list = build_list_payloads(request, length, {'fake': False})
+
+    detail = JsonAPIResourceDetailBuilder(request, 'Caterer', 1, config=config).build_resource_detail_object()
+
+    include_builder = JsonAPIIncludedResourceListBuilder(request, 'dishes', range(1, length + 1),
+                                                         length, length, config=config)
+    include = dict(detail, included=include_builder.build_include_list())
+
+    return [
+        ('list length={} (fragments)'.format(length), fragment_list),
+        ('list length={} (plain)'.format(length), plain_list),
+        ('list length={} fake=0 (fragments)'.format(length), fragment_static_list),
+        ('list length={} fake=0 (plain)'.format(length), plain_static_list),
+        ('detail', detail),
+        ('detail + {} included'.format(length), include),
+    ]
+
+
+def available_backends():
+    for backend_class in json_backends:
+        try:
+            yield backend_class()
+        except Exception:
+            continue
+
+
+def run():
+    payloads = build_payloads()
+    for backend in available_backends():
+        renderer = JSONRenderer(backend)
+        for name, payload in payloads:
+            seconds = conf.measure(lambda: renderer.encode(payload))
+            conf.report("{} [{}]".format(name, backend.name), seconds)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,83 @@
+"""
+Compares generating fake attributes one resource object at a time against
+generating them a column at a time, with and without NumPy, and with Faker
+providers sampled from pre-generated value pools.
+
+    $ python benchmarks/fakers.py
+
+"""
+import conf
+conf.setup()
+
+from jsonapi_mock_server import fake
+from jsonapi_mock_server.base_models import BaseResource
+from jsonapi_mock_server.fake import (
+    BooleanFaker, ChoiceFaker, IntFaker, NullableBooleanFaker, NullableIntFaker, seeded_random
+)
+
+from resources.caterer import CatererResource
+
+
+class ScalarResource(BaseResource):
+    resource_type = "Scalar"
+    fake_attributes = {
+        "count": IntFaker(0, 1000),
+        "score": NullableIntFaker(1, 5),
+        "isActive": BooleanFaker(),
+        "isOpen": NullableBooleanFaker(),
+        "cuisine": ChoiceFaker(["american", "italian", "thai", "mexican"]),
+    }
+
+
+def generate_per_object(resource, resource_ids):
+    resource_type = resource.__class__.__name__
+    return [resource.get_fake_attributes(rng=seeded_random(resource_type, resource_id, None))
+            for resource_id in resource_ids]
+
+
+def generate_columns(resource, resource_ids, use_numpy):
+    numpy = fake.numpy
+    fake.numpy = numpy if use_numpy else None
+    try:
+        fake.fake_attributes_cache.clear()
+        return resource.get_seeded_fake_attributes_list(resource_ids)
+    finally:
+        fake.numpy = numpy
+
+
+def generate_columns_pooled(resource, resource_ids):
+    fake.faker_pools.update(pools)
+    try:
+        return generate_columns(resource, resource_ids, use_numpy=fake.numpy is not None)
+    finally:
+        fake.faker_pools.clear()
+
+
+def build_pools(resource, size=1000):
+    return {faker.faker_provider: fake.FakerValuePool(faker.faker_provider, size).build()
+            for faker in resource.fake_attributes.values() if isinstance(faker, fake.StringFaker)}
+
+
+pools = build_pools(CatererResource())
+
+
+def run(lengths=(100, 1000, 10000)):
+    for resource in (ScalarResource(), CatererResource()):
+        name = resource.__class__.__name__
+        for length in lengths:
+            resource_ids = range(1, length + 1)
+            variants = [
+                ('per object', lambda: generate_per_object(resource, resource_ids)),
+                ('columns', lambda: generate_columns(resource, resource_ids, use_numpy=False)),
+            ]
+            if fake.numpy is not None:
+                variants.append(('columns numpy', lambda: generate_columns(resource, resource_ids, use_numpy=True)))
+            variants.append(('columns pooled', lambda: generate_columns_pooled(resource, resource_ids)))
+
+            for variant, func in variants:
+                seconds = conf.measure(func, number=1)
+                conf.report("{} length={} [{}]".format(name, length, variant), seconds, items=length)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,58 @@
+"""
+Compares requests/s per core of the Django application against
+jsonapi_mock_server.fast_path, calling each WSGI application in process so
+only the framework and mock server work is measured.
+
+    $ python benchmarks/fast_path.py
+
+"""
+import json
+
+import conf
+# Measure building responses, not serving them from the response cache.
+conf.setup(MS_RESPONSE_CACHE_SIZE=0)
+
+from django.core.wsgi import get_wsgi_application
+from django.test import RequestFactory
+
+from jsonapi_mock_server.fast_path import FastPathApplication
+
+
+def start_response(status, headers):
+    pass
+
+
+def run():
+    factory = RequestFactory()
+    django_application = get_wsgi_application()
+    applications = [
+        ('django', django_application),
+        ('fast path', FastPathApplication(fallback=django_application)),
+    ]
+    patch_data = json.dumps({"data": {"type": "Caterer", "id": "1", "attributes": {"name": "foo"}}})
+
+    requests = [
+        ('GET detail fake=0', lambda: factory.get('/caterers/1?fake=0')),
+        ('GET detail', lambda: factory.get('/caterers/1')),
+        ('GET list fake=0', lambda: factory.get('/caterers?fake=0')),
+        ('GET list', lambda: factory.get('/caterers')),
+        ('PATCH detail', lambda: factory.patch('/caterers/1', data=patch_data,
+                                               content_type="application/vnd.api+json")),
+        ('DELETE detail', lambda: factory.delete('/caterers/1')),
+    ]
+
+    for request_name, make_request in requests:
+        for name, application in applications:
+            # Applications consume the request body, so build a fresh environ
+            # per call outside of the measured function.
+            environ_iter = iter([make_request().environ for x in range(1500)])
+
+            def call():
+                b''.join(application(dict(next(environ_iter)), start_response))
+
+            seconds = conf.measure(call, number=500)
+            conf.report("{} [{}]".format(request_name, name), seconds, items=1, unit="requests")
+
+
+if __name__ == '__main__':
+    run()
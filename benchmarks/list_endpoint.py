@@ -0,0 +1,62 @@
+"""
+Compares list endpoint throughput with the startup-built resource registry
+against the legacy per-object importlib lookup. The response cache is disabled
+and compiled templates are dropped before every request, so each request looks
+its resources up again.
+
+    $ python benchmarks/list_endpoint.py
+
+"""
+import importlib
+
+import inflection
+
+import conf
+conf.setup(MS_RESPONSE_CACHE_SIZE=0)
+
+from django.test import Client
+
+from jsonapi_mock_server import json_api_builder
+from jsonapi_mock_server.json_api_builder import JsonAPIResourceTemplate
+from jsonapi_mock_server.registry import resource_registry
+from jsonapi_mock_server.response_cache import response_cache
+
+
+class ImportlibLookup(object):
+    """The lookup used before the registry: import and instantiate per object."""
+
+    def get(self, resource_type):
+        resource_module_str = inflection.underscore(resource_type)
+        module = importlib.import_module('resources.'+resource_module_str)
+        class_ = getattr(module, resource_type+"Resource")
+        return class_()
+
+
+def clear_caches():
+    JsonAPIResourceTemplate._templates.clear()
+    response_cache.clear()
+
+
+def run(lengths=(10, 100, 500)):
+    client = Client()
+    lookups = [('importlib', ImportlibLookup()), ('registry', resource_registry)]
+
+    for name, lookup in lookups:
+        seconds = conf.measure(lambda: lookup.get('Caterer'), number=10000)
+        conf.report("resource lookup [{}]".format(name), seconds)
+
+    for length in lengths:
+        # fake=0 keeps Faker providers from drowning out the lookup cost.
+        path = "/caterers?length={0}&page_size={0}&include=dishes&fake=0".format(length)
+        for name, lookup in lookups:
+            json_api_builder.resource_registry = lookup
+            try:
+                seconds = conf.measure(lambda: (clear_caches(), client.get(path)), number=5)
+            finally:
+                json_api_builder.resource_registry = resource_registry
+                clear_caches()
+            conf.report("list length={} [{}]".format(length, name), seconds, items=length)
+
+
+if __name__ == '__main__':
+    run()
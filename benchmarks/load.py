@@ -0,0 +1,176 @@
+"""
+Compares how many concurrent connections the WSGI path and the cooperative
+serving mode (jsonapi_mock_server/evented.py) sustain. Each server runs in its
+own process and is loaded by `--connections` clients for `--duration` seconds.
+
+The WSGI server has a fixed pool of `--workers` threads, like gunicorn with
+sync workers. Every request waits `--delay` seconds before it's handled,
+standing in for a simulated latency.
+
+    $ python benchmarks/load.py --connections 200 --delay 0.1
+
+"""
+import argparse
+import httplib
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import conf
+
+
+def delayed(application, delay):
+    def delayed_application(environ, start_response):
+        time.sleep(delay)
+        return application(environ, start_response)
+    return delayed_application
+
+
+def serve_wsgi(port, delay, workers):
+    from Queue import Queue
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+    conf.setup()
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietWSGIRequestHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    class PooledWSGIServer(WSGIServer):
+        request_queue_size = 1024
+
+        def serve_forever(self, *args, **kwargs):
+            self.requests = Queue()
+            for x in range(workers):
+                worker = threading.Thread(target=self.work)
+                worker.daemon = True
+                worker.start()
+            WSGIServer.serve_forever(self, *args, **kwargs)
+
+        def work(self):
+            while True:
+                request, client_address = self.requests.get()
+                try:
+                    self.finish_request(request, client_address)
+                except Exception:
+                    self.handle_error(request, client_address)
+                self.shutdown_request(request)
+
+        def process_request(self, request, client_address):
+            self.requests.put((request, client_address))
+
+    server = make_server('127.0.0.1', port, delayed(get_wsgi_application(), delay),
+                         server_class=PooledWSGIServer, handler_class=QuietWSGIRequestHandler)
+    server.serve_forever()
+
+
+def serve_evented(port, delay, workers):
+    from jsonapi_mock_server import evented
+    evented.patch()
+
+    conf.setup()
+
+    evented.serve('127.0.0.1', port, delayed(evented.get_application(), delay), access_log=False)
+
+
+servers = (
+    ('wsgi', serve_wsgi),
+    ('evented', serve_evented),
+)
+
+
+def get_free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            return
+        except socket.error:
+            time.sleep(0.1)
+    raise RuntimeError("Server on port {} didn't start".format(port))
+
+
+def load(port, path, connections, duration):
+    """
+    Returns the latencies of the requests made in `duration` seconds, the number
+    of failed requests and the seconds until the last request completed.
+    """
+    latencies, errors = [], [0]
+    start = time.time()
+    deadline = start + duration
+
+    def client():
+        while time.time() < deadline:
+            start = time.time()
+            try:
+                connection = httplib.HTTPConnection('127.0.0.1', port, timeout=30)
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                connection.close()
+                if response.status != 200:
+                    raise ValueError(response.status)
+            except Exception:
+                errors[0] += 1
+            else:
+                latencies.append(time.time() - start)
+
+    clients = [threading.Thread(target=client) for x in range(connections)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return latencies, errors[0], time.time() - start
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=0.1)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--path', default='/caterers?page_size=10')
+    parser.add_argument('--serve', choices=[name for name, _ in servers], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        dict(servers)[args.serve](args.port, args.delay, args.workers)
+        return
+
+    print("{} connections, {:.0f} ms delay, {} WSGI workers, {:.0f} s".format(
+        args.connections, args.delay * 1000, args.workers, args.duration))
+    for name, _ in servers:
+        port = get_free_port()
+        server = subprocess.Popen([sys.executable, __file__, '--serve', name, '--port', str(port),
+                                   '--delay', str(args.delay), '--workers', str(args.workers)])
+        try:
+            wait_for_port(port)
+            latencies, errors, elapsed = load(port, args.path, args.connections, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+
+        print("{:<10} {:>8.0f} requests/s  p50 {:>8.1f} ms  p99 {:>8.1f} ms  {} errors".format(
+            name, len(latencies) / elapsed, percentile(latencies, 0.5) * 1000,
+            percentile(latencies, 0.99) * 1000, errors))
+
+
+if __name__ == '__main__':
+    main()
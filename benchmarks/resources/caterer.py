@@ -0,0 +1,31 @@
+from jsonapi_mock_server.base_models import BaseResource
+from jsonapi_mock_server.base_views import ResourceViewSet
+from jsonapi_mock_server.fake import BooleanFaker, ChoiceFaker, IntFaker, NullableIntFaker, StringFaker
+
+
+class CatererResource(BaseResource):
+    resource_type = "Caterer"
+    attributes = {
+        "name": "Caterer name",
+        "description": "Caterer description",
+        "numberOfDrivers": 3,
+        "isActive": True,
+        "cuisine": "american",
+        "rating": None,
+    }
+    fake_attributes = {
+        "name": StringFaker("company"),
+        "description": StringFaker("catch_phrase"),
+        "numberOfDrivers": IntFaker(1, 20),
+        "isActive": BooleanFaker(),
+        "cuisine": ChoiceFaker(["american", "italian", "thai", "mexican"]),
+        "rating": NullableIntFaker(1, 5),
+    }
+    relationships = [
+        ("deliveryFees", (1, 2, 3)),
+        ("dishes", (1, 2)),
+    ]
+
+
+class CatererViewSet(CatererResource, ResourceViewSet):
+    pass
@@ -0,0 +1,20 @@
+from jsonapi_mock_server.base_models import BaseResource
+from jsonapi_mock_server.base_views import ResourceViewSet
+from jsonapi_mock_server.fake import IntFaker
+
+
+class DeliveryFeeResource(BaseResource):
+    resource_type = "DeliveryFee"
+    attributes = {
+        "amount": 500,
+    }
+    fake_attributes = {
+        "amount": IntFaker(0, 2000),
+    }
+    relationships = [
+        ("caterer", 1),
+    ]
+
+
+class DeliveryFeeViewSet(DeliveryFeeResource, ResourceViewSet):
+    pass
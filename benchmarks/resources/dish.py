@@ -0,0 +1,22 @@
+from jsonapi_mock_server.base_models import BaseResource
+from jsonapi_mock_server.base_views import ResourceViewSet
+from jsonapi_mock_server.fake import IntFaker, StringFaker
+
+
+class DishResource(BaseResource):
+    resource_type = "Dish"
+    attributes = {
+        "name": "Dish name",
+        "price": 1000,
+    }
+    fake_attributes = {
+        "name": StringFaker("name"),
+        "price": IntFaker(100, 5000),
+    }
+    relationships = [
+        ("caterer", 1),
+    ]
+
+
+class DishViewSet(DishResource, ResourceViewSet):
+    pass
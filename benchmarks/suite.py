@@ -0,0 +1,209 @@
+"""
+Micro-benchmarks of the request path: detail and list responses, nested includes,
+hook parsing, each faker and JSON encoding. Results can be saved as a JSON
+baseline and later runs compared against it, failing when any benchmark is
+slower than the baseline by more than the threshold.
+
+    $ python benchmarks/suite.py --save baseline.json
+    $ python benchmarks/suite.py --compare baseline.json --threshold 0.15
+    $ python benchmarks/suite.py --filter list --list
+
+Baselines are only comparable on the same machine and Python version.
+"""
+import argparse
+import datetime
+import json
+import platform
+import re
+import sys
+
+import conf
+# Measure building responses, not looking them up in the response and fake data caches.
+conf.setup(MS_RESPONSE_CACHE_SIZE=0, MS_FAKE_CACHE_SIZE=0)
+
+from django.core.wsgi import get_wsgi_application
+from django.test import RequestFactory
+
+from jsonapi_mock_server import fake
+from jsonapi_mock_server.encoding import get_renderer
+from jsonapi_mock_server.hooks import HookSchema, MockServerHookParser
+from jsonapi_mock_server.json_api_builder import JsonAPIResourceDetailBuilder, JsonAPIResourceListBuilder
+
+from resources.caterer import CatererResource
+
+FORMAT_VERSION = 1
+
+benchmarks = []
+
+
+def benchmark(name, items=1, number=None):
+    """Registers `func` as the benchmark `name`, which processes `items` per call."""
+    def register(func):
+        benchmarks.append((name, func, items, number))
+        return func
+    return register
+
+
+def start_response(status, headers):
+    pass
+
+
+factory = RequestFactory()
+application = get_wsgi_application()
+
+
+def register_request(name, path, items=1, number=None, **headers):
+    environ = factory.get(path, **headers).environ
+
+    @benchmark(name, items, number)
+    def request():
+        b''.join(application(dict(environ), start_response))
+
+
+register_request('detail', '/caterers/1')
+register_request('detail fake=0', '/caterers/1?fake=0')
+for length in (10, 100, 1000):
+    register_request('list length={}'.format(length), '/caterers?length={0}&page_size={0}'.format(length),
+                     items=length)
+register_request('list length=1000 stream', '/caterers?length=1000&page_size=1000&stream=1', items=1000)
+register_request('detail include (nested)',
+                 '/caterers/1?include=dishes.caterer,deliveryFees')
+register_request('list length=100 include (nested)',
+                 '/caterers?length=100&page_size=100&include=dishes.caterer,deliveryFees', items=100)
+register_request('detail fields[caterers]=name', '/caterers/1?fields[caterers]=name')
+
+
+hook_request = factory.get('/caterers/1?length=20&name=abc&numberOfDrivers=10&errors=name,description&seed=3',
+                           HTTP_MS_FAKE='1', HTTP_MS_ATTRIBUTES='description=foo')
+
+
+@benchmark('hooks parse')
+def parse_hooks():
+    schema = HookSchema(CatererResource.attributes)
+    headers = schema.parse_headers(hook_request.META)
+    headers.update(schema.parse_query(hook_request.GET))
+
+
+@benchmark('hooks memoized')
+def parse_hooks_memoized():
+    MockServerHookParser(hook_request, CatererResource.attributes).parse_hooks()
+
+
+def register_faker(name, faker, length=1000):
+    seeds = fake.row_seeds(fake.stable_hash('benchmarks', name), fake.row_counters(range(1, length + 1)))
+
+    @benchmark('faker {} x{}'.format(name, length), items=length)
+    def generate():
+        faker.generate_values(seeds)
+
+
+register_faker('IntFaker', fake.IntFaker(0, 1000))
+register_faker('NullableIntFaker', fake.NullableIntFaker(0, 1000))
+register_faker('BooleanFaker', fake.BooleanFaker())
+register_faker('NullableBooleanFaker', fake.NullableBooleanFaker())
+register_faker('ChoiceFaker', fake.ChoiceFaker(["american", "italian", "thai", "mexican"]))
+register_faker('StringFaker', fake.StringFaker("company"), length=100)
+
+
+def register_encoding(name, payload, items=1):
+    @benchmark('encode {}'.format(name), items=items)
+    def encode():
+        get_renderer().encode(payload)
+
+
+builder_request = factory.get('/caterers')
+register_encoding('detail', JsonAPIResourceDetailBuilder(builder_request, 'Caterer', 1).build_resource_detail_object())
+list_payload = JsonAPIResourceListBuilder(builder_request, 'Caterer', 1000, 1000).build_resource_list_object()
+register_encoding('list length=1000', list_payload, items=1000)
+register_encoding('list length=1000 (plain)', dict(list_payload, data=list(list_payload['data'])), items=1000)
+
+
+def run(pattern=None, repeat=5):
+    """Returns {name: {"seconds": per call, "items": per call}} for the benchmarks matching `pattern`."""
+    results = {}
+    for name, func, items, number in benchmarks:
+        if pattern and not re.search(pattern, name):
+            continue
+        seconds = conf.measure(func, number=number, repeat=repeat)
+        conf.report(name, seconds, items=items if items > 1 else None)
+        results[name] = {"seconds": seconds, "items": items}
+    return results
+
+
+def save(path, results):
+    with open(path, 'w') as f:
+        json.dump({
+            "version": FORMAT_VERSION,
+            "created": datetime.datetime.utcnow().isoformat() + 'Z',
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "results": results,
+        }, f, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get("version") != FORMAT_VERSION:
+        raise ValueError("{} is not a version {} baseline".format(path, FORMAT_VERSION))
+    return baseline
+
+
+def compare(baseline, results, threshold):
+    """
+    Prints each benchmark's time relative to `baseline` and returns the names of
+    the ones slower by more than `threshold` (e.g. 0.15 for 15%).
+    """
+    regressions = []
+    print("\n{:<56} {:>10} {:>10} {:>8}".format("benchmark", "baseline", "current", "change"))
+    for name in sorted(results):
+        seconds = results[name]["seconds"]
+        if name not in baseline["results"]:
+            print("{:<56} {:>10} {:>9.4f}ms {:>8}".format(name, "-", seconds * 1000, "new"))
+            continue
+
+        baseline_seconds = baseline["results"][name]["seconds"]
+        change = seconds / baseline_seconds - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("{:<56} {:>8.4f}ms {:>8.4f}ms {:>+7.1%}{}".format(
+            name, baseline_seconds * 1000, seconds * 1000, change, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs the mock server micro-benchmarks.")
+    parser.add_argument('--filter', help="only run benchmarks whose name matches this regular expression")
+    parser.add_argument('--list', action='store_true', help="list the benchmarks instead of running them")
+    parser.add_argument('--save', metavar='PATH', help="save the results as a JSON baseline")
+    parser.add_argument('--compare', metavar='PATH', help="compare the results against a saved baseline")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="slowdown over the baseline reported as a regression (default 0.15, i.e. 15%%)")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="timings per benchmark, of which the best is kept (default 5); raise it on noisy machines")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, _, _, _ in benchmarks:
+            if not args.filter or re.search(args.filter, name):
+                print(name)
+        return 0
+
+    baseline = load(args.compare) if args.compare else None
+    results = run(args.filter, args.repeat)
+    if args.save:
+        save(args.save, results)
+
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print("\n{} regression(s) over {:.0%}: {}".format(len(regressions), args.threshold,
+                                                              ', '.join(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,12 @@
+from rest_framework import routers
+
+from resources.caterer import CatererViewSet
+from resources.delivery_fee import DeliveryFeeViewSet
+from resources.dish import DishViewSet
+
+router = routers.SimpleRouter(trailing_slash=False)
+router.register(r'caterers', CatererViewSet, base_name='caterer')
+router.register(r'delivery_fees', DeliveryFeeViewSet, base_name='delivery-fee')
+router.register(r'dishes', DishViewSet, base_name='dish')
+
+urlpatterns = router.urls
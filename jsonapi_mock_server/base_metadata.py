@@ -1,4 +1,5 @@
 from collections import OrderedDict
+import threading
 
 from rest_framework.metadata import SimpleMetadata
 
@@ -20,3 +21,32 @@ class MockServerMetadata(SimpleMetadata):
         actions['PUT'] = action_data
 
         return actions
+
+
+_options_documents = {}
+_options_documents_lock = threading.Lock()
+
+
+def get_options_document(view):
+    """
+    Returns the (content, content type) of the OPTIONS response of `view`, rendered
+    with its default renderer. Metadata only depends on the viewset class and on
+    whether it serves the list or the detail route, so each document is built
+    once and kept as bytes.
+    """
+    key = (view.__class__, getattr(view, 'suffix', None))
+    try:
+        return _options_documents[key]
+    except KeyError:
+        pass
+
+    with _options_documents_lock:
+        if key not in _options_documents:
+            metadata = view.metadata_class().determine_metadata(None, view)
+            renderer = view.renderer_classes[0]()
+            content = renderer.render(metadata, renderer.media_type, {'view': view})
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = '{}; charset={}'.format(content_type, renderer.charset)
+            _options_documents[key] = (content, content_type)
+        return _options_documents[key]
@@ -2,9 +2,11 @@ from collections import OrderedDict
 import copy
 import inflection
 import os
+import random
 
 from django.conf import settings
-from utils import upper_camelize_resource
+from fake import call_generate_value, fake_attributes_cache, row_counters, row_seeds, stable_hash
+from utils import FrozenDict, upper_camelize_resource
 
 
 class BaseResource(object):
@@ -18,6 +20,11 @@ class BaseResource(object):
     # a particular JsonAPI resource object.
     json_api_rules = []
     relationships = []
+    # Default latency, bandwidth and error_rate hooks for this resource's responses,
+    # e.g. {'latency': 'lognormal:50,400', 'bandwidth': 100000, 'error_rate': 0.01}.
+    shaping = {}
+    # Attributes whose values are indexed to filter lists in stateful mode (see store.py).
+    indexes = ()
     page_size = settings.MS_PAGE_SIZE if hasattr(settings, 'MS_PAGE_SIZE') else 10
 
     type_lookup = {
@@ -34,15 +41,81 @@ class BaseResource(object):
         str: "ManyToOne",
     }
 
+    # Definition attributes frozen by `freeze`.
+    mapping_attributes = ('attributes', 'fake_attributes', 'attribute_metadata', 'relationship_metadata', 'shaping')
+    sequence_attributes = ('json_api_rules', 'relationships', 'indexes')
+    _frozen = False
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError("{} is read-only".format(self.__class__.__name__))
+        object.__setattr__(self, name, value)
+
+    def freeze(self):
+        """
+        Makes this instance a read-only resource descriptor: its attributes can't be
+        set, and its definition mappings and lists can't be changed. Returns self.
+        """
+        for name in self.mapping_attributes:
+            object.__setattr__(self, name, FrozenDict(getattr(self, name)))
+        for name in self.sequence_attributes:
+            object.__setattr__(self, name, tuple(getattr(self, name)))
+        object.__setattr__(self, '_frozen', True)
+        return self
+
     def get_attributes(self):
         return copy.deepcopy(self.attributes)
 
-    def get_fake_attributes(self):
+    def get_fake_attributes(self, rng=random):
         fake_attributes = {}
-        for attribute, fake in self.fake_attributes.iteritems():
-            fake_attributes[attribute] = fake.generate_value()
+        for attribute in sorted(self.fake_attributes):
+            fake_attributes[attribute] = call_generate_value(self.fake_attributes[attribute].generate_value, rng)
         return fake_attributes
 
+    def get_seeded_fake_attributes(self, resource_id, seed=None, attributes=None):
+        return self.get_seeded_fake_attributes_list([resource_id], seed, attributes)[0]
+
+    def get_seeded_fake_attributes_list(self, resource_ids, seed=None, attributes=None):
+        """
+        Returns the fake attributes of each resource id, generated from seeds derived
+        from this resource's type, the resource id and `seed`, so the same resource
+        object always gets the same data. Attributes of ids missing from the LRU cache
+        are generated a column at a time. Only the fake attributes named in
+        `attributes` are generated, if given.
+        """
+        resource_type = self.__class__.__name__
+        if attributes is None:
+            attribute_names = sorted(self.fake_attributes)
+            keys = [(resource_type, str(resource_id), seed) for resource_id in resource_ids]
+        else:
+            attribute_names = sorted(attribute for attribute in attributes if attribute in self.fake_attributes)
+            subset = tuple(attribute_names)
+            keys = [(resource_type, str(resource_id), seed, subset) for resource_id in resource_ids]
+        fake_attributes_list = fake_attributes_cache.get_many(keys)
+
+        missing = [x for x, fake_attributes in enumerate(fake_attributes_list) if fake_attributes is None]
+        if missing:
+            counters = row_counters([resource_ids[x] for x in missing])
+            columns = [
+                self.fake_attributes[attribute].generate_values(
+                    row_seeds(stable_hash(resource_type, attribute, seed), counters))
+                for attribute in attribute_names
+            ]
+            rows = zip(*columns) if columns else [()] * len(missing)
+            for x, row in zip(missing, rows):
+                fake_attributes_list[x] = dict(zip(attribute_names, row))
+            fake_attributes_cache.update((keys[x], fake_attributes_list[x]) for x in missing)
+
+        return [dict(fake_attributes) for fake_attributes in fake_attributes_list]
+
+    def get_seeded_fake_attribute_values(self, attribute, resource_ids, seed=None):
+        """
+        Returns the values of the fake `attribute` of each resource id, the same as
+        get_seeded_fake_attributes_list's, without going through the LRU cache.
+        """
+        column_seed = stable_hash(self.__class__.__name__, attribute, seed)
+        return list(self.fake_attributes[attribute].generate_values(row_seeds(column_seed, row_counters(resource_ids))))
+
     def get_field_label(self, attribute):
         return inflection.titleize(attribute)
 
@@ -1,7 +1,7 @@
+import hashlib
 import json
 import os
 import pprint
-import requests
 from simplejson.decoder import JSONDecodeError
 import unittest
 
@@ -13,22 +13,82 @@ from jsondiff import diff
 import inflection
 
 from jsonapi_mock_server.base_views import ResourceDetailViewSet, ResourceListViewSet
-
-
-def simplify_json(obj):
-    for key, value in obj.iteritems():
-        is_resource_list = (key == 'data' and type(value) is list and len(value) > 1)
-
-        if type(value) is dict:
-            simplify_json(value)
-        elif is_resource_list:
-            # normalize master/mock resource list lengths to 1 resource object for comparison
-            obj[key] = value[0:1]
-            simplify_json(obj[key][0])
-        else:
-            obj[key] = ''
-
-    return obj
+from jsonapi_mock_server.master import get_master_client
+from jsonapi_mock_server.snapshots import get_definition_hash, get_snapshot_mode, get_snapshot_store
+
+
+# Lists of resource objects, whose structure is the union of their items'.
+RESOURCE_LISTS = ('data', 'included')
+
+JSON_TYPES = {
+    type(None): 'null',
+    bool: 'boolean',
+    int: 'number',
+    long: 'number',
+    float: 'number',
+    str: 'string',
+    unicode: 'string',
+    list: 'array',
+}
+
+
+def get_shape(obj, key=None):
+    """
+    Returns the structure of a JSON document as nested tuples: the sorted keys of
+    objects, and the union of the structures of all the items of resource lists
+    (`data`, `included`). Other values, lists included, are their JSON type.
+    """
+    obj_type = type(obj)
+    if obj_type is dict:
+        shape = []
+        for member, value in obj.iteritems():
+            value_type = type(value)
+            if value_type is dict or (value_type is list and member in RESOURCE_LISTS):
+                shape.append((member, get_shape(value, member)))
+            else:
+                shape.append((member, JSON_TYPES[value_type]))
+        shape.sort()
+        return tuple(shape)
+    if obj_type is list and key in RESOURCE_LISTS:
+        return ('[]',) + tuple(sorted(set([get_shape(item) for item in obj])))
+    return JSON_TYPES[obj_type]
+
+
+def shapes_match(shape, other):
+    """
+    Returns whether two shapes returned by `get_shape` match. Null matches any type,
+    as fake attributes can be null where the master has a value.
+    """
+    if shape == other or shape == 'null' or other == 'null':
+        return True
+    if type(shape) is not tuple or type(other) is not tuple:
+        return False
+    if shape[:1] == ('[]',) or other[:1] == ('[]',):
+        if shape[:1] != other[:1]:
+            return False
+        return (all(any(shapes_match(item, other_item) for other_item in other[1:]) for item in shape[1:]) and
+                all(any(shapes_match(item, other_item) for item in shape[1:]) for other_item in other[1:]))
+    if len(shape) != len(other):
+        return False
+    return all(member == other_member and shapes_match(value, other_value)
+               for (member, value), (other_member, other_value) in zip(shape, other))
+
+
+def get_structure_fingerprint(obj):
+    """Returns a hash of the structure of a JSON document (see `get_shape`)."""
+    return hashlib.sha1(json.dumps(get_shape(obj))).hexdigest()
+
+
+def get_structure(obj, key=None):
+    """Returns the structure of a JSON document for diffing, with each distinct resource list item structure once."""
+    if type(obj) is dict:
+        return dict((member, get_structure(value, member)) for member, value in obj.iteritems())
+    if type(obj) is list and key in RESOURCE_LISTS:
+        structures = {}
+        for item in obj:
+            structures.setdefault(get_shape(item), item)
+        return [get_structure(structures[shape]) for shape in sorted(structures)]
+    return JSON_TYPES[type(obj)]
 
 
 class MockServerBaseTestCase(unittest.TestCase):
@@ -56,18 +116,122 @@ class TestJsonResponses(MockServerBaseTestCase):
         except Exception, e:
             raise Exception("Unable to obtain auth token: {}".format(e))
 
+        if get_snapshot_mode() != 'offline':
+            cls.master_client = get_master_client(cls.master_token)
+            cls.prefetch_master_responses()
+
+    @classmethod
+    def get_contract_test_classes(cls):
+        """Returns every loaded subclass of TestJsonResponses that tests a viewset."""
+        test_classes, subclasses = [], TestJsonResponses.__subclasses__()
+        while subclasses:
+            test_class = subclasses.pop()
+            subclasses.extend(test_class.__subclasses__())
+            if getattr(test_class, 'viewset', None) is not None:
+                test_classes.append(test_class)
+        return test_classes
+
+    @classmethod
+    def prefetch_master_responses(cls):
+        """
+        Fetches the master responses the detail and list tests of every viewset
+        compare against, concurrently, before any of them runs. Detail views the
+        master doesn't have resource 1 for are fetched again with the first
+        resource id of its list. Checks skipped in incremental mode aren't fetched.
+        """
+        tests = [test_class('test_faker') for test_class in cls.get_contract_test_classes()
+                 if test_class.auth_token == cls.auth_token]
+        detail_tests = [test for test in tests if issubclass(test.viewset, ResourceDetailViewSet) and
+                        test.needs_master_check(test.get_master_url(test.get_detail_path()))]
+        list_tests = [test for test in tests if issubclass(test.viewset, ResourceListViewSet) and
+                      test.needs_master_check(test.get_master_url(test.get_list_path()))]
+        urls = [test.get_master_url(test.get_detail_path()) for test in detail_tests]
+        urls.extend(test.get_master_url(test.get_list_path()) for test in list_tests)
+        cls.master_client.prefetch(urls)
+
+        fallback_urls = []
+        for test in detail_tests:
+            try:
+                if cls.master_client.get(test.get_master_url(test.get_detail_path())).status_code == 404:
+                    master_json = cls.master_client.get(test.get_master_url(test.get_list_path())).json()
+                    fallback_urls.append(test.get_master_url(test.get_detail_path(master_json['data'][0]['id'])))
+            except Exception:
+                continue
+        cls.master_client.prefetch(fallback_urls)
+
+    def get_master_url(self, path):
+        return "{}{}".format(self.master_origin, path)
+
+    @property
+    def snapshot_mode(self):
+        return get_snapshot_mode()
+
+    @property
+    def snapshot_store(self):
+        return get_snapshot_store() if self.snapshot_mode else None
+
+    @property
+    def definition_hash(self):
+        return get_definition_hash(self.viewset)
+
+    def needs_master_check(self, check):
+        """
+        Returns whether the check of the master response to the `check` URL has to
+        run: in incremental mode, checks that last passed against the master with
+        the same resource definition are skipped.
+        """
+        return not (self.snapshot_mode == 'incremental' and
+                    self.snapshot_store.is_unchanged(check, self.definition_hash))
+
+    def skip_unchanged_check(self, check):
+        if not self.needs_master_check(check):
+            self.skipTest("{} unchanged since its last passing check of {}".format(self.viewset.resource_type,
+                                                                                    check))
+
+    def get_master(self, url):
+        """
+        Returns the master response to `url`, recording it in the snapshot store if
+        enabled. In offline mode, it's read from the store instead.
+        """
+        if self.snapshot_mode == 'offline':
+            response = self.snapshot_store.get(url)
+            if response is None:
+                self.skipTest("No snapshot of {}, run with MS_SNAPSHOT_MODE = 'record' first".format(url))
+            return response
+
+        response = self.master_client.get(url)
+        if self.snapshot_mode:
+            self.snapshot_store.record(url, response, self.definition_hash)
+        return response
+
+    def assertMasterStructureEqual(self, check, master_json, mock_json):
+        """Compares structures like assertJsonStructureEqual, recording the outcome of `check` in the snapshot store."""
+        if self.snapshot_mode not in ('record', 'incremental'):
+            return self.assertJsonStructureEqual(master_json, mock_json)
+
+        try:
+            self.assertJsonStructureEqual(master_json, mock_json)
+        except AssertionError:
+            self.snapshot_store.record_check(check, self.definition_hash, False)
+            raise
+        self.snapshot_store.record_check(check, self.definition_hash, True)
+
     def assertJsonStructureEqual(self, master_json, mock_json):
-        master_json_simple = simplify_json(master_json)
-        mock_json_simple = simplify_json(mock_json)
-        d = diff(master_json_simple, mock_json_simple)
+        if get_structure_fingerprint(master_json) == get_structure_fingerprint(mock_json):
+            return
+        if shapes_match(get_shape(master_json), get_shape(mock_json)):
+            return
+
+        master_structure = get_structure(master_json)
+        mock_structure = get_structure(mock_json)
         error_msg = [
             "master url:\n{}".format(self.master_url),
-            "master response:\n{}\n".format(pprint.pformat(master_json_simple)),
+            "master response:\n{}\n".format(pprint.pformat(master_structure)),
             "mock url:\n{}".format(self.path),
-            "mock response:\n{}\n".format(pprint.pformat(mock_json_simple)),
-            "diff:\n{}".format(pprint.pformat(d))
+            "mock response:\n{}\n".format(pprint.pformat(mock_structure)),
+            "diff:\n{}".format(pprint.pformat(diff(master_structure, mock_structure)))
         ]
-        self.assertEqual(d, {}, '\n'.join(error_msg))
+        self.fail('\n'.join(error_msg))
 
     def get_mock_response(self, url):
         try:
@@ -80,8 +244,7 @@ class TestJsonResponses(MockServerBaseTestCase):
 
     def get_master_response(self, url):
         try:
-            master_headers = {"Authorization": "Token %s" % self.master_token}
-            master_response = requests.get(url, headers=master_headers)
+            master_response = self.get_master(url)
             master_json = master_response.json()
         except JSONDecodeError, e:
             self.fail("Unable to parse JSON response from master server response:\n{}, {}\n {}"
@@ -89,10 +252,8 @@ class TestJsonResponses(MockServerBaseTestCase):
         return master_response, master_json
 
     def get_master_resource_id(self):
-        master_list_url = "{}{}".format(self.master_origin, self.get_list_path())
-        master_headers = {"Authorization": "Token %s" % self.master_token}
-        master_response = requests.get(master_list_url, headers=master_headers)
-        master_json = master_response.json()
+        master_list_url = self.get_master_url(self.get_list_path())
+        master_json = self.get_master(master_list_url).json()
         resource_id = master_json['data'][0]['id']
         return resource_id
 
@@ -109,15 +270,17 @@ class TestJsonResponses(MockServerBaseTestCase):
     def _test_view(self):
         mock_json = self.get_mock_response(self.path)
         self.master_url = "{}{}".format(self.master_origin, self.path)
+        self.skip_unchanged_check(self.master_url)
         master_response, master_json = self.get_master_response(self.master_url)
-        self.assertJsonStructureEqual(master_json, mock_json)
+        self.assertMasterStructureEqual(self.master_url, master_json, mock_json)
 
     def test_detail_view(self, path=None):
         if not issubclass(self.viewset, ResourceDetailViewSet):
             self.skipTest("No detail view defined for for {}".format(self.viewset.resource_type))
 
         self.path = path if path else self.get_detail_path()
-        self.master_url = "{}{}".format(self.master_origin, self.path)
+        self.master_url = check = "{}{}".format(self.master_origin, self.path)
+        self.skip_unchanged_check(check)
 
         mock_json = self.get_mock_response(self.path)
         master_response, master_json = self.get_master_response(self.master_url)
@@ -131,7 +294,7 @@ class TestJsonResponses(MockServerBaseTestCase):
             except:
                 pass
 
-        self.assertJsonStructureEqual(master_json, mock_json)
+        self.assertMasterStructureEqual(check, master_json, mock_json)
 
     def test_list_view(self, path=None):
         if not issubclass(self.viewset, ResourceListViewSet):
@@ -139,10 +302,11 @@ class TestJsonResponses(MockServerBaseTestCase):
 
         self.path = path if path else self.get_list_path()
         self.master_url = "{}{}".format(self.master_origin, self.path)
+        self.skip_unchanged_check(self.master_url)
 
         mock_json = self.get_mock_response(self.path)
         master_response, master_json = self.get_master_response(self.master_url)
-        self.assertJsonStructureEqual(master_json, mock_json)
+        self.assertMasterStructureEqual(self.master_url, master_json, mock_json)
 
     def test_faker(self, path=None):
         faker_qs = "?faker=1"
@@ -2,83 +2,106 @@ import json
 import re
 
 from django.conf import settings
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.generic import View
-from inflection import camelize, pluralize, singularize
+from inflection import pluralize, singularize
 from rest_framework import viewsets
 
+from base_metadata import get_options_document
+from encoding import dumps, get_renderer
 from hooks import MockServerHookParser
+from includes import include_resolver
 from json_api_builder import (
-    JsonAPIErrorBuilder, JsonAPIResourceDetailBuilder, JsonAPIResourceListBuilder,
-    JsonAPIIncludedResourceListBuilder
+    JsonAPIErrorBuilder, JsonAPIResourceDetailBuilder, JsonAPIResourceListBuilder, ResourceListFragment
 )
+from metrics import count_objects, record_action
+from response_cache import cache_response
+from shaping import shape_response
+from store import get_namespace
+from timing import phase, time_action
+from utils import cooperative_yield
 
 
-class MockServerBaseViewSet(viewsets.ViewSet):
-    def request_contains_include(self, request):
-        return 'include' in request.GET.keys()
+class JsonAPIResponse(HttpResponse):
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', "application/vnd.api+json")
+        with phase('encode'):
+            content = dumps(data)
+        super(JsonAPIResponse, self).__init__(content=content, **kwargs)
 
-    def _get_include_ids_from_rel_data(self, rel_data):
-        if isinstance(rel_data, list):
-            include_ids = [rd['id'] for rd in rel_data]
-        else:
-            include_ids = [rel_data['id']]
-        return include_ids
-
-    def get_include_ids_from_response(self, response, include_type):
-        if isinstance(response['data'], list):
-            include_ids = []
-            for obj in response['data']:
-                rel_data = obj['relationships'][include_type]['data']
-                include_ids.extend(self._get_include_ids_from_rel_data(rel_data))
-        else:
-            rel_data = response['data']['relationships'][include_type]['data']
-            include_ids = self._get_include_ids_from_rel_data(rel_data)
-
-        return set(include_ids)
-
-    def get_include_ids_from_included(self, included, include_type):
-        include_ids = []
-        for include_object in included:
-            try:
-                rel_data = include_object['relationships'][include_type]['data']
-            except:
-                pass
-            else:
-                include_ids.extend(self._get_include_ids_from_rel_data(rel_data))
-                break
 
-        return set(include_ids)
+class JsonAPIStreamingResponse(StreamingHttpResponse):
+    def __init__(self, streaming_content, **kwargs):
+        kwargs.setdefault('content_type', "application/vnd.api+json")
+        super(JsonAPIStreamingResponse, self).__init__(streaming_content=streaming_content, **kwargs)
+
 
-    def add_include_objects(self, request, response, length=10, overrides=None):
-        include_groups = [group.split('.') for group in request.GET.get('include').split(',')]
+class MockServerBaseViewSet(viewsets.ViewSet):
+    @property
+    def default_response_headers(self):
+        headers = super(MockServerBaseViewSet, self).default_response_headers
+        # Responses are compressed according to Accept-Encoding (see compression.py).
+        headers['Vary'] = ', '.join(filter(None, [headers.get('Vary'), 'Accept-Encoding']))
+        return headers
 
-        for include_group in include_groups:
-            for x, include_type in enumerate(include_group):
-                resource_type = camelize(include_type, uppercase_first_letter=False)
+    def options(self, request, *args, **kwargs):
+        """Returns the OPTIONS document built once per view (see base_metadata.py)."""
+        if self.metadata_class is None:
+            return self.http_method_not_allowed(request, *args, **kwargs)
 
-                if x == 0:
-                    include_ids = self.get_include_ids_from_response(response, resource_type)
-                else:
-                    include_ids = self.get_include_ids_from_included(response['included'], resource_type)
+        content, content_type = get_options_document(self)
+        return HttpResponse(content, content_type=content_type)
 
+    def request_contains_include(self, request):
+        return 'include' in request.GET.keys()
 
-                json_api_builder = JsonAPIIncludedResourceListBuilder(request,
-                                                                      include_type,
-                                                                      include_ids,
-                                                                      self.page_size,
-                                                                      length,
-                                                                      config=overrides)
-                include_objects = json_api_builder.build_include_list()
-                if include_objects:
-                    response.setdefault("included", []).extend(include_objects)
+    def add_include_objects(self, request, response, length=10, overrides=None, namespace=None):
+        with phase('include'):
+            included = include_resolver.resolve(request, self.resource_type, response['data'],
+                                                request.GET.get('include'), config=overrides,
+                                                page_size=self.page_size, length=length, namespace=namespace)
+        count_objects(request, len(included))
+        if included:
+            response.setdefault("included", []).extend(included)
 
         return response
 
+    def parse_resource_object(self, request):
+        """Returns the (id, attributes, relationships) of the resource object in the body of `request`, or None."""
+        try:
+            data = json.loads(request.body)['data']
+            attributes = dict(data.get('attributes', {}))
+            relationships = {}
+            for relationship, relationship_object in data.get('relationships', {}).iteritems():
+                relationship_data = relationship_object['data']
+                if type(relationship_data) == list:
+                    relationships[relationship] = [rd['id'] for rd in relationship_data]
+                else:
+                    relationships[relationship] = relationship_data['id'] if relationship_data else None
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+        return data.get('id'), attributes, relationships
+
+    def build_stored_response(self, request, namespace, resource_id, overrides, status=200):
+        """Returns the response with the stored resource object `resource_id`, or a 404 if it doesn't exist."""
+        resource_objects = namespace.get(self.resource_type).build_objects(request, [resource_id], overrides)
+        if not resource_objects:
+            return JsonAPIResponse(JsonAPIErrorBuilder(request).build_404_error_object(), status=404)
+        count_objects(request, 1)
+
+        response = {"data": resource_objects[0]}
+        if self.request_contains_include(request):
+            response = self.add_include_objects(request, response, overrides=overrides, namespace=namespace)
+        return JsonAPIResponse(response, status=status)
+
 
 class ResourceDetailViewSet(MockServerBaseViewSet):
     allowed_methods = ['GET', 'PATCH', 'DELETE', 'OPTIONS']
 
+    @record_action
+    @time_action
+    @shape_response
+    @cache_response
     def retrieve(self, request, pk):
         resource_id = pk
         overrides = MockServerHookParser(request, self.attributes).parse_hooks()
@@ -86,18 +109,25 @@ class ResourceDetailViewSet(MockServerBaseViewSet):
         if 'status' in overrides:
             return HttpResponse(status=overrides['status'])
 
-        self.attributes.update(overrides.get('attributes', {}))
+        namespace = get_namespace(overrides)
+        if namespace is not None:
+            return self.build_stored_response(request, namespace, resource_id, overrides)
+
         json_api_builder = JsonAPIResourceDetailBuilder(request,
                                                         resource_type=self.resource_type,
                                                         resource_id=resource_id,
                                                         config=overrides)
         response = json_api_builder.build_resource_detail_object()
+        count_objects(request, 1)
 
         if self.request_contains_include(request):
             response = self.add_include_objects(request, response, overrides=overrides)
 
-        return JsonResponse(response, status=200, content_type="application/vnd.api+json")
+        return JsonAPIResponse(response, status=200)
 
+    @record_action
+    @time_action
+    @shape_response
     def partial_update(self, request, pk):
         resource_id = pk
         overrides = MockServerHookParser(request, self.attributes).parse_hooks()
@@ -105,22 +135,37 @@ class ResourceDetailViewSet(MockServerBaseViewSet):
         if 'status' in overrides:
             return HttpResponse(status=overrides['status'])
 
+        namespace = get_namespace(overrides)
+        if namespace is not None:
+            resource_object = self.parse_resource_object(request)
+            if resource_object is None:
+                response = JsonAPIErrorBuilder(request).build_error_list_object(self.attributes)
+                return JsonAPIResponse(response, status=400)
+            _, attributes, relationships = resource_object
+            namespace.get(self.resource_type).update(resource_id, attributes, relationships)
+            return self.build_stored_response(request, namespace, resource_id, overrides)
+
         try:
             request_data = json.loads(request.body)
             if 'attributes' in request_data.get('data', {}):
-                overrides['attributes'].update(request_data['data']['attributes'])
+                attributes = dict(overrides.get('attributes', {}))
+                attributes.update(request_data['data']['attributes'])
+                overrides = overrides.replace(attributes=attributes)
         except:
             pass
 
-        self.attributes.update(overrides.get('attributes', {}))
         json_api_builder = JsonAPIResourceDetailBuilder(request,
                                                         resource_type=self.resource_type,
                                                         resource_id=resource_id,
                                                         config=overrides)
         response = json_api_builder.build_resource_detail_object()
+        count_objects(request, 1)
 
-        return JsonResponse(response, status=200, content_type="application/vnd.api+json")
+        return JsonAPIResponse(response, status=200)
 
+    @record_action
+    @time_action
+    @shape_response
     def destroy(self, request, pk):
         resource_id = pk
         overrides = MockServerHookParser(request, self.attributes).parse_hooks()
@@ -128,12 +173,20 @@ class ResourceDetailViewSet(MockServerBaseViewSet):
         if 'status' in overrides:
             return HttpResponse(status=overrides['status'])
 
+        namespace = get_namespace(overrides)
+        if namespace is not None and not namespace.get(self.resource_type).delete(resource_id):
+            return JsonAPIResponse(JsonAPIErrorBuilder(request).build_404_error_object(), status=404)
+
         return HttpResponse(status=204)
 
 
 class ResourceListViewSet(MockServerBaseViewSet):
     allowed_methods = ['GET', 'POST', 'OPTIONS']
 
+    @record_action
+    @time_action
+    @shape_response
+    @cache_response
     def list(self, request):
         overrides = MockServerHookParser(request, self.attributes).parse_hooks()
 
@@ -142,9 +195,14 @@ class ResourceListViewSet(MockServerBaseViewSet):
 
         curr_page = int(request.GET.get('page', 1))
         page_size = int(request.GET.get('page_size', self.page_size))
+        cursor = request.GET.get('page[cursor]')
 
         filter_configs = self._parse_filters_from_query_parameters(request)
-        overrides['filter'] = filter_configs
+        overrides = overrides.replace(filter=filter_configs)
+
+        namespace = get_namespace(overrides)
+        if namespace is not None:
+            return self.list_stored(request, namespace, overrides, curr_page, page_size, cursor)
 
         length = overrides['length'] if 'length' in overrides else settings.MS_DEFAULT_LIST_LENGTH
         if len(overrides['filter']):
@@ -158,14 +216,98 @@ class ResourceListViewSet(MockServerBaseViewSet):
                                                       page_size,
                                                       length,
                                                       config=overrides,
-                                                      curr_page=curr_page)
+                                                      curr_page=curr_page,
+                                                      cursor=cursor)
+
+        count_objects(request, len(json_api_builder.resource_ids))
+
+        if self.should_stream_response(json_api_builder, overrides):
+            streaming_content = self.stream_resource_list_object(request, json_api_builder, overrides)
+            return JsonAPIStreamingResponse(streaming_content, status=200)
+
         response = json_api_builder.build_resource_list_object()
 
         if self.request_contains_include(request):
             response = self.add_include_objects(request, response, overrides=overrides)
 
-        return JsonResponse(response, status=200, content_type="application/vnd.api+json")
+        return JsonAPIResponse(response, status=200)
+
+    def list_stored(self, request, namespace, overrides, curr_page, page_size, cursor):
+        """Returns the page of the stored resource objects matching the filters, whose length is the collection's."""
+        collection = namespace.get(self.resource_type)
+        resource_ids = collection.filter_ids(overrides['filter'], overrides) if overrides['filter'] else None
+        length = len(collection) if resource_ids is None else len(resource_ids)
 
+        json_api_builder = JsonAPIResourceListBuilder(request,
+                                                      self.resource_type,
+                                                      page_size,
+                                                      length,
+                                                      config=overrides,
+                                                      curr_page=curr_page,
+                                                      cursor=cursor)
+        offset = json_api_builder.offset
+        if resource_ids is None:
+            json_api_builder.resource_ids = collection.get_ids(offset, page_size)
+        else:
+            json_api_builder.resource_ids = resource_ids[offset:offset + page_size]
+
+        response = {"data": collection.build_objects(request, json_api_builder.resource_ids, overrides)}
+        response.update(json_api_builder.build_resource_list_top_level_members())
+        count_objects(request, len(response['data']))
+
+        if self.request_contains_include(request):
+            response = self.add_include_objects(request, response, overrides=overrides, namespace=namespace)
+
+        return JsonAPIResponse(response, status=200)
+
+    def should_stream_response(self, json_api_builder, overrides):
+        if 'stream' in overrides:
+            return overrides['stream']
+
+        stream_threshold = getattr(settings, 'MS_STREAM_THRESHOLD', 10000)
+        return stream_threshold is not None and len(json_api_builder.resource_ids) > stream_threshold
+
+    def stream_resource_list_object(self, request, json_api_builder, overrides):
+        """
+        Writes the resource list document incrementally: `data` one resource object at a
+        time, then `links` and `meta`, then `included`. `included` is resolved from the
+        relationships of the resource type rather than from the objects written, so
+        memory stays bounded by the number of unique related objects rather than by the
+        list length.
+        """
+        renderer = get_renderer()
+        chunk_size = getattr(settings, 'MS_STREAM_CHUNK_SIZE', 64 * 1024)
+
+        chunk, chunk_length = ['{"data":['], 0
+        for x, resource_object in enumerate(json_api_builder.iter_resource_list_data()):
+            encoded_object = renderer.encode(resource_object)
+            chunk.append(',' + encoded_object if x else encoded_object)
+            chunk_length += len(encoded_object)
+            if chunk_length >= chunk_size:
+                yield ''.join(chunk)
+                chunk, chunk_length = [], 0
+                # Generating a long list is CPU bound, so without this a single
+                # streamed response would starve every other cooperative request.
+                cooperative_yield()
+        chunk.append(']')
+
+        for member, value in json_api_builder.build_resource_list_top_level_members().iteritems():
+            chunk.append(',"{}":{}'.format(member, renderer.encode(value)))
+        yield ''.join(chunk)
+
+        if self.request_contains_include(request):
+            related_response = {
+                "data": ResourceListFragment(json_api_builder.template, json_api_builder.resource_ids, {})
+            }
+            related_response = self.add_include_objects(request, related_response, overrides=overrides)
+            if related_response.get('included'):
+                yield ',"included":{}'.format(renderer.encode(related_response['included']))
+
+        yield '}'
+
+    @record_action
+    @time_action
+    @shape_response
     def create(self, request):
         overrides = MockServerHookParser(request, self.attributes).parse_hooks()
 
@@ -186,19 +328,29 @@ class ResourceListViewSet(MockServerBaseViewSet):
         if 'errors' in overrides:
             json_api_builder = JsonAPIErrorBuilder(request)
             response = json_api_builder.build_error_list_object(overrides['errors'])
-            return JsonResponse(response, status=400, content_type="application/vnd.api+json")
+            return JsonAPIResponse(response, status=400)
         elif not is_valid_request:
             json_api_builder = JsonAPIErrorBuilder(request)
             response = json_api_builder.build_error_list_object(self.attributes)
-            return JsonResponse(response, status=400, content_type="application/vnd.api+json")
+            return JsonAPIResponse(response, status=400)
         else:
+            namespace = get_namespace(overrides)
+            if namespace is not None:
+                resource_id = namespace.get(self.resource_type).create(attributes, dict(relationships),
+                                                                       resource_id=post_data['data'].get('id'))
+                if resource_id is None:
+                    response = JsonAPIErrorBuilder(request).build_409_error_object()
+                    return JsonAPIResponse(response, status=409)
+                return self.build_stored_response(request, namespace, resource_id, overrides, status=201)
+
             json_api_builder = JsonAPIResourceDetailBuilder(request,
                                                             resource_type=resource_type,
                                                             resource_id=resource_id,
                                                             config=overrides)
             response = json_api_builder.build_resource_detail_object()
+            count_objects(request, 1)
 
-            return JsonResponse(response, status=201, content_type="application/vnd.api+json")
+            return JsonAPIResponse(response, status=201)
 
     def _parse_filters_from_query_parameters(self, request):
         filter_configs = {}
@@ -214,7 +366,7 @@ class ResourceListViewSet(MockServerBaseViewSet):
                 try:
                     values = [int(value) for value in values.split(',')]
                 except:
-                    values = value.split(',')
+                    values = values.split(',')
 
                 filter_configs[attribute] = values
 
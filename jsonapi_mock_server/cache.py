@@ -0,0 +1,89 @@
+from collections import OrderedDict
+import threading
+
+
+class LRUCache(object):
+    """
+    A thread-safe mapping that holds items up to a total size of `maxsize`, evicting
+    the least recently used. Each item counts as 1, unless `sizeof` is given to
+    compute the size of a value (e.g. its length in bytes). Values larger than
+    `maxsize` aren't stored.
+    """
+
+    def __init__(self, maxsize=1000, sizeof=None):
+        self.maxsize = maxsize
+        self.sizeof = sizeof
+        self.currsize = 0
+        self._items = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __getitem__(self, key):
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                self.misses += 1
+                raise
+            self.hits += 1
+            self._items[key] = value
+            return value
+
+    def __setitem__(self, key, value):
+        self.update([(key, value)])
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def get_many(self, keys, default=None):
+        values = []
+        with self._lock:
+            items = self._items
+            for key in keys:
+                value = items.pop(key, default)
+                if value is not default:
+                    items[key] = value
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                values.append(value)
+        return values
+
+    def update(self, pairs):
+        if not self.maxsize or self.maxsize <= 0:
+            return
+
+        sizeof = self.sizeof
+        with self._lock:
+            items, sizes = self._items, self._sizes
+            for key, value in pairs:
+                size = sizeof(value) if sizeof else 1
+                if key in items:
+                    del items[key]
+                    self.currsize -= sizes.pop(key)
+                if size > self.maxsize:
+                    continue
+                items[key] = value
+                sizes[key] = size
+                self.currsize += size
+            while self.currsize > self.maxsize:
+                key, _ = items.popitem(last=False)
+                self.currsize -= sizes.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self.currsize = 0
+            self.hits = self.misses = 0
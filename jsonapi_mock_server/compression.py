@@ -0,0 +1,142 @@
+import zlib
+
+from django.conf import settings
+
+from timing import phase
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class GzipEncoder(object):
+    name = 'gzip'
+    default_level = 6
+
+    @property
+    def level(self):
+        return getattr(settings, 'MS_COMPRESSION_LEVELS', {}).get(self.name, self.default_level)
+
+    def _compressobj(self):
+        # wbits=31 writes a gzip header and trailer around the deflate stream.
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+    def compress(self, content):
+        compressor = self._compressobj()
+        return compressor.compress(content) + compressor.flush()
+
+    def compress_stream(self, chunks):
+        compressor = self._compressobj()
+        for chunk in chunks:
+            # Flush every chunk so clients can start decoding before the list is complete.
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class BrotliEncoder(GzipEncoder):
+    name = 'br'
+    default_level = 5
+
+    def __init__(self):
+        if brotli is None:
+            raise ImportError("brotli is not installed")
+
+    def compress(self, content):
+        return brotli.compress(content, quality=self.level)
+
+    def compress_stream(self, chunks):
+        compressor = brotli.Compressor(quality=self.level)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+# Ordered by preference, for clients that accept several encodings equally.
+content_encoders = (BrotliEncoder, GzipEncoder)
+
+_encoders = None
+
+
+def get_encoders():
+    """Returns an instance of each installed encoder enabled by the MS_COMPRESSION_ENCODINGS setting."""
+    global _encoders
+    if _encoders is None:
+        encoders = []
+        for encoder_class in content_encoders:
+            try:
+                encoders.append(encoder_class())
+            except ImportError:
+                continue
+        _encoders = encoders
+
+    enabled = getattr(settings, 'MS_COMPRESSION_ENCODINGS', ('br', 'gzip'))
+    return [encoder for encoder in _encoders if encoder.name in enabled]
+
+
+def parse_accept_encoding(accept_encoding):
+    """Returns the quality value of each content coding in an Accept-Encoding header."""
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        coding, _, params = coding.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def negotiate_encoder(request):
+    """Returns the encoder to compress the response to `request` with, or None."""
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING')
+    if not accept_encoding:
+        return None
+
+    qualities = parse_accept_encoding(accept_encoding)
+    best_encoder, best_quality = None, 0
+    for encoder in get_encoders():
+        quality = qualities.get(encoder.name, qualities.get('*', 0))
+        if quality > best_quality:
+            best_encoder, best_quality = encoder, quality
+    return best_encoder
+
+
+def get_min_size():
+    return getattr(settings, 'MS_COMPRESSION_MIN_SIZE', 1024)
+
+
+def compress_response(request, response):
+    """
+    Compresses `response` with the encoding negotiated for `request`. Streamed
+    responses are compressed chunk by chunk, other responses only when they're at
+    least MS_COMPRESSION_MIN_SIZE bytes long.
+    """
+    if response.has_header('Content-Encoding'):
+        return response
+
+    encoder = negotiate_encoder(request)
+    if encoder is None:
+        return response
+
+    if response.streaming:
+        response.streaming_content = encoder.compress_stream(response.streaming_content)
+    elif len(response.content) >= get_min_size():
+        with phase('compress'):
+            response.content = encoder.compress(response.content)
+    else:
+        return response
+
+    response['Content-Encoding'] = encoder.name
+    return response
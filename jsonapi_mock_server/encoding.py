@@ -0,0 +1,150 @@
+import importlib
+import json
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class JsonFragment(object):
+    """
+    A value that knows how to encode itself. When a document containing fragments
+    is rendered, each fragment's encoded text is spliced into the output as is
+    instead of being serialized value by value.
+    """
+    def encode(self, renderer):
+        raise NotImplementedError
+
+
+class EncodedJson(JsonFragment):
+    def __init__(self, text):
+        self.text = text
+
+    def encode(self, renderer):
+        return self.text
+
+
+class JsonBackend(object):
+    """Standard library encoder. Always available."""
+    name = 'json'
+
+    def make_encoder(self, default):
+        return json.JSONEncoder(default=default).encode
+
+
+class SimplejsonBackend(object):
+    name = 'simplejson'
+
+    def __init__(self):
+        import simplejson
+        from simplejson import _speedups
+        self.simplejson = simplejson
+
+    def make_encoder(self, default):
+        return self.simplejson.JSONEncoder(default=default).encode
+
+
+class UJSONBackend(object):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self.ujson = ujson
+        # Versions of ujson before 2.0 don't support the default hook fragments rely on.
+        ujson.dumps(None, default=str)
+
+    def make_encoder(self, default):
+        dumps = self.ujson.dumps
+        return lambda obj: dumps(obj, default=default, escape_forward_slashes=False)
+
+
+class OrjsonBackend(object):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+
+    def make_encoder(self, default):
+        dumps = self.orjson.dumps
+        return lambda obj: dumps(obj, default=default).decode('utf-8')
+
+
+# Ordered by preference for "auto". The standard library's C accelerated encoder
+# outperforms simplejson, so simplejson is only used when selected explicitly.
+json_backends = (OrjsonBackend, UJSONBackend, JsonBackend, SimplejsonBackend)
+
+
+def load_json_backend(name='auto'):
+    """
+    Returns an instance of the JSON backend called `name`, which may also be the
+    dotted path to a backend class. "auto" picks the fastest backend installed.
+    """
+    if name == 'auto':
+        for backend_class in json_backends:
+            try:
+                return backend_class()
+            except Exception:
+                continue
+
+    for backend_class in json_backends:
+        if backend_class.name == name:
+            return backend_class()
+
+    module_path, class_name = name.rsplit('.', 1)
+    return getattr(importlib.import_module(module_path), class_name)()
+
+
+class JSONRenderer(object):
+    placeholder = u"\x00fragment:{}\x00"
+
+    def __init__(self, backend=None):
+        self.backend = backend or JsonBackend()
+        self.fallback_encoder = DjangoJSONEncoder()
+        self.encode_value = self.backend.make_encoder(self.fallback_encoder.default)
+        self.encoded_placeholders = []
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    def _get_encoded_placeholder(self, x):
+        if len(self.encoded_placeholders) <= x:
+            with self._lock:
+                while len(self.encoded_placeholders) <= x:
+                    placeholder = self.placeholder.format(len(self.encoded_placeholders))
+                    self.encoded_placeholders.append(self.encode_value(placeholder))
+        return self.encoded_placeholders[x]
+
+    def encode(self, obj):
+        fragments = []
+
+        def default(o):
+            if isinstance(o, JsonFragment):
+                fragments.append(o)
+                return self.placeholder.format(len(fragments) - 1)
+            return self.fallback_encoder.default(o)
+
+        encoded = self.backend.make_encoder(default)(obj)
+        for x, fragment in enumerate(fragments):
+            encoded = encoded.replace(self._get_encoded_placeholder(x), fragment.encode(self), 1)
+        return encoded
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer():
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                backend = load_json_backend(getattr(settings, 'MS_JSON_ENCODER', 'auto'))
+                _renderer = JSONRenderer(backend)
+    return _renderer
+
+
+def dumps(obj):
+    return get_renderer().encode(obj)
@@ -0,0 +1,81 @@
+"""
+Cooperative serving mode. Requests are handled by greenlets on a gevent event
+loop instead of by a fixed number of worker processes or threads, so a request
+that is waiting (on a simulated delay, or on a slow client reading a large
+streamed response) doesn't hold a worker while it waits. Views, hooks and
+builders are the same ones the WSGI application uses.
+
+    $ DJANGO_SETTINGS_MODULE=settings python -m jsonapi_mock_server.evented --port 8000
+
+Under gunicorn, `gunicorn -k gevent --worker-connections 1000 wsgi` serves the
+same way.
+"""
+import argparse
+
+
+def patch():
+    """
+    Makes blocking standard library calls (sockets, time.sleep, locks, threads)
+    cooperative. Must run before Django or mock server modules are imported.
+    """
+    from gevent import monkey
+    monkey.patch_all()
+
+
+def get_application(fast_path=False):
+    if fast_path:
+        from fast_path import FastPathApplication
+        return FastPathApplication()
+
+    from django.core.wsgi import get_wsgi_application
+    return get_wsgi_application()
+
+
+def make_server(host='127.0.0.1', port=8000, application=None, max_connections=None, access_log=True):
+    """
+    Returns a gevent WSGI server for `application`, mock server's Django
+    application by default (see `get_application`). `max_connections` (default: the
+    MS_MAX_CONNECTIONS setting, or 1000) bounds the number of requests being
+    handled at once; further connections wait to be accepted.
+    """
+    from django.conf import settings
+    from gevent.pool import Pool
+    from gevent.pywsgi import WSGIServer
+
+    if application is None:
+        application = get_application()
+    if max_connections is None:
+        max_connections = getattr(settings, 'MS_MAX_CONNECTIONS', 1000)
+
+    return WSGIServer((host, port), application,
+                      spawn=Pool(max_connections),
+                      log='default' if access_log else None)
+
+
+def serve(*args, **kwargs):
+    """Serves until interrupted. Takes the arguments of `make_server`."""
+    server = make_server(*args, **kwargs)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+def main(argv=None):
+    patch()
+
+    parser = argparse.ArgumentParser(description="Serve mock server on a gevent event loop.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-connections', type=int, default=None)
+    parser.add_argument('--no-access-log', dest='access_log', action='store_false')
+    parser.add_argument('--fast-path', action='store_true',
+                        help="Serve resource actions with jsonapi_mock_server.fast_path.")
+    args = parser.parse_args(argv)
+
+    serve(args.host, args.port, get_application(args.fast_path),
+          max_connections=args.max_connections, access_log=args.access_log)
+
+
+if __name__ == '__main__':
+    main()
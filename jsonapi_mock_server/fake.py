@@ -1,21 +1,173 @@
+import hashlib
+import inspect
+import logging
 import random
+import threading
+import time
 
+from django.conf import settings
 from faker import Faker
 
+from cache import LRUCache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+fake_attributes_cache = LRUCache(maxsize=getattr(settings, 'MS_FAKE_CACHE_SIZE', 10000))
+
+# Batches smaller than this are generated in pure Python, where NumPy's per-call
+# overhead would outweigh its per-value savings.
+NUMPY_MIN_BATCH_SIZE = getattr(settings, 'MS_FAKE_NUMPY_MIN_BATCH_SIZE', 64)
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+logger = logging.getLogger('jsonapi_mock_server')
+
+_thread_local = threading.local()
+
+# Fakers written as `generate_value(self)` draw from the random module's shared
+# state, which is seeded per value under this lock.
+_module_random_lock = threading.RLock()
+_takes_rng = {}
+
+
+def get_thread_faker():
+    fake = getattr(_thread_local, 'fake', None)
+    if fake is None:
+        fake = _thread_local.fake = Faker()
+    return fake
+
+
+def call_faker_provider(faker_provider, seed):
+    """
+    Returns the value `faker_provider` generates for `seed` on this thread's Faker.
+    Each Faker instance has its own random number generator, so threads don't
+    share any state.
+    """
+    fake = get_thread_faker()
+    fake.seed_instance(seed)
+    return getattr(fake, faker_provider)()
+
+
+def takes_rng(generate_value):
+    """Returns whether a faker's `generate_value` method takes a random number generator."""
+    function = getattr(generate_value, '__func__', generate_value)
+    try:
+        return _takes_rng[function]
+    except KeyError:
+        argspec = inspect.getargspec(function)
+        result = _takes_rng[function] = len(argspec.args) > 1 or argspec.varargs is not None
+        return result
+
+
+def call_generate_value(generate_value, rng):
+    """
+    Returns the value a faker's `generate_value` method generates from `rng`. Methods
+    without an `rng` argument are called with the random module seeded from `rng`.
+    """
+    if takes_rng(generate_value):
+        return generate_value(rng)
+    if rng is random:
+        return generate_value()
+    with _module_random_lock:
+        random.seed(rng.getrandbits(64))
+        return generate_value()
+
+
+def seeded_random(*key):
+    """
+    Returns a random number generator seeded from `key`. The seed is derived with a
+    stable hash so that every process generates the same values for the same key.
+    """
+    return random.Random(stable_hash(*key))
+
+
+def stable_hash(*key):
+    digest = hashlib.md5(u':'.join(u'{}'.format(part) for part in key).encode('utf-8')).hexdigest()
+    return int(digest[:16], 16)
+
+
+def splitmix64(x):
+    z = (x + GOLDEN_GAMMA) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+def _numpy_splitmix64(x):
+    z = x + numpy.uint64(GOLDEN_GAMMA)
+    z = (z ^ (z >> numpy.uint64(30))) * numpy.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> numpy.uint64(27))) * numpy.uint64(0x94D049BB133111EB)
+    return z ^ (z >> numpy.uint64(31))
+
+
+def row_counters(resource_ids):
+    """Maps resource ids to the integers row seeds are derived from."""
+    counters = [int(resource_id) if str(resource_id).isdigit() else stable_hash(resource_id)
+                for resource_id in resource_ids]
+    if numpy is not None and len(counters) >= NUMPY_MIN_BATCH_SIZE:
+        with numpy.errstate(over='ignore'):
+            return numpy.array(counters, dtype=numpy.uint64) * numpy.uint64(GOLDEN_GAMMA)
+    return [(counter * GOLDEN_GAMMA) & MASK64 for counter in counters]
+
+
+def row_seeds(column_seed, counters):
+    """
+    Returns one 64 bit seed per row counter for the column identified by `column_seed`.
+    Each seed only depends on the column and the resource id, so a resource object gets
+    the same values whether it is generated alone or as part of any batch.
+    """
+    if _is_array(counters):
+        with numpy.errstate(over='ignore'):
+            return _numpy_splitmix64(counters + numpy.uint64(column_seed))
+    return [splitmix64((column_seed + counter) & MASK64) for counter in counters]
+
+
+def _is_array(seeds):
+    return numpy is not None and isinstance(seeds, numpy.ndarray)
+
 
 class BaseFaker(object):
+    """
+    Fakers implement `generate_value(rng)`, returning a value drawn from the random
+    number generator `rng`. Fakers written as `generate_value(self)`, drawing from
+    the random module, still work: the module is seeded for each value, under a lock.
+    """
     def __init__(self):
         pass
 
-    def generate_value(self):
+    def generate_value(self, rng=random):
         raise NotImplementedError
 
+    def generate_values(self, seeds):
+        """
+        Returns one value per seed in `seeds`, a list or NumPy array of 64 bit ints as
+        returned by `row_seeds`. Each value must only depend on its seed. Subclasses
+        override this to generate whole columns at once; the fallback calls
+        `generate_value` with a random number generator seeded per value.
+        """
+        return [call_generate_value(self.generate_value, random.Random(int(seed))) for seed in seeds]
+
 
 class NullableBaseFaker(BaseFaker):
-    def generate_value(self):
-        if random.choice([True, False]):
+    def generate_value(self, rng=random):
+        if rng.choice([True, False]):
             return None
-        return super(NullableBaseFaker, self).generate_value()
+        return call_generate_value(super(NullableBaseFaker, self).generate_value, rng)
+
+    def generate_values(self, seeds):
+        values = super(NullableBaseFaker, self).generate_values(seeds)
+        # The top bit of each seed decides whether the value is null. The values
+        # themselves are derived from the low bits.
+        if _is_array(seeds):
+            nulls = (seeds >> numpy.uint64(63)).astype(bool).tolist()
+        else:
+            nulls = [seed >> 63 for seed in seeds]
+        return [None if null else value for null, value in zip(nulls, values)]
 
 
 class IntFaker(BaseFaker):
@@ -24,8 +176,14 @@ class IntFaker(BaseFaker):
         self.start = start
         self.end = end
 
-    def generate_value(self):
-        return random.randint(self.start, self.end)
+    def generate_value(self, rng=random):
+        return rng.randint(self.start, self.end)
+
+    def generate_values(self, seeds):
+        span = self.end - self.start + 1
+        if _is_array(seeds):
+            return ((seeds % numpy.uint64(span)).astype(numpy.int64) + self.start).tolist()
+        return [int(self.start + seed % span) for seed in seeds]
 
 
 class ChoiceFaker(BaseFaker):
@@ -33,27 +191,231 @@ class ChoiceFaker(BaseFaker):
         super(ChoiceFaker, self).__init__()
         self.options = options
 
-    def generate_value(self):
-        return random.choice(self.options)
+    def generate_value(self, rng=random):
+        return rng.choice(self.options)
+
+    def generate_values(self, seeds):
+        options = self.options
+        if _is_array(seeds):
+            return [options[x] for x in (seeds % numpy.uint64(len(options))).tolist()]
+        return [options[seed % len(options)] for seed in seeds]
 
 
 class BooleanFaker(BaseFaker):
     def __init__(self):
         super(BooleanFaker, self).__init__()
 
-    def generate_value(self):
-        return random.choice((True, False))
+    def generate_value(self, rng=random):
+        return rng.choice((True, False))
 
+    def generate_values(self, seeds):
+        if _is_array(seeds):
+            return (seeds & numpy.uint64(1)).astype(bool).tolist()
+        return [bool(seed & 1) for seed in seeds]
 
-class StringFaker(BaseFaker):
-    fake = Faker()
 
+class FakerValuePool(object):
+    """
+    A fixed-size pool of values generated by one Faker provider, sampled by seed
+    instead of calling the provider for every value. The pool's contents only
+    depend on the provider, its size and its generation, so processes that build
+    the same pool independently sample the same values.
+
+    When `refresh_interval` seconds have passed since the pool was built, the next
+    sample starts building the next generation in a background thread. The new
+    values replace the old ones once they are complete.
+    """
+    def __init__(self, faker_provider, size, refresh_interval=None):
+        self.faker_provider = faker_provider
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.values = None
+        self.generation = 0
+        self.built_at = None
+        self.build_seconds = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._building = False
+
+    @property
+    def ready(self):
+        return self.values is not None
+
+    def build_once(self):
+        """
+        Builds the pool unless it's ready, and returns whether this call built it.
+        Threads calling this while the pool is being built wait for that build
+        instead of starting their own.
+        """
+        with self._build_lock:
+            if self.ready:
+                return False
+            self.build()
+            return True
+
+    def build(self):
+        with self._lock:
+            generation = self.generation + 1 if self.ready else self.generation
+        start = time.time()
+        values = [call_faker_provider(self.faker_provider, stable_hash('pool', self.faker_provider, generation, x))
+                  for x in xrange(self.size)]
+
+        with self._lock:
+            self.values = values
+            self.generation = generation
+            self.built_at = time.time()
+            self.build_seconds = self.built_at - start
+            self._building = False
+        return self
+
+    def build_in_background(self):
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        thread = threading.Thread(target=self.build, name="faker-pool-{}".format(self.faker_provider))
+        thread.daemon = True
+        thread.start()
+
+    def sample(self, seeds):
+        if self.refresh_interval is not None and time.time() - self.built_at > self.refresh_interval:
+            self.build_in_background()
+
+        values = self.values
+        if _is_array(seeds):
+            return [values[x] for x in (seeds % numpy.uint64(len(values))).tolist()]
+        return [values[seed % len(values)] for seed in seeds]
+
+
+faker_pools = {}
+
+
+def get_faker_pool(faker_provider):
+    """
+    Returns the ready pool for `faker_provider`, or None when the provider isn't
+    pooled or its pool is still being built. Providers listed in the
+    MS_FAKER_POOLS setting that haven't been built yet are built on first use,
+    in the background if MS_FAKER_POOL_BACKGROUND is set. Otherwise the first
+    request waits for the build, which is logged: build pools at startup with
+    `build_faker_pools` instead.
+    """
+    pool = faker_pools.get(faker_provider)
+    if pool is not None and pool.ready:
+        return pool
+
+    background = getattr(settings, 'MS_FAKER_POOL_BACKGROUND', False)
+    if pool is None:
+        pool_sizes = getattr(settings, 'MS_FAKER_POOLS', {})
+        if faker_provider not in pool_sizes:
+            return None
+        pool = faker_pools.setdefault(faker_provider, FakerValuePool(
+            faker_provider, pool_sizes[faker_provider], getattr(settings, 'MS_FAKER_POOL_REFRESH', None)))
+        if background:
+            pool.build_in_background()
+
+    if not background and pool.build_once():
+        logger.warning("Faker pool %r built on first use, in %.1f ms; call build_faker_pools() at startup "
+                       "to build it before serving requests", faker_provider, pool.build_seconds * 1000)
+    return pool if pool.ready else None
+
+
+def fake_data_is_stable():
+    """
+    Returns whether fake data only depends on its seeds. It doesn't while pools are
+    refreshed periodically, or may still switch from provider values to pooled
+    values once their background build completes.
+    """
+    if getattr(settings, 'MS_FAKER_POOL_REFRESH', None) is not None:
+        return False
+    if getattr(settings, 'MS_FAKER_POOL_BACKGROUND', False):
+        for faker_provider in getattr(settings, 'MS_FAKER_POOLS', {}):
+            pool = faker_pools.get(faker_provider)
+            if pool is None or not pool.ready:
+                return False
+    return True
+
+
+def measure_faker_provider(faker_provider, samples=50):
+    """Returns the average time in seconds a call to `faker_provider` takes."""
+    provider = getattr(get_thread_faker(), faker_provider)
+    provider()
+    start = time.time()
+    for x in xrange(samples):
+        provider()
+    return (time.time() - start) / samples
+
+
+def build_faker_pools(pool_sizes=None, background=None):
+    """
+    Builds the pools listed in `pool_sizes` (a dict of provider name to pool size,
+    defaulting to the MS_FAKER_POOLS setting) and logs what each provider costs.
+
+    Call this at startup, e.g. from wsgi.py under gunicorn --preload, so pools are
+    built once before workers fork and are shared with them copy-on-write.
+    """
+    if pool_sizes is None:
+        pool_sizes = getattr(settings, 'MS_FAKER_POOLS', {})
+    if background is None:
+        background = getattr(settings, 'MS_FAKER_POOL_BACKGROUND', False)
+    refresh_interval = getattr(settings, 'MS_FAKER_POOL_REFRESH', None)
+
+    for faker_provider, size in pool_sizes.iteritems():
+        pool = faker_pools[faker_provider] = FakerValuePool(faker_provider, size, refresh_interval)
+        if background:
+            pool.build_in_background()
+        else:
+            pool.build()
+
+    report_faker_provider_costs()
+    return faker_pools
+
+
+def report_faker_provider_costs():
+    """
+    Logs the measured cost of every Faker provider used by a registered resource,
+    most expensive first, to help decide which providers to pool.
+    """
+    from registry import resource_registry
+    resource_registry.autodiscover()
+
+    faker_providers = set()
+    for resource_instance in resource_registry.resources():
+        for faker in resource_instance.fake_attributes.itervalues():
+            if isinstance(faker, StringFaker):
+                faker_providers.add(faker.faker_provider)
+
+    costs = [(measure_faker_provider(faker_provider), faker_provider) for faker_provider in faker_providers]
+    for seconds, faker_provider in sorted(costs, reverse=True):
+        pool = faker_pools.get(faker_provider)
+        if pool is None:
+            pool_info = "not pooled"
+        elif pool.ready:
+            pool_info = "pool of {} built in {:.1f} ms".format(pool.size, pool.build_seconds * 1000)
+        else:
+            pool_info = "pool of {} building".format(pool.size)
+        logger.info("Faker provider %r: %.1f us/value, %s", faker_provider, seconds * 1e6, pool_info)
+    return costs
+
+
+class StringFaker(BaseFaker):
     def __init__(self, faker_provider):
         super(StringFaker, self).__init__()
         self.faker_provider = faker_provider
 
-    def generate_value(self):
-        return getattr(self.fake, self.faker_provider)()
+    def generate_value(self, rng=random):
+        pool = get_faker_pool(self.faker_provider)
+        if pool is not None:
+            return pool.sample([rng.getrandbits(64)])[0]
+
+        return call_faker_provider(self.faker_provider, rng.getrandbits(32))
+
+    def generate_values(self, seeds):
+        pool = get_faker_pool(self.faker_provider)
+        if pool is not None:
+            return pool.sample(seeds)
+
+        return [call_faker_provider(self.faker_provider, seed)
+                for seed in (seeds.tolist() if _is_array(seeds) else seeds)]
 
 
 class NullableIntFaker(NullableBaseFaker, IntFaker):
@@ -0,0 +1,122 @@
+import importlib
+import logging
+import sys
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.wsgi import get_wsgi_application
+from django.http import HttpResponseServerError
+from django.http.utils import conditional_content_removal
+
+from base_metadata import get_options_document
+
+logger = logging.getLogger('django.request')
+
+
+class FastPathApplication(object):
+    """
+    A minimal WSGI application that dispatches `GET`/`POST /<resources>` and
+    `GET`/`PATCH`/`DELETE /<resources>/<id>` straight to the viewset actions,
+    and `OPTIONS` of both to their prebuilt responses, skipping Django's middleware and URL resolver and DRF's request
+    wrapping, authentication and content negotiation. Output is the same as the
+    Django application's, headers included.
+
+    Routes are read from a DRF router, by default the `router` defined in the
+    ROOT_URLCONF module. Everything else (unknown paths, actions a viewset
+    doesn't implement, CORS preflight requests) is handed to `fallback`,
+    Django's WSGI application by default.
+
+        # wsgi.py
+        from mock_server.fast_path import FastPathApplication
+        application = FastPathApplication()
+
+    """
+    list_actions = {'GET': 'list', 'POST': 'create'}
+    detail_actions = {'GET': 'retrieve', 'PATCH': 'partial_update', 'DELETE': 'destroy'}
+    # The view name in OPTIONS documents ends with the suffix the router gives each route.
+    list_suffix = 'List'
+    detail_suffix = 'Instance'
+
+    def __init__(self, router=None, fallback=None):
+        if router is None:
+            router = importlib.import_module(settings.ROOT_URLCONF).router
+        self.fallback = fallback or get_wsgi_application()
+        self.trailing_slash = router.trailing_slash
+
+        # Actions only use the viewset's class attributes, so a single instance
+        # per viewset is shared between requests.
+        self.routes = {}
+        self.options_views = {}
+        for prefix, viewset, _ in router.registry:
+            view = viewset()
+            view.headers = view.default_response_headers
+            self.routes[prefix] = view
+
+            for suffix, actions in ((self.list_suffix, self.list_actions),
+                                    (self.detail_suffix, self.detail_actions)):
+                if view.metadata_class is not None and any(hasattr(view, action) for action in actions.values()):
+                    options_view = viewset(suffix=suffix)
+                    options_view.headers = view.headers
+                    get_options_document(options_view)
+                    self.options_views[prefix, suffix] = options_view
+
+    def resolve(self, path, method):
+        """Returns the view and the arguments of the action serving `path`, or None."""
+        path = path.lstrip('/')
+        if self.trailing_slash:
+            if not path.endswith(self.trailing_slash):
+                return None
+            path = path[:-len(self.trailing_slash)]
+
+        parts = path.split('/')
+        view = self.routes.get(parts[0])
+        if view is None:
+            return None
+
+        if len(parts) == 1:
+            action, args, suffix = self.list_actions.get(method), (), self.list_suffix
+        elif len(parts) == 2 and parts[1] and '.' not in parts[1]:
+            action, args, suffix = self.detail_actions.get(method), (parts[1],), self.detail_suffix
+        else:
+            return None
+
+        if method == 'OPTIONS':
+            view = self.options_views.get((parts[0], suffix))
+            if view is None:
+                return None
+            return view, view.options, args
+
+        handler = getattr(view, action, None) if action else None
+        if handler is None:
+            return None
+        return view, handler, args
+
+    def is_preflight(self, environ):
+        """Returns whether `environ` is a CORS preflight request, which django-cors-headers answers."""
+        return 'HTTP_ORIGIN' in environ and 'HTTP_ACCESS_CONTROL_REQUEST_METHOD' in environ
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD'].upper()
+        if method == 'OPTIONS' and self.is_preflight(environ):
+            return self.fallback(environ, start_response)
+
+        resolved = self.resolve(environ.get('PATH_INFO', '/'), method)
+        if resolved is None:
+            return self.fallback(environ, start_response)
+
+        view, handler, args = resolved
+        request = WSGIRequest(environ)
+        try:
+            response = handler(request, *args)
+        except Exception:
+            logger.error('Internal Server Error: %s', request.path, exc_info=sys.exc_info(),
+                         extra={'status_code': 500, 'request': request})
+            response = HttpResponseServerError()
+        else:
+            for header, value in view.headers.iteritems():
+                response[header] = value
+        response = conditional_content_removal(request, response)
+
+        status = '{} {}'.format(response.status_code, response.reason_phrase)
+        start_response(str(status), [(str(header), str(value)) for header, value in response.items()])
+        return response
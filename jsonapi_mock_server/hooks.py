@@ -1,88 +1,293 @@
-class BaseHookParser(object):
-    def __init__(self, request):
-        self.request = request
+import math
 
-    def cast(self, value):
-        try:
-            return int(value)
-        except:
-            return value
+from django.conf import settings
+
+from cache import LRUCache
+from timing import phase
+from utils import upper_camelize_resource
+
+
+def cast(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+def as_text(value):
+    return value if isinstance(value, basestring) else unicode(value)
+
+def parse_bool(value):
+    if value is None:
+        return None
+    elif value in ('false', 'False', '0', '[]'):
+        return False
+    else:
+        return bool(value)
+
+def parse_fieldset(resource_type, value):
+    """Returns the (resource type, field names) of a `fields[type]=a,b` sparse fieldset."""
+    return upper_camelize_resource(resource_type), frozenset(filter(None, as_text(value).split(',')))
+
+def parse_flag(value):
+    return parse_bool(cast(value))
+
+def parse_length(value):
+    value = cast(value)
+    return value if value or value == 0 else None
+
+def parse_status(value):
+    return cast(value) or None
+
+def parse_latency(value):
+    """
+    Returns the (distribution, median, p99) in milliseconds of a `200` (fixed),
+    `normal:200,800` or `lognormal:200,800` (median, p99) latency, or None.
+    """
+    distribution, _, params = as_text(value).rpartition(':')
+    try:
+        params = [float(param) for param in params.split(',')]
+    except ValueError:
+        return None
+
+    distribution = distribution or 'fixed'
+    if distribution == 'fixed' and len(params) == 1:
+        params *= 2
+    if distribution not in ('fixed', 'normal', 'lognormal') or len(params) != 2:
+        return None
+    median, p99 = params
+    if median < 0 or p99 < median or (distribution == 'lognormal' and not median):
+        return None
+    return str(distribution), median, p99
+
+def parse_bandwidth(value):
+    """Returns a bandwidth in bytes per second, or None."""
+    value = cast(value)
+    return value if isinstance(value, (int, long)) and value > 0 else None
+
+def parse_error_rate(value):
+    """Returns the probability of an error response, between 0 and 1, or None."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if 0 <= value <= 1 and not math.isnan(value) else None
+
+def parse_namespace(value):
+    return as_text(value).strip() or None
+
+def parse_query_errors(value):
+    return as_text(value).split(',') or None
+
+def parse_header_errors(value):
+    return as_text(value).split(';') or None
+
+def parse_header_attributes(value):
+    attributes = [attribute.split('=', 1) for attribute in as_text(value).split(';') if '=' in attribute]
+    return {attribute: cast(value) for attribute, value in attributes} or None
+
+def parse_header_fields(value):
+    fieldsets = [fieldset.split('=', 1) for fieldset in as_text(value).split(';') if '=' in fieldset]
+    return dict(parse_fieldset(resource_type, value) for resource_type, value in fieldsets) or None
+
+
+class Overrides(object):
+    """
+    The hooks of a request, as an immutable, read-only mapping of the hooks that
+    were set. Overrides are shared by every request with the same hooks, so the
+    values they hold must not be changed either; use `replace` instead.
+    """
+    __slots__ = ('fake', 'length', 'status', 'errors', 'attributes', 'stream', 'seed', 'fields', 'filter',
+                 'latency', 'bandwidth', 'error_rate', 'namespace')
+
+    def __init__(self, **hooks):
+        for hook in self.__slots__:
+            object.__setattr__(self, hook, hooks.pop(hook, None))
+        if hooks:
+            raise TypeError("Unknown hooks: {}".format(', '.join(sorted(hooks))))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Overrides are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Overrides are immutable")
+
+    def __getitem__(self, hook):
+        value = getattr(self, hook, None) if hook in self.__slots__ else None
+        if value is None:
+            raise KeyError(hook)
+        return value
+
+    def __contains__(self, hook):
+        return hook in self.__slots__ and getattr(self, hook) is not None
+
+    def __iter__(self):
+        return (hook for hook in self.__slots__ if getattr(self, hook) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __eq__(self, other):
+        if isinstance(other, (Overrides, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Overrides({})".format(', '.join("{}={!r}".format(hook, value) for hook, value in self.iteritems()))
+
+    def get(self, hook, default=None):
+        value = getattr(self, hook, None) if hook in self.__slots__ else None
+        return default if value is None else value
+
+    def keys(self):
+        return list(self)
+
+    def iteritems(self):
+        return ((hook, getattr(self, hook)) for hook in self)
+
+    def items(self):
+        return list(self.iteritems())
+
+    def replace(self, **hooks):
+        """Returns a copy of these overrides with `hooks` set (or unset, with None)."""
+        values = dict(self.iteritems())
+        values.update(hooks)
+        return Overrides(**values)
 
-    def parse_hooks(self):
-        fake = self._extract_fake()
-        length = self._extract_length()
-        status = self._extract_status()
-        errors = self._extract_errors()
-        attributes = self._extract_attributes()
-
-        overrides = {}
-        if fake is not None:
-            overrides.update({"fake": fake})
-        if length or length == 0:
-            overrides.update({"length": length})
-        if status:
-            overrides.update({"status": status})
-        if errors:
-            overrides.update({"errors": errors})
-        if attributes:
-            overrides.update({"attributes": attributes})
 
+class HookSchema(object):
+    """
+    The hooks of a resource compiled into lookup tables, so parsing a request takes
+    one pass over its query parameters and a lookup of each `ms-*` header, instead of
+    a scan of every header. Parsed overrides are memoized per query string and hook
+    headers, up to `MS_HOOK_CACHE_SIZE` (default `1000`) per resource.
+    """
+    query_hooks = {
+        'fake': parse_flag,
+        'length': parse_length,
+        'status': parse_status,
+        'errors': parse_query_errors,
+        'stream': parse_flag,
+        'seed': cast,
+        'latency': parse_latency,
+        'bandwidth': parse_bandwidth,
+        'error_rate': parse_error_rate,
+        'namespace': parse_namespace,
+    }
+    header_hooks = (
+        ('HTTP_MS_FAKE', 'fake', parse_flag),
+        ('HTTP_MS_LENGTH', 'length', parse_length),
+        ('HTTP_MS_STATUS', 'status', parse_status),
+        ('HTTP_MS_ERRORS', 'errors', parse_header_errors),
+        ('HTTP_MS_ATTRIBUTES', 'attributes', parse_header_attributes),
+        ('HTTP_MS_STREAM', 'stream', parse_flag),
+        ('HTTP_MS_SEED', 'seed', cast),
+        ('HTTP_MS_FIELDS', 'fields', parse_header_fields),
+        ('HTTP_MS_LATENCY', 'latency', parse_latency),
+        ('HTTP_MS_BANDWIDTH', 'bandwidth', parse_bandwidth),
+        ('HTTP_MS_ERROR_RATE', 'error_rate', parse_error_rate),
+        ('HTTP_MS_NAMESPACE', 'namespace', parse_namespace),
+    )
+    header_keys = tuple(header for header, _, _ in header_hooks)
+
+    def __init__(self, attributes=()):
+        self.attributes = frozenset(attributes)
+        self._cache = LRUCache(maxsize=getattr(settings, 'MS_HOOK_CACHE_SIZE', 1000))
+
+    def parse_query(self, query):
+        hooks, attributes, fields = {}, {}, {}
+        query_hooks = self.query_hooks
+        for param, value in query.iteritems():
+            if param in query_hooks:
+                value = query_hooks[param](value)
+                if value is not None:
+                    hooks[param] = value
+            elif param in self.attributes:
+                attributes[param] = cast(value)
+            elif param.startswith('fields[') and param.endswith(']'):
+                resource_type, field_names = parse_fieldset(param[7:-1], value)
+                fields[resource_type] = field_names
+        if attributes:
+            hooks['attributes'] = attributes
+        if fields:
+            hooks['fields'] = fields
+        return hooks
+
+    def parse_headers(self, meta, header_values=None):
+        if header_values is None:
+            header_values = [meta.get(header) for header in self.header_keys]
+
+        hooks = {}
+        for (_, hook, parse), value in zip(self.header_hooks, header_values):
+            if value is not None:
+                value = parse(value)
+                if value is not None:
+                    hooks[hook] = value
+        return hooks
+
+    def parse(self, request):
+        """Returns the Overrides of `request`; hooks in the query string take precedence over headers."""
+        meta = request.META
+        header_values = tuple(meta.get(header) for header in self.header_keys)
+        key = (meta.get('QUERY_STRING', ''), header_values)
+        overrides = self._cache.get(key)
+        if overrides is None:
+            hooks = self.parse_headers(meta, header_values)
+            hooks.update(self.parse_query(request.GET))
+            overrides = self._cache[key] = Overrides(**hooks)
         return overrides
 
-    def _extract_errors(self):
-        raise NotImplementedError
 
-    def _extract_attributes(self):
-        raise NotImplementedError
+_schemas = {}
 
-    def _extract_length(self):
-        raise NotImplementedError
+def get_hook_schema(attributes=()):
+    key = frozenset(attributes)
+    try:
+        return _schemas[key]
+    except KeyError:
+        return _schemas.setdefault(key, HookSchema(key))
 
-    def _extract_status(self):
-        raise NotImplementedError
+def get_hook_schemas():
+    return _schemas.values()
 
-    def _extract_fake(self):
-        raise NotImplementedError
+
+class BaseHookParser(object):
+    def __init__(self, request):
+        self.request = request
+
+    def cast(self, value):
+        return cast(value)
 
     def parse_bool(self, value):
-        if value is None:
-            return None
-        elif value in ('false', 'False', '0', '[]'):
-            return False
-        else:
-            return bool(value)
+        return parse_bool(value)
+
+    def parse_fieldset(self, resource_type, value):
+        return parse_fieldset(resource_type, value)
+
+    def parse_hooks(self):
+        raise NotImplementedError
 
 
 class QueryStringHookParser(BaseHookParser):
     """
     Example of valid query string:
 
-      /caterers/1?length=20&name=abc&numberOfDrivers=10&errors=name,description&fake=1
+      /caterers/1?length=20&name=abc&numberOfDrivers=10&errors=name,description&fake=1&stream=1&seed=42&fields[caterers]=name
+      /caterers?latency=lognormal:100,800&bandwidth=50000&error_rate=0.05
+      /caterers?namespace=e2e-42
 
     """
     def __init__(self, request, attributes):
         super(QueryStringHookParser, self).__init__(request)
         self.attributes = attributes
 
-        self.overrides = {}
-        for param, value in self.request.GET.iteritems():
-            self.overrides[param] = self.cast(value)
-
-    def _extract_errors(self):
-        if 'errors' in self.overrides:
-            return self.overrides['errors'].split(',')
-
-    def _extract_attributes(self):
-        return {attr: val for attr, val in self.overrides.iteritems() if attr in self.attributes.keys()}
-
-    def _extract_length(self):
-        return self.overrides.get('length')
-
-    def _extract_status(self):
-        return self.overrides.get('status')
-
-    def _extract_fake(self):
-        return self.parse_bool(self.overrides.get('fake'))
+    def parse_hooks(self):
+        return get_hook_schema(self.attributes).parse_query(self.request.GET)
 
 
 class HeadersHookParser(BaseHookParser):
@@ -94,47 +299,24 @@ class HeadersHookParser(BaseHookParser):
       ms-attributes: name=abc;numberOfDrivers=10
       ms-errors: name;description
       ms-fake: 1
+      ms-stream: 1
+      ms-seed: 42
+      ms-fields: caterers=name,description;dishes=name
+      ms-latency: 200
+      ms-bandwidth: 50000
+      ms-error-rate: 0.05
+      ms-namespace: e2e-42
 
     """
-    def __init__(self, request):
-        super(HeadersHookParser, self).__init__(request)
-
-        self.overrides = {}
-        for header, value in self.request.META.iteritems():
-            if header.lower().startswith('http_ms_'):
-                self.overrides[header[8:].lower()] = self.cast(value)
-
-    def _extract_errors(self):
-        if 'errors' in self.overrides:
-            return self.overrides['errors'].split(';')
-
-    def _extract_attributes(self):
-        if 'attributes' not in self.overrides:
-            return None
-
-        attributes = self.overrides['attributes'].split(';')
-        attribute_overrides = dict([attribute.split('=') for attribute in attributes])
-        for att, value in attribute_overrides.iteritems():
-            attribute_overrides[att] = self.cast(value)
-        return attribute_overrides
-
-    def _extract_length(self):
-        return self.overrides.get('length')
-
-    def _extract_status(self):
-        return self.overrides.get('status')
-
-    def _extract_fake(self):
-        return self.parse_bool(self.overrides.get('fake'))
+    def parse_hooks(self):
+        return get_hook_schema().parse_headers(self.request.META)
 
 
 class MockServerHookParser(object):
     def __init__(self, request, attributes):
-        self.headers_hook_parser = HeadersHookParser(request)
-        self.qs_hook_parser = QueryStringHookParser(request, attributes)
+        self.request = request
+        self.attributes = attributes
 
     def parse_hooks(self):
-        overrides = {}
-        overrides.update(self.headers_hook_parser.parse_hooks())
-        overrides.update(self.qs_hook_parser.parse_hooks())
-        return overrides
+        with phase('hooks'):
+            return get_hook_schema(self.attributes).parse(self.request)
@@ -0,0 +1,162 @@
+from collections import OrderedDict
+import threading
+
+from django.conf import settings
+from inflection import camelize
+
+from cache import LRUCache
+from json_api_builder import JsonAPIIncludedResourceListBuilder, ResourceListFragment
+from registry import resource_registry
+from utils import upper_camelize_resource
+
+
+class IncludeResolver(object):
+    """
+    Resolves `include` query parameters into the `included` member of a compound
+    document.
+
+    Include strings are compiled, once per resource type, into a plan: every
+    relationship path in the string (e.g. `dishes`, `dishes.caterer`) appears once,
+    after its parent path, with the type it leads to according to the relationship
+    graph of the registered resources. Resolving a plan collects the related ids
+    at each path from the objects resolved for its parent path, and generates the
+    objects missing from the (type, id) index, a batch per path. Each related
+    object is generated once however many paths lead to it. Plans are kept per
+    resource type and include string, up to `MS_INCLUDE_PLAN_CACHE_SIZE` (default
+    1000) plans.
+    """
+
+    def __init__(self, registry=resource_registry, max_plans=None):
+        self.registry = registry
+        self._graph = None
+        if max_plans is None:
+            max_plans = getattr(settings, 'MS_INCLUDE_PLAN_CACHE_SIZE', 1000)
+        self._plans = LRUCache(maxsize=max_plans)
+        self._lock = threading.Lock()
+
+    @property
+    def graph(self):
+        """Maps each resource type to the type each of its relationships leads to."""
+        if self._graph is None:
+            with self._lock:
+                if self._graph is None:
+                    self.registry.autodiscover()
+                    self._graph = {
+                        upper_camelize_resource(resource.resource_type): {related_type: upper_camelize_resource(related_type)
+                                                 for related_type, _ in resource.relationships}
+                        for resource in self.registry.resources()
+                    }
+        return self._graph
+
+    def get_plan(self, resource_type, include):
+        key = (resource_type, include)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = self.compile(resource_type, include)
+        return plan
+
+    def compile(self, resource_type, include):
+        """
+        Returns the (path, parent path, relationship, related type) steps resolving
+        `include` for resources of `resource_type`, parents first. Paths through
+        relationships the graph doesn't know are left out.
+        """
+        types = {(): upper_camelize_resource(resource_type)}
+        steps = []
+        for include_group in include.split(','):
+            path = ()
+            for include_type in include_group.split('.'):
+                relationship = camelize(include_type.strip(), uppercase_first_letter=False)
+                parent, path = path, path + (relationship,)
+                if path in types:
+                    continue
+                related_type = self.graph.get(types.get(parent), {}).get(relationship)
+                if related_type is None:
+                    break
+                types[path] = related_type
+                steps.append((path, parent, relationship, related_type))
+        return tuple(steps)
+
+    def get_defined_related_ids(self, resource_type, relationship):
+        """Returns the related ids `relationship` is defined with on the resource class."""
+        for related_type, related_ids in self.registry.get(resource_type).relationships:
+            if related_type == relationship:
+                if type(related_ids) in (tuple, list):
+                    return [str(related_id) for related_id in related_ids]
+                return [str(related_ids)]
+        return []
+
+    def get_related_ids(self, resource_objects, relationship):
+        """
+        Returns the ids `resource_objects` are related to by `relationship`, each once.
+        Relationships left out of a sparse fieldset are still followed.
+        """
+        if isinstance(resource_objects, ResourceListFragment) and not resource_objects.built:
+            # Every object in a list shares its template's relationships.
+            if not len(resource_objects):
+                return []
+            return self.get_defined_related_ids(resource_objects.template.resource_type, relationship)
+
+        related_ids = OrderedDict()
+        for resource_object in resource_objects:
+            relationships = resource_object.get('relationships', {})
+            if relationship not in relationships:
+                for related_id in self.get_defined_related_ids(resource_object['type'], relationship):
+                    related_ids[related_id] = None
+                continue
+
+            rel_data = relationships[relationship]['data']
+            for rd in (rel_data if isinstance(rel_data, list) else [rel_data]):
+                if rd is not None:
+                    related_ids[rd['id']] = None
+        return related_ids.keys()
+
+    def get_primary_ids(self, primary_objects):
+        if isinstance(primary_objects, ResourceListFragment) and not primary_objects.built:
+            return set(str(resource_id) for resource_id in primary_objects.resource_ids)
+        return set(resource_object['id'] for resource_object in primary_objects)
+
+    def resolve(self, request, resource_type, primary_data, include, config=None, page_size=10, length=10,
+                namespace=None):
+        """
+        Returns the list of resource objects `include` adds to `primary_data`. In
+        stateful mode, they're read from the collections of `namespace`, leaving out
+        the ones that don't exist.
+        """
+        primary_type = upper_camelize_resource(resource_type)
+        primary_objects = [primary_data] if isinstance(primary_data, dict) else primary_data
+        primary_ids = None
+
+        included = OrderedDict()
+        resolved = {(): primary_objects}
+        for path, parent, relationship, related_type in self.get_plan(resource_type, include):
+            related_ids = self.get_related_ids(resolved[parent], relationship)
+
+            # Objects that are part of the primary data aren't repeated in `included`.
+            excluded_ids = ()
+            if related_type == primary_type:
+                if primary_ids is None:
+                    primary_ids = self.get_primary_ids(primary_objects)
+                excluded_ids = primary_ids
+
+            missing_ids = [resource_id for resource_id in related_ids
+                           if (related_type, resource_id) not in included and resource_id not in excluded_ids]
+            if missing_ids:
+                if namespace is not None:
+                    related_objects = namespace.get(related_type).build_objects(request, missing_ids, config)
+                else:
+                    related_objects = JsonAPIIncludedResourceListBuilder(request, related_type, missing_ids,
+                                                                         page_size, length,
+                                                                         config=config).build_include_list()
+                for resource_object in related_objects:
+                    included[(related_type, resource_object['id'])] = resource_object
+
+            # Primary objects are only needed for their relationships, which
+            # get_related_ids looks up by type.
+            resolved[path] = [included.get((related_type, resource_id)) or {"type": related_type, "id": resource_id}
+                              for resource_id in related_ids]
+
+        return included.values()
+
+
+include_resolver = IncludeResolver()
@@ -1,7 +1,23 @@
+import collections
+import copy
+
+from django.conf import settings
 import inflection
-from math import ceil
 
-from utils import camelize_resource, underscore_resource, upper_camelize_resource, get_instance_of_resource
+from cache import LRUCache
+from encoding import JsonFragment
+from registry import resource_registry
+from timing import phase
+from utils import (
+    FrozenDict, camelize_resource, decode_cursor, encode_cursor, iter_chunks, underscore_resource,
+    upper_camelize_resource
+)
+
+
+def copy_attributes(attributes):
+    """Returns a copy of `attributes` that shares no lists or dicts with it."""
+    return {attribute: copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+            for attribute, value in attributes.iteritems()}
 
 
 class JsonAPIBuilder(object):
@@ -11,6 +27,11 @@ class JsonAPIBuilder(object):
         self.origin = "{}://{}".format(request.scheme, request.META.get('HTTP_HOST'))
         self.url = "{}{}".format(self.origin, self.request.path)
 
+    def get_template(self, resource_type, config):
+        with phase('lookup'):
+            fields = config.get('fields', {}).get(upper_camelize_resource(resource_type)) if config else None
+            return JsonAPIResourceTemplate.get(resource_type, self.origin, fields)
+
 
 class JsonAPIErrorBuilder(JsonAPIBuilder):
     def __init__(self, request, *args, **kwargs):
@@ -22,6 +43,17 @@ class JsonAPIErrorBuilder(JsonAPIBuilder):
             "errors": [ self._build_error_object(status="401", error_msg=error_msg) ]
         }
 
+    def build_404_error_object(self):
+        return {
+            "errors": [ self._build_error_object(status="404", error_msg="Not found.") ]
+        }
+
+    def build_409_error_object(self):
+        error_msg = "A resource object with this id already exists."
+        return {
+            "errors": [ self._build_error_object(status="409", pointer="/data/id", error_msg=error_msg) ]
+        }
+
     def _build_error_object(self, status="400", pointer=None, error_msg="Error message."):
         return {
             "status": status,
@@ -40,175 +72,370 @@ class JsonAPIErrorBuilder(JsonAPIBuilder):
         }
 
 
-class JsonAPIResourceDetailBuilder(JsonAPIBuilder):
-    def __init__(self, request, resource_type, resource_id, config=None):
-        super(JsonAPIResourceDetailBuilder, self).__init__(request)
+class JsonAPIResourceTemplate(object):
+    """
+    A resource type compiled, once per origin, into everything its resource objects
+    have in common: the type name, link prefixes, relationship blocks and the default
+    attributes. Building a resource object then only fills in the id and attributes.
+
+    With `fields`, a sparse fieldset, the template only has the attributes and
+    relationships named in it, and only their fakers run. Names the resource doesn't
+    have are dropped from `fields`, so they don't make new templates.
+
+    Templates are kept in an LRU cache of `MS_TEMPLATE_CACHE_SIZE` (default 1000)
+    templates, since origins come from the client's Host header.
+    """
+    _templates = LRUCache(maxsize=getattr(settings, 'MS_TEMPLATE_CACHE_SIZE', 1000))
+
+    def __init__(self, resource_type, origin, fields=None):
         self.resource_type = resource_type
-        self.resource_id = resource_id
-        self.resource_instance = get_instance_of_resource(resource_type)
-        self.relationships = self.resource_instance.relationships
+        self.origin = origin
+        self.fields = fields
+        self.resource_instance = resource_registry.get(resource_type)
         self.json_api_rules = self.resource_instance.json_api_rules
-        self.attributes = self.get_resource_attributes(self.resource_instance, config)
-
-    def get_resource_attributes(self, resource_instance, config):
-        attributes = resource_instance.get_attributes()
+        self.default_attributes = self._filter_fields(self.resource_instance.get_attributes())
+        self.fake_attributes = self._filter_fields(self.resource_instance.fake_attributes)
+        self.fake_attribute_names = None if fields is None else list(self.fake_attributes)
+        self.resource_url = "{}/{}/".format(origin, underscore_resource(resource_type))
+        self.include_self_link = 'exclude_resource_object_link' not in self.json_api_rules
+        self.relationships = [self._compile_relationship(related_type, related_ids)
+                              for related_type, related_ids in self.resource_instance.relationships
+                              if fields is None or related_type in fields]
+        self._encoded_parts = {}
+
+    @classmethod
+    def get(cls, resource_type, origin, fields=None):
+        if fields is not None:
+            fields = fields & cls.get_field_names(resource_type)
+        key = (resource_type, origin, fields)
+        template = cls._templates.get(key)
+        if template is None:
+            template = cls._templates[key] = cls(resource_type, origin, fields)
+        return template
+
+    @staticmethod
+    def get_field_names(resource_type):
+        """Returns the names of the attributes and relationships of `resource_type`."""
+        resource_instance = resource_registry.get(resource_type)
+        field_names = set(resource_instance.attributes)
+        field_names.update(resource_instance.fake_attributes)
+        field_names.update(related_type for related_type, _ in resource_instance.relationships)
+        return field_names
+
+    def _filter_fields(self, attributes):
+        if self.fields is None:
+            return attributes
+        return {attr: val for attr, val in attributes.iteritems() if attr in self.fields}
+
+    def get_fake_attributes_list(self, resource_ids, config):
+        seed = config.get('seed') if config else None
+        with phase('fake'):
+            return self.resource_instance.get_seeded_fake_attributes_list(resource_ids, seed,
+                                                                          self.fake_attribute_names)
+
+    def _compile_relationship_data(self, related_id, related_type):
+        return FrozenDict({
+            "id": str(related_id),
+            "type": upper_camelize_resource(related_type)
+        })
 
-        disable_fake_data = bool(config and not config.get('fake', True))
-        if not disable_fake_data:
-            attributes.update(resource_instance.get_fake_attributes())
+    def _compile_relationship(self, related_type, related_ids):
+        related_type_for_url = underscore_resource(related_type)
+        self_link_suffix = "/relationships/{}".format(related_type_for_url)
 
-        if 'attributes' in config:
-            attributes.update(config['attributes'])
+        is_m2m_relationship = (type(related_ids) in (tuple, list))
+        if is_m2m_relationship:
+            data = tuple(self._compile_relationship_data(related_id, related_type) for related_id in related_ids)
+            meta = FrozenDict({"count": len(related_ids)})
+            related_link = None
+            related_link_suffix = "/{}".format(related_type_for_url)
+        else:
+            data = self._compile_relationship_data(related_ids, related_type)
+            meta = None
+            related_link = "{}/{}/{}".format(self.origin, related_type_for_url, related_ids)
+            related_link_suffix = None
 
-        return attributes
+        return related_type, data, meta, related_link, related_link_suffix, self_link_suffix
 
+    def build_attributes(self, config, resource_id):
+        attributes = copy_attributes(self.default_attributes)
 
-    def build_resource_detail_object(self):
-        resource_detail_object = {
-            "data": {
-                "type": self.resource_type,
-                "id": str(self.resource_id),
-                "attributes": self.attributes,
-                "links": self._build_self_links_object()
-            }
-        }
+        disable_fake_data = bool(config and not config.get('fake', True))
+        if not disable_fake_data:
+            attributes.update(self.get_fake_attributes_list([resource_id], config)[0])
 
-        if 'exclude_resource_object_link' in self.json_api_rules:
-           del resource_detail_object["data"]["links"]
+        if config and 'attributes' in config:
+            attributes.update(copy_attributes(self._filter_fields(config['attributes'])))
 
-        relationships_object = self._build_relationships_object()
-        if relationships_object:
-            resource_detail_object["data"].update({"relationships": relationships_object})
+        return attributes
 
-        return resource_detail_object
+    def split_attributes(self, config):
+        """
+        Splits the attributes of this resource into those that are the same for every
+        resource object of a request and the overrides that have to be applied on top
+        of each object's fake attributes.
+        """
+        disable_fake_data = bool(config and not config.get('fake', True))
+        fake_keys = set() if disable_fake_data else set(self.fake_attributes)
+        attribute_overrides = self._filter_fields(config.get('attributes', {}) if config else {})
+
+        static_attributes = {attr: val for attr, val in self.default_attributes.iteritems()
+                             if attr not in fake_keys}
+        fake_attribute_overrides = {}
+        for attr, val in attribute_overrides.iteritems():
+            if attr in fake_keys:
+                fake_attribute_overrides[attr] = val
+            else:
+                static_attributes[attr] = val
 
+        return static_attributes, fake_attribute_overrides
 
-    def _build_self_links_object(self):
-        resource_type_for_url = underscore_resource(self.resource_type)
-        return {
-            "self": "{}/{}/{}".format(self.origin, resource_type_for_url, self.resource_id)
+    def get_encoded_parts(self, renderer):
+        """
+        Returns this template's resource object pre-encoded by `renderer`, split around
+        the attributes object into the parts before and after it. Each part is further
+        split wherever the resource id has to be inserted.
+        """
+        try:
+            return self._encoded_parts[renderer.name]
+        except KeyError:
+            pass
+
+        prototype = renderer.encode(self.build(ResourceListFragment.placeholder_id,
+                                               ResourceListFragment.placeholder_attributes))
+        before, after = prototype.split(renderer.encode(ResourceListFragment.placeholder_attributes), 1)
+        encoded_id_placeholder = renderer.encode(ResourceListFragment.placeholder_id)[1:-1]
+        encoded_parts = (before.split(encoded_id_placeholder), after.split(encoded_id_placeholder))
+        self._encoded_parts[renderer.name] = encoded_parts
+        return encoded_parts
+
+    def build(self, resource_id, attributes):
+        """
+        Returns a resource object with `attributes`. Relationships are compiled into
+        frozen data shared by every resource object, and copied here, so resource
+        objects can be changed without changing the template.
+        """
+        resource_id = str(resource_id)
+        resource_object = {
+            "type": self.resource_type,
+            "id": resource_id,
+            "attributes": attributes,
         }
 
-    def _build_relationship_data(self, related_id, related_type):
-        related_type_as_type = upper_camelize_resource(related_type)
-        return {
-            "id": str(related_id),
-            "type": related_type_as_type
-        }
+        resource_url = self.resource_url + resource_id
+        if self.include_self_link:
+            resource_object["links"] = {"self": resource_url}
+
+        if self.relationships:
+            relationships_object = {}
+            for related_type, data, meta, related_link, related_link_suffix, self_link_suffix in self.relationships:
+                relationship = {
+                    "data": [dict(item) for item in data] if type(data) is tuple else dict(data),
+                    "links": {
+                        "related": related_link or (resource_url + related_link_suffix),
+                        "self": resource_url + self_link_suffix
+                    }
+                }
+                if meta:
+                    relationship["meta"] = dict(meta)
+                relationships_object[related_type] = relationship
+            resource_object["relationships"] = relationships_object
+
+        return resource_object
+
+
+class ResourceListFragment(JsonFragment, collections.MutableSequence):
+    """
+    A list of resource objects of one type. Everything but the id and the fake
+    attributes is encoded once per template or per request and spliced in, so
+    only the per-object values are serialized for each resource object. When
+    fake data is disabled, objects differ only by id and a single encoded object
+    is repeated for every id.
+
+    It's also a list: indexing, iterating or changing it builds the resource
+    objects once, and from then on they're rendered as they are, changes included.
+    """
+    placeholder_id = u"\x00resource_id\x00"
+    placeholder_attributes = u"\x00attributes\x00"
+
+    def __init__(self, template, resource_ids, static_attributes, fake_attributes=None):
+        self.template = template
+        self.resource_ids = resource_ids
+        self.static_attributes = static_attributes
+        self.fake_attributes = fake_attributes
+        self._objects = None
+
+    @property
+    def built(self):
+        """Whether the resource objects were built, and may have been changed."""
+        return self._objects is not None
+
+    @property
+    def objects(self):
+        if self._objects is None:
+            self._objects = list(self.iter_objects())
+        return self._objects
+
+    def __len__(self):
+        return len(self.resource_ids) if self._objects is None else len(self._objects)
+
+    def __iter__(self):
+        return iter(self.objects)
+
+    def __getitem__(self, index):
+        return self.objects[index]
+
+    def __setitem__(self, index, resource_object):
+        self.objects[index] = resource_object
+
+    def __delitem__(self, index):
+        del self.objects[index]
+
+    def insert(self, index, resource_object):
+        self.objects.insert(index, resource_object)
+
+    def iter_objects(self):
+        for x, resource_id in enumerate(self.resource_ids):
+            attributes = copy_attributes(self.static_attributes)
+            if self.fake_attributes is not None:
+                attributes.update(self.fake_attributes[x])
+            yield self.template.build(resource_id, attributes)
+
+    def _encode_id(self, renderer, resource_id):
+        if isinstance(resource_id, (int, long)):
+            return str(resource_id)
+        return renderer.encode_value(str(resource_id))[1:-1]
+
+    def encode(self, renderer):
+        if self._objects is not None:
+            return renderer.encode(self._objects)
+
+        before, after = self.template.get_encoded_parts(renderer)
+        encoded_static_attributes = renderer.encode_value(self.static_attributes)
+
+        if self.fake_attributes is None:
+            parts = before[:-1] + [encoded_static_attributes.join([before[-1], after[0]])] + after[1:]
+            encoded_objects = [self._encode_id(renderer, resource_id).join(parts)
+                               for resource_id in self.resource_ids]
+            return u"[{}]".format(u",".join(encoded_objects))
+
+        static_members = encoded_static_attributes[1:-1]
+        encoded_objects = []
+        for x, resource_id in enumerate(self.resource_ids):
+            encoded_id = self._encode_id(renderer, resource_id)
+            fake_members = renderer.encode_value(self.fake_attributes[x])[1:-1]
+            members_separator = u"," if static_members and fake_members else u""
+            encoded_attributes = u"{" + static_members + members_separator + fake_members + u"}"
+            encoded_objects.append(encoded_id.join(before) + encoded_attributes + encoded_id.join(after))
+        return u"[{}]".format(u",".join(encoded_objects))
 
-    def _build_m2m_relationship_object(self, related_ids, related_type):
-        resource_type_for_url = underscore_resource(self.resource_type)
-        related_type_for_url = underscore_resource(related_type)
-        related_link = "{}/{}/{}/{}".format(self.origin,
-                                            resource_type_for_url,
-                                            self.resource_id,
-                                            related_type_for_url)
-        self_link = "{}/{}/{}/relationships/{}".format(self.origin,
-                                                       resource_type_for_url,
-                                                       self.resource_id,
-                                                       related_type_for_url)
 
-        return {
-            related_type: {
-                "data": [self._build_relationship_data(related_id, related_type)
-                         for related_id in related_ids],
-                "links": {
-                    "related": related_link,
-                    "self": self_link
-                },
-                "meta": {
-                    "count": len(related_ids)
-                }
-            }
-        }
+class JsonAPIResourceDetailBuilder(JsonAPIBuilder):
+    def __init__(self, request, resource_type, resource_id, config=None):
+        super(JsonAPIResourceDetailBuilder, self).__init__(request)
+        self.resource_type = resource_type
+        self.resource_id = resource_id
+        self.template = self.get_template(resource_type, config)
+        self.resource_instance = self.template.resource_instance
+        self.relationships = self.resource_instance.relationships
+        self.json_api_rules = self.template.json_api_rules
+        self.attributes = self.get_resource_attributes(self.resource_instance, config)
 
-    def _build_m2one_relationship_object(self, related_id, related_type):
-        resource_type_for_url = underscore_resource(self.resource_type)
-        related_type_for_url = underscore_resource(related_type)
-        related_link = "{}/{}/{}".format(self.origin,
-                                         related_type_for_url,
-                                         related_id)
-        self_link = "{}/{}/{}/relationships/{}".format(self.origin,
-                                                       resource_type_for_url,
-                                                       self.resource_id,
-                                                       related_type_for_url)
+    def get_resource_attributes(self, resource_instance, config):
+        return self.template.build_attributes(config, self.resource_id)
 
+    def build_resource_detail_object(self):
         return {
-            related_type: {
-                "data": self._build_relationship_data(related_id, related_type),
-                "links": {
-                    "related": related_link,
-                    "self": self_link
-                }
-            }
+            "data": self.template.build(self.resource_id, self.attributes)
         }
 
-    def _build_relationships_object(self):
-        relationships_object = {}
-
-        for related_type, related_ids in self.relationships:
-            is_m2m_relationship = (type(related_ids) in (tuple, list))
-            if is_m2m_relationship:
-                relationship = self._build_m2m_relationship_object(related_ids, related_type)
-            else:
-                relationship = self._build_m2one_relationship_object(related_ids, related_type)
-            relationships_object.update(relationship)
-
-        return relationships_object
-
 class JsonAPIResourceListBuilder(JsonAPIBuilder):
-    def __init__(self, request, resource_type, page_size, length, config=None, curr_page=1):
+    fake_batch_size = 1000
+
+    def __init__(self, request, resource_type, page_size, length, config=None, curr_page=1, cursor=None):
         super(JsonAPIResourceListBuilder, self).__init__(request)
         self.resource_type = camelize_resource(resource_type)
-        self.curr_page = curr_page
         self.page_size = page_size
         self.length = length
-        self.num_pages = int(ceil(self.length/(self.page_size*1.0)))
+        self.num_pages = -(-self.length // self.page_size)
         self.config = config
 
+        # Collections are virtual: only the ids on the requested page are ever
+        # materialized, so the cost of a page is independent of the list length.
+        self.cursor = cursor
+        if cursor is not None:
+            self.offset = decode_cursor(cursor)
+            self.curr_page = self.offset // self.page_size + 1
+        else:
+            self.offset = max(curr_page - 1, 0) * self.page_size
+            self.curr_page = curr_page
+
         try:
-            self.resource_instance = get_instance_of_resource(resource_type)
-            self.json_api_rules = self.resource_instance.json_api_rules
+            self.template = self.get_template(self.resource_type, config)
+            self.resource_instance = self.template.resource_instance
+            self.json_api_rules = self.template.json_api_rules
         except:
             self.json_api_rules = None
 
-        ids_range_start = ((self.curr_page-1) * self.page_size) + 1
-        ids_range_end = (ids_range_start + self.page_size) if self.curr_page < self.num_pages else (self.length + 1)
-        self.resource_ids = range(ids_range_start, ids_range_end)
-        if self.config.get('filter') and 'id' in self.config['filter'].keys():
-            self.resource_ids = self.config['filter']['id']
+        if self.config and self.config.get('filter') and 'id' in self.config['filter']:
+            self.resource_ids = self.config['filter']['id'][self.offset:self.offset + self.page_size]
+        else:
+            ids_range_end = min(self.offset + self.page_size, self.length)
+            self.resource_ids = xrange(self.offset + 1, ids_range_end + 1)
 
     def build_resource_list_object(self):
         resource_list_object = {
-            "data": self._build_resource_list_data(),
-            "links": self._build_list_links_object(),
-            "meta": self._build_list_meta_object()
+            "data": self._build_resource_list_data()
         }
+        resource_list_object.update(self.build_resource_list_top_level_members())
+        return resource_list_object
 
-        if 'exclude_list_links' in self.json_api_rules:
-           del resource_list_object["links"]
+    def build_resource_list_top_level_members(self):
+        members = {}
 
-        if 'exclude_list_meta' in self.json_api_rules:
-           del resource_list_object["meta"]
+        if 'exclude_list_links' not in self.json_api_rules:
+            members["links"] = self._build_list_links_object()
 
-        return resource_list_object
+        if 'exclude_list_meta' not in self.json_api_rules:
+            members["meta"] = self._build_list_meta_object()
+
+        return members
 
     def build_include_list(self):
-        return self._build_resource_list_data()
+        return list(self._build_resource_list_data())
+
+    def iter_resource_list_data(self):
+        """Yields resource objects one at a time, for responses that are streamed."""
+        if self._fake_data_disabled():
+            attributes = self.template.build_attributes(self.config, None)
+            for resource_id in self.resource_ids:
+                yield self.template.build(resource_id, attributes)
+        else:
+            static_attributes, fake_attribute_overrides = self.template.split_attributes(self.config)
+            for resource_ids in iter_chunks(self.resource_ids, self.fake_batch_size):
+                fake_attributes = self.template.get_fake_attributes_list(resource_ids, self.config)
+                for resource_id, attributes in zip(resource_ids, fake_attributes):
+                    attributes.update(static_attributes)
+                    attributes.update(fake_attribute_overrides)
+                    yield self.template.build(resource_id, attributes)
 
     def _build_resource_list_data(self):
-        resource_list_data = []
-        for resource_id in self.resource_ids:
-            resource_detail_builder = JsonAPIResourceDetailBuilder(self.request,
-                                                                   self.resource_type,
-                                                                   resource_id,
-                                                                   config=self.config)
-            resource_list_data.append(resource_detail_builder.build_resource_detail_object())
+        static_attributes, fake_attribute_overrides = self.template.split_attributes(self.config)
+        if self._fake_data_disabled():
+            return ResourceListFragment(self.template, self.resource_ids, static_attributes)
+
+        fake_attributes = self.template.get_fake_attributes_list(list(self.resource_ids), self.config)
+        for attributes in fake_attributes:
+            attributes.update(fake_attribute_overrides)
+        return ResourceListFragment(self.template, self.resource_ids, static_attributes, fake_attributes)
 
-        resource_list_data = [resource_obj['data'] for resource_obj in resource_list_data]
-        return resource_list_data
+    def _fake_data_disabled(self):
+        return bool(self.config and not self.config.get('fake', True))
 
     def _build_list_links_object(self):
+        if self.cursor is not None:
+            return self._build_list_cursor_links_object()
+
         resource_type_for_url = underscore_resource(self.resource_type)
         next_page = self.curr_page+1 if self.num_pages > 0 and self.curr_page < self.num_pages else None
         prev_page = self.curr_page-1 if self.num_pages > 0 and self.curr_page > 0 else None
@@ -221,11 +448,25 @@ class JsonAPIResourceListBuilder(JsonAPIBuilder):
             "self": "{}/{}".format(self.origin, resource_type_for_url)
         }
 
+    def _build_list_cursor_links_object(self):
+        resource_type_for_url = underscore_resource(self.resource_type)
+        last_offset = max(self.num_pages - 1, 0) * self.page_size
+        next_offset = self.offset + self.page_size if self.offset + self.page_size < self.length else None
+        prev_offset = max(self.offset - self.page_size, 0) if self.offset > 0 else None
+
+        return {
+            "first": "{}?page[cursor]={}".format(self.url, encode_cursor(0)),
+            "last": "{}?page[cursor]={}".format(self.url, encode_cursor(last_offset)),
+            "next": "{}?page[cursor]={}".format(self.url, encode_cursor(next_offset)) if next_offset is not None else None,
+            "prev": "{}?page[cursor]={}".format(self.url, encode_cursor(prev_offset)) if prev_offset is not None else None,
+            "self": "{}/{}".format(self.origin, resource_type_for_url)
+        }
+
     def _build_list_meta_object(self):
         return {
             "pagination": {
                 "count": self.length,
-                "page": 1,
+                "page": self.curr_page,
                 "pages": self.num_pages
             }
         }
@@ -0,0 +1,71 @@
+from multiprocessing.pool import ThreadPool
+import threading
+
+from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class MasterClient(object):
+    """
+    Fetches responses from the master API for the contract tests. Requests share a
+    session whose connection pool keeps up to MS_MASTER_WORKERS (default 8)
+    connections alive per host, and `prefetch` fetches many URLs at once on as
+    many threads. Responses are kept, so each URL is only fetched once per run.
+    """
+    def __init__(self, token, max_workers=None, timeout=None):
+        self.max_workers = max_workers or getattr(settings, 'MS_MASTER_WORKERS', 8)
+        self.timeout = timeout or getattr(settings, 'MS_MASTER_TIMEOUT', 30)
+
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = "Token %s" % token
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, url):
+        """Fetches `url`, keeping the response, or the exception raised fetching it."""
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            response = e
+        with self._lock:
+            self._responses[url] = response
+        return response
+
+    def prefetch(self, urls):
+        """Fetches the `urls` not fetched yet, concurrently."""
+        with self._lock:
+            missing = sorted(set(url for url in urls if url not in self._responses))
+        if not missing:
+            return
+
+        pool = ThreadPool(min(self.max_workers, len(missing)))
+        try:
+            pool.map(self.fetch, missing)
+        finally:
+            pool.close()
+            pool.join()
+
+    def get(self, url):
+        """Returns the response to `url`, fetching it unless it was prefetched."""
+        with self._lock:
+            response = self._responses.get(url)
+        if response is None:
+            response = self.fetch(url)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_master_client(token):
+    with _clients_lock:
+        if token not in _clients:
+            _clients[token] = MasterClient(token)
+        return _clients[token]
@@ -0,0 +1,255 @@
+from bisect import bisect_left
+import functools
+import thread
+import time
+import weakref
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from fake import fake_attributes_cache
+from hooks import MockServerHookParser, get_hook_schemas
+from response_cache import response_cache
+
+try:
+    from gevent import monkey
+except ImportError:
+    monkey = None
+
+# Shards are per OS thread, even when gevent patches threads into greenlets:
+# greenlets of a thread never switch in the middle of recording a value.
+if monkey:
+    _local, _allocate_lock = monkey.get_original('thread', ['_local', 'allocate_lock'])
+else:
+    _local, _allocate_lock = thread._local, thread.allocate_lock
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+COUNTERS = {
+    'ms_requests_total': (
+        "Requests served, by resource type, action and status code.",
+        ('resource', 'action', 'status'),
+    ),
+    'ms_hook_requests_total': (
+        "Requests using each hook, by resource type.",
+        ('resource', 'hook'),
+    ),
+}
+
+HISTOGRAMS = {
+    'ms_request_duration_seconds': (
+        "Time spent in viewset actions, by resource type and action.",
+        ('resource', 'action'),
+        (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'ms_response_bytes': (
+        "Size of response bodies as sent, by resource type and action. Streamed lists aren't counted.",
+        ('resource', 'action'),
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+    ),
+    'ms_generated_objects': (
+        "Resource objects generated per request, included objects too, by resource type and action.",
+        ('resource', 'action'),
+        (0, 1, 10, 100, 1000, 10000, 100000),
+    ),
+}
+
+HOOKS = ('length', 'status', 'fake', 'errors', 'attributes', 'stream', 'seed', 'fields',
+         'latency', 'bandwidth', 'error_rate', 'namespace')
+
+
+def merge_values(totals, values):
+    """Adds the {(name, labels): value} of `values` to `totals`."""
+    for key, value in values.items():
+        if isinstance(value, list):
+            total = totals.get(key)
+            totals[key] = list(value) if total is None else [a + b for a, b in zip(total, value)]
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+class ShardOwner(object):
+    """Held by a thread's local storage only, so it's dropped when the thread ends."""
+
+
+class Metrics(object):
+    """
+    Counters and histograms recorded without locks: each OS thread records into its
+    own shard, which no other thread writes to, and shards are only summed up when
+    the metrics are rendered. When a thread ends, its shard is merged into the
+    totals of ended threads, so there are only as many shards as running threads.
+    """
+    def __init__(self):
+        self._local = _local()
+        self._shards = {}
+        self._retired = {}
+        self._lock = _allocate_lock()
+
+    def _get_shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            return self._add_shard()
+
+    def _add_shard(self):
+        shard = self._local.shard = {}
+        owner = self._local.owner = ShardOwner()
+        with self._lock:
+            self._shards[weakref.ref(owner, self._retire_shard)] = shard
+        return shard
+
+    def _retire_shard(self, owner_ref):
+        with self._lock:
+            shard = self._shards.pop(owner_ref, None)
+            if shard is not None:
+                merge_values(self._retired, shard)
+
+    def increment(self, name, labels, value=1):
+        shard = self._get_shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        shard = self._get_shard()
+        key = (name, labels)
+        buckets = HISTOGRAMS[name][2]
+        histogram = shard.get(key)
+        if histogram is None:
+            # A count per bucket, one for +Inf, then the sum.
+            histogram = shard[key] = [0] * (len(buckets) + 2)
+        histogram[bisect_left(buckets, value)] += 1
+        histogram[-1] += value
+
+    def collect(self):
+        """Returns the {(name, labels): value} of all shards summed up."""
+        totals = {}
+        with self._lock:
+            merge_values(totals, self._retired)
+            for shard in self._shards.values():
+                merge_values(totals, shard)
+        return totals
+
+    def clear(self):
+        """Resets every counter, in the shards of running threads too."""
+        with self._lock:
+            self._retired.clear()
+            for shard in self._shards.values():
+                shard.clear()
+
+
+metrics = Metrics()
+
+
+def metrics_enabled():
+    return getattr(settings, 'MS_METRICS', True)
+
+
+def count_objects(request, count):
+    """Adds `count` to the number of resource objects generated for `request`."""
+    request.ms_generated_objects = getattr(request, 'ms_generated_objects', 0) + count
+
+
+def record_action(action):
+    """Records the request count, latency, response size, generated objects and hooks of a viewset action."""
+    @functools.wraps(action)
+    def recorded_action(view, request, *args, **kwargs):
+        if not metrics_enabled():
+            return action(view, request, *args, **kwargs)
+
+        labels = (view.resource_type, action.__name__)
+        start = time.time()
+        try:
+            response = action(view, request, *args, **kwargs)
+        except Exception:
+            metrics.increment('ms_requests_total', labels + ('500',))
+            raise
+        metrics.observe('ms_request_duration_seconds', labels, time.time() - start)
+
+        metrics.increment('ms_requests_total', labels + (str(response.status_code),))
+        if not response.streaming:
+            metrics.observe('ms_response_bytes', labels, len(response.content))
+        elif response.has_header('Content-Length'):
+            metrics.observe('ms_response_bytes', labels, int(response['Content-Length']))
+        metrics.observe('ms_generated_objects', labels, getattr(request, 'ms_generated_objects', 0))
+
+        overrides = MockServerHookParser(request, view.attributes).parse_hooks()
+        for hook in HOOKS:
+            if hook in overrides:
+                metrics.increment('ms_hook_requests_total', (view.resource_type, hook))
+        if 'include' in request.GET:
+            metrics.increment('ms_hook_requests_total', (view.resource_type, 'include'))
+        return response
+    return recorded_action
+
+
+def get_caches():
+    """Returns the (name, LRUCache) of each cache whose hit ratio is reported."""
+    caches = [('response', response_cache._cache), ('fake_attributes', fake_attributes_cache)]
+    caches.extend(('hooks', schema._cache) for schema in get_hook_schemas())
+    return caches
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    escaped = (unicode(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{' + ','.join(u'{}="{}"'.format(name, value) for name, value in zip(names, escaped)) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics():
+    """Returns the metrics in the Prometheus text exposition format."""
+    totals = sorted(metrics.collect().items())
+    lines = []
+
+    for name in sorted(COUNTERS):
+        help_text, label_names = COUNTERS[name]
+        lines.append(u'# HELP {} {}'.format(name, help_text))
+        lines.append(u'# TYPE {} counter'.format(name))
+        for (metric, labels), value in totals:
+            if metric == name:
+                lines.append(u'{}{} {}'.format(name, format_labels(label_names, labels), value))
+
+    for name in sorted(HISTOGRAMS):
+        help_text, label_names, buckets = HISTOGRAMS[name]
+        lines.append(u'# HELP {} {}'.format(name, help_text))
+        lines.append(u'# TYPE {} histogram'.format(name))
+        for (metric, labels), histogram in totals:
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), histogram[:-1]):
+                cumulative += count
+                lines.append(u'{}_bucket{} {}'.format(
+                    name, format_labels(label_names + ('le',), labels + (format_value(bound),)), cumulative))
+            lines.append(u'{}_sum{} {}'.format(name, format_labels(label_names, labels), format_value(histogram[-1])))
+            lines.append(u'{}_count{} {}'.format(name, format_labels(label_names, labels), cumulative))
+
+    cache_totals = {}
+    for cache_name, cache in get_caches():
+        hits, misses = cache_totals.get(cache_name, (0, 0))
+        cache_totals[cache_name] = (hits + cache.hits, misses + cache.misses)
+
+    for name, kind, help_text in (
+            ('ms_cache_hits_total', 'counter', "Cache lookups that found the value, by cache."),
+            ('ms_cache_misses_total', 'counter', "Cache lookups that missed, by cache."),
+            ('ms_cache_hit_ratio', 'gauge', "Ratio of cache lookups that found the value, by cache.")):
+        lines.append(u'# HELP {} {}'.format(name, help_text))
+        lines.append(u'# TYPE {} {}'.format(name, kind))
+        for cache_name in sorted(cache_totals):
+            hits, misses = cache_totals[cache_name]
+            value = {
+                'ms_cache_hits_total': hits,
+                'ms_cache_misses_total': misses,
+                'ms_cache_hit_ratio': float(hits) / (hits + misses) if hits + misses else 0.0,
+            }[name]
+            lines.append(u'{}{} {}'.format(name, format_labels(('cache',), (cache_name,)), format_value(value)))
+
+    return u'\n'.join(lines) + u'\n'
+
+
+def metrics_view(request):
+    return HttpResponse(render_metrics().encode('utf-8'), content_type=CONTENT_TYPE)
@@ -0,0 +1,109 @@
+import importlib
+import inflection
+import pkgutil
+import threading
+
+from django.conf import settings
+
+from base_models import BaseResource
+from utils import camelize_resource, underscore_resource, upper_camelize_resource
+
+
+class ResourceRegistry(object):
+    """
+    Maps every name form used by the builders (e.g. "DeliveryFee", "deliveryFee",
+    "deliveryFees", "delivery_fee", "delivery_fees") to a single shared instance
+    of the matching BaseResource subclass.
+
+    The registry is populated once, on first lookup, by importing every module in
+    the resources package. Returned instances are shared between requests and
+    threads, so they're frozen (see `BaseResource.freeze`).
+    """
+    resource_suffix = "Resource"
+
+    def __init__(self, package=None):
+        self.package = package
+        self._resources = {}
+        self._lock = threading.Lock()
+        self._discovered = False
+
+    @property
+    def resources_package(self):
+        if self.package:
+            return self.package
+        return getattr(settings, 'MS_RESOURCES_PACKAGE', 'resources')
+
+    def autodiscover(self):
+        with self._lock:
+            if self._discovered:
+                return
+            package = importlib.import_module(self.resources_package)
+            for _, module_name, _ in pkgutil.iter_modules(getattr(package, '__path__', [])):
+                module = importlib.import_module("{}.{}".format(self.resources_package, module_name))
+                self.register_module(module)
+            self._discovered = True
+
+    def register_module(self, module):
+        for name, value in vars(module).items():
+            is_resource_class = (isinstance(value, type) and
+                                 issubclass(value, BaseResource) and
+                                 name.endswith(self.resource_suffix) and
+                                 value.__module__ == module.__name__)
+            if is_resource_class:
+                self.register(value)
+
+    def register(self, resource_class):
+        instance = resource_class().freeze()
+        name = resource_class.__name__[:-len(self.resource_suffix)]
+        for key in self.get_name_forms(name, resource_class.resource_type):
+            self._resources.setdefault(key, instance)
+        return instance
+
+    def get_name_forms(self, name, resource_type=None):
+        name_forms = set()
+        for base_name in filter(None, (name, resource_type)):
+            name_forms.update([
+                base_name,
+                upper_camelize_resource(base_name),
+                camelize_resource(base_name),
+                inflection.camelize(inflection.pluralize(base_name)),
+                inflection.camelize(inflection.singularize(base_name), uppercase_first_letter=False),
+                inflection.camelize(inflection.pluralize(base_name), uppercase_first_letter=False),
+                inflection.underscore(inflection.singularize(base_name)),
+                underscore_resource(base_name),
+            ])
+        return name_forms
+
+    def get(self, resource_type):
+        try:
+            return self._resources[resource_type]
+        except KeyError:
+            pass
+
+        if not self._discovered:
+            self.autodiscover()
+        try:
+            return self._resources[resource_type]
+        except KeyError:
+            raise LookupError("Unknown resource type {!r}: no {}{} class in the {} package".format(
+                resource_type, upper_camelize_resource(resource_type), self.resource_suffix, self.resources_package))
+
+    def resources(self):
+        """Returns each registered resource instance once."""
+        unique_resources = {}
+        for instance in self._resources.values():
+            unique_resources[id(instance)] = instance
+        return unique_resources.values()
+
+    def __contains__(self, resource_type):
+        if not self._discovered:
+            self.autodiscover()
+        return resource_type in self._resources
+
+    def clear(self):
+        with self._lock:
+            self._resources = {}
+            self._discovered = False
+
+
+resource_registry = ResourceRegistry()
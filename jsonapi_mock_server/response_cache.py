@@ -0,0 +1,141 @@
+import functools
+import hashlib
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+
+from cache import LRUCache
+from compression import compress_response, get_min_size, negotiate_encoder
+from fake import fake_data_is_stable
+from hooks import MockServerHookParser
+from store import stateful_enabled
+from timing import phase
+
+
+class CachedResponse(object):
+    """A rendered response, and its content compressed by each encoder requested so far."""
+    def __init__(self, response):
+        self.status = response.status_code
+        self.headers = response.items()
+        self.content = response.content
+        self.etag = '"{}"'.format(hashlib.sha1(self.content).hexdigest())
+        self.encoded_content = {}
+
+    def __len__(self):
+        return len(self.content) + sum(len(content) for content in self.encoded_content.values())
+
+    def get_etag(self, encoder=None):
+        # Each encoding is a different representation, so it needs its own strong ETag.
+        if encoder is None:
+            return self.etag
+        return '"{}-{}"'.format(self.etag.strip('"'), encoder.name)
+
+    def encode(self, encoder):
+        self.encoded_content[encoder.name] = encoder.compress(self.content)
+
+    def to_response(self, encoder=None):
+        if encoder is None:
+            response = HttpResponse(self.content, status=self.status)
+        else:
+            response = HttpResponse(self.encoded_content[encoder.name], status=self.status)
+            response['Content-Encoding'] = encoder.name
+        for header, value in self.headers:
+            response[header] = value
+        return response
+
+
+class ResponseCache(object):
+    """
+    An LRU cache of rendered GET responses, holding up to `max_bytes` of content,
+    compressed variants included. Responses are keyed by the request's origin,
+    path, sorted query parameters and `ms-*` hook headers. Only responses whose
+    fake data is deterministic are cached, and they carry a strong ETag so clients
+    can revalidate them with If-None-Match.
+    """
+    methods = ('GET', 'HEAD')
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self._cache = LRUCache(maxsize=max_bytes, sizeof=len)
+
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def cache_control(self):
+        return getattr(settings, 'MS_RESPONSE_CACHE_CONTROL', 'no-cache')
+
+    def get_key(self, request):
+        query = sorted((param, value) for param, values in request.GET.iterlists() for value in values)
+        headers = sorted((header, value) for header, value in request.META.iteritems()
+                         if header.lower().startswith('http_ms_'))
+        return (request.scheme, request.META.get('HTTP_HOST'), request.path, tuple(query), tuple(headers))
+
+    def is_cacheable(self, request, attributes):
+        if request.method not in self.methods:
+            return False
+        # Stored objects change with every write.
+        if stateful_enabled():
+            return False
+        if fake_data_is_stable():
+            return True
+        return MockServerHookParser(request, attributes).parse_hooks().get('fake') is False
+
+    def respond(self, request, attributes, get_response):
+        """
+        Returns the cached response to `request`, a 304 if the client already has it,
+        or the response returned by `get_response`, which is cached if possible.
+        Responses are compressed with the encoding the client prefers.
+        """
+        if not self._cache.maxsize or not self.is_cacheable(request, attributes):
+            return compress_response(request, get_response())
+
+        key = self.get_key(request)
+        cached = self._cache.get(key)
+        if cached is None:
+            response = get_response()
+            if response.streaming or response.status_code != 200:
+                return compress_response(request, response)
+            cached = CachedResponse(response)
+            self._cache[key] = cached
+
+        encoder = negotiate_encoder(request) if len(cached.content) >= get_min_size() else None
+        if encoder is not None and encoder.name not in cached.encoded_content:
+            with phase('compress'):
+                cached.encode(encoder)
+            # Store it again so the cache accounts for the compressed content.
+            self._cache[key] = cached
+
+        etag = cached.get_etag(encoder)
+        if self.etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = cached.to_response(encoder)
+
+        response['ETag'] = etag
+        if self.cache_control:
+            response['Cache-Control'] = self.cache_control
+        return response
+
+    def etag_matches(self, request, etag):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        # If-None-Match uses the weak comparison.
+        return etag in (tag.strip().replace('W/', '', 1) for tag in if_none_match.split(','))
+
+    def clear(self):
+        self._cache.clear()
+
+
+response_cache = ResponseCache(getattr(settings, 'MS_RESPONSE_CACHE_SIZE', 32 * 1024 * 1024))
+
+
+def cache_response(action):
+    """Serves a viewset action through the response cache."""
+    @functools.wraps(action)
+    def cached_action(view, request, *args, **kwargs):
+        return response_cache.respond(request, view.attributes,
+                                      lambda: action(view, request, *args, **kwargs))
+    return cached_action
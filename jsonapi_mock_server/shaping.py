@@ -0,0 +1,113 @@
+import functools
+import math
+import random
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+
+from hooks import MockServerHookParser, parse_bandwidth, parse_error_rate, parse_latency
+from timing import phase
+
+# The standard normal quantile of the 99th percentile.
+Z_99 = 2.3263478740408408
+
+SHAPING_HOOKS = (
+    ('latency', parse_latency),
+    ('bandwidth', parse_bandwidth),
+    ('error_rate', parse_error_rate),
+)
+
+_defaults = {}
+
+
+def get_shaping_defaults(resource_class):
+    """Returns the parsed shaping hooks a resource class defines in `shaping`."""
+    try:
+        return _defaults[resource_class]
+    except KeyError:
+        shaping = getattr(resource_class, 'shaping', {})
+        defaults = {}
+        for hook, parse in SHAPING_HOOKS:
+            if shaping.get(hook) is not None:
+                value = parse(shaping[hook])
+                if value is None:
+                    raise ValueError("Invalid {} in {}.shaping: {!r}".format(hook, resource_class.__name__,
+                                                                             shaping[hook]))
+                defaults[hook] = value
+        return _defaults.setdefault(resource_class, defaults)
+
+
+def sample_latency(latency, rng=random):
+    """
+    Returns a delay in seconds drawn from a (distribution, median, p99) latency in
+    milliseconds, as returned by `parse_latency`. Normal and lognormal latencies are
+    fitted so half the delays are below the median and 1% above the p99.
+    """
+    distribution, median, p99 = latency
+    if distribution == 'normal':
+        value = rng.normalvariate(median, (p99 - median) / Z_99)
+    elif distribution == 'lognormal':
+        value = rng.lognormvariate(math.log(median), math.log(p99 / median) / Z_99)
+    else:
+        value = median
+    return max(value, 0) / 1000.0
+
+
+def throttle(chunks, bytes_per_second, interval=0.05):
+    """
+    Yields `chunks` re-sliced so they are sent at `bytes_per_second`, a slice every
+    `interval` seconds. time.sleep only blocks the current thread, and switches to
+    other requests when serving cooperatively (see evented.py).
+    """
+    slice_size = max(1, int(bytes_per_second * interval))
+    start, sent = time.time(), 0
+    for chunk in chunks:
+        for offset in xrange(0, len(chunk), slice_size):
+            piece = chunk[offset:offset + slice_size]
+            yield piece
+            sent += len(piece)
+            delay = start + sent / float(bytes_per_second) - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+
+def throttle_response(response, bytes_per_second):
+    if response.streaming:
+        response.streaming_content = throttle(response.streaming_content, bytes_per_second)
+        return response
+
+    throttled = StreamingHttpResponse(throttle([response.content], bytes_per_second), status=response.status_code)
+    for header, value in response.items():
+        throttled[header] = value
+    throttled['Content-Length'] = str(len(response.content))
+    return throttled
+
+
+def shape_response(action):
+    """
+    Applies the latency, bandwidth and error_rate hooks, or the resource's `shaping`
+    defaults, to a viewset action: errors are returned with `MS_ERROR_RATE_STATUS`
+    (default 500) without running the action, the response is delayed by the sampled
+    latency, and its body sent at the given bandwidth.
+    """
+    @functools.wraps(action)
+    def shaped_action(view, request, *args, **kwargs):
+        defaults = get_shaping_defaults(view.__class__)
+        overrides = MockServerHookParser(request, view.attributes).parse_hooks()
+        latency = overrides.get('latency', defaults.get('latency'))
+        bandwidth = overrides.get('bandwidth', defaults.get('bandwidth'))
+        error_rate = overrides.get('error_rate', defaults.get('error_rate'))
+
+        if error_rate and random.random() < error_rate:
+            response = HttpResponse(status=getattr(settings, 'MS_ERROR_RATE_STATUS', 500))
+        else:
+            response = action(view, request, *args, **kwargs)
+
+        if latency:
+            with phase('latency'):
+                time.sleep(sample_latency(latency))
+        if bandwidth:
+            response = throttle_response(response, bandwidth)
+        return response
+    return shaped_action
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import threading
+
+from django.conf import settings
+
+SNAPSHOT_MODES = ('record', 'offline', 'incremental')
+
+INDEX_VERSION = 1
+
+# The parts of a resource definition its responses are generated from.
+DEFINITION_ATTRIBUTES = ('resource_type', 'attributes', 'fake_attributes', 'attribute_metadata',
+                         'relationship_metadata', 'json_api_rules', 'relationships', 'page_size')
+
+_definition_hashes = {}
+
+
+def describe(value):
+    """Returns a JSON serializable description of a resource definition value, e.g. a faker."""
+    if isinstance(value, dict):
+        return sorted([describe(key), describe(item)] for key, item in value.iteritems())
+    if isinstance(value, (list, tuple)):
+        return [type(value).__name__] + [describe(item) for item in value]
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        public_vars = dict((name, item) for name, item in vars(value).iteritems() if not name.startswith('_'))
+        return [type(value).__name__, describe(public_vars)]
+    return value
+
+
+def get_definition_hash(resource_class):
+    """Returns the SHA-1 of the definition of a resource class (or of a viewset subclassing it)."""
+    try:
+        return _definition_hashes[resource_class]
+    except KeyError:
+        definition = [[name, describe(getattr(resource_class, name, None))] for name in DEFINITION_ATTRIBUTES]
+        digest = hashlib.sha1(json.dumps(definition, sort_keys=True, default=repr)).hexdigest()
+        return _definition_hashes.setdefault(resource_class, digest)
+
+
+def get_snapshot_mode():
+    mode = getattr(settings, 'MS_SNAPSHOT_MODE', None)
+    if mode is not None and mode not in SNAPSHOT_MODES:
+        raise ValueError("Invalid MS_SNAPSHOT_MODE: {!r}, expected one of {}".format(mode, ', '.join(SNAPSHOT_MODES)))
+    return mode
+
+
+class SnapshotResponse(object):
+    """A master response read from a snapshot, with the parts of a requests Response the contract tests use."""
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+    def __repr__(self):
+        return '<SnapshotResponse [{}]>'.format(self.status_code)
+
+
+class SnapshotStore(object):
+    """
+    Master responses recorded on disk. Each distinct response is stored once, in
+    objects/ under the SHA-1 of its content. index.json maps every master URL to its
+    response and the definition hash of the resource it was recorded for, and every
+    contract check to the definition hash it last ran against the master with, and
+    whether it passed.
+    """
+    def __init__(self, root):
+        self.root = root
+        self._index = None
+        self._lock = threading.RLock()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.root, 'index.json')
+
+    def get_object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest[2:] + '.json')
+
+    def load_index(self):
+        with self._lock:
+            if self._index is None:
+                try:
+                    with open(self.index_path) as f:
+                        index = json.load(f)
+                except (IOError, ValueError):
+                    index = {}
+                if index.get('version') != INDEX_VERSION:
+                    index = {'version': INDEX_VERSION, 'snapshots': {}, 'checks': {}}
+                self._index = index
+            return self._index
+
+    def save_index(self):
+        with self._lock:
+            self.write_file(self.index_path, json.dumps(self.load_index(), indent=1, sort_keys=True))
+
+    def write_file(self, path, content):
+        """Writes `content` to a temporary file renamed to `path`, so readers never see partial files."""
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.rename(temp_path, path)
+
+    def record(self, url, response, definition):
+        """Records the master `response` to `url` for a resource whose definition hash is `definition`."""
+        content = json.dumps({'status': response.status_code, 'body': response.text}, sort_keys=True)
+        digest = hashlib.sha1(content).hexdigest()
+        entry = {'object': digest, 'definition': definition}
+        with self._lock:
+            path = self.get_object_path(digest)
+            if not os.path.exists(path):
+                self.write_file(path, content)
+            snapshots = self.load_index()['snapshots']
+            if snapshots.get(url) != entry:
+                snapshots[url] = entry
+                self.save_index()
+
+    def get(self, url):
+        """Returns the SnapshotResponse recorded for `url`, or None."""
+        entry = self.load_index()['snapshots'].get(url)
+        if entry is None:
+            return None
+        try:
+            with open(self.get_object_path(entry['object'])) as f:
+                content = json.load(f)
+        except (IOError, ValueError):
+            return None
+        return SnapshotResponse(content['status'], content['body'])
+
+    def record_check(self, check, definition, passed):
+        with self._lock:
+            self.load_index()['checks'][check] = {'definition': definition, 'passed': passed}
+            self.save_index()
+
+    def is_unchanged(self, check, definition):
+        """Returns whether `check` last passed against the master with the same resource definition."""
+        result = self.load_index()['checks'].get(check)
+        return result is not None and result['definition'] == definition and result['passed']
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_snapshot_store(root=None):
+    root = os.path.abspath(root or getattr(settings, 'MS_SNAPSHOT_DIR', 'master_snapshots'))
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = SnapshotStore(root)
+        return _stores[root]
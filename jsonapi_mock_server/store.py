@@ -0,0 +1,359 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+import itertools
+import threading
+
+from django.conf import settings
+
+from cache import LRUCache
+from json_api_builder import JsonAPIBuilder, copy_attributes
+from registry import resource_registry
+from utils import iter_chunks, upper_camelize_resource
+
+INDEX_BATCH_SIZE = 10000
+
+_indexes = LRUCache(maxsize=getattr(settings, 'MS_STATEFUL_INDEXES', 32))
+_indexes_lock = threading.Lock()
+
+
+def stateful_enabled():
+    return getattr(settings, 'MS_STATEFUL', False)
+
+
+def get_seed_length():
+    """Returns the number of resource objects each collection is seeded with."""
+    return getattr(settings, 'MS_STATEFUL_LENGTH', settings.MS_DEFAULT_LIST_LENGTH)
+
+
+def index_key(value):
+    """Returns the key `value` is indexed by: filter values are strings, e.g. `true` for True."""
+    if value is None:
+        return u'null'
+    if isinstance(value, bool):
+        return u'true' if value else u'false'
+    return value if isinstance(value, unicode) else unicode(value)
+
+
+def iter_seeded_values(resource_instance, attribute, length, seed=None):
+    """
+    Yields the (id, value) of `attribute` of the seeded resource objects 1 to
+    `length`, generated with the `seed` hook in batches.
+    """
+    for resource_ids in iter_chunks(xrange(1, length + 1), INDEX_BATCH_SIZE):
+        values = resource_instance.get_seeded_fake_attribute_values(attribute, resource_ids, seed)
+        for resource_id, value in itertools.izip(resource_ids, values):
+            yield resource_id, value
+
+
+def get_seeded_index(resource_instance, attribute, length, seed=None):
+    """
+    Returns the {key: sorted ids} index of the fake `attribute` of the seeded resource
+    objects 1 to `length`, generated with the `seed` hook. Seeded objects are the same
+    in every namespace, so the index is built once per seed and shared. Up to
+    `MS_STATEFUL_INDEXES` (default 32) indexes are kept.
+    """
+    key = (resource_instance.__class__, attribute, length, seed)
+    index = _indexes.get(key)
+    if index is not None:
+        return index
+
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = {}
+            for resource_id, value in iter_seeded_values(resource_instance, attribute, length, seed):
+                index.setdefault(index_key(value), []).append(resource_id)
+            _indexes[key] = index
+        return index
+
+
+class Record(object):
+    """The attributes and relationships written to a resource object, on top of its generated attributes."""
+    __slots__ = ('attributes', 'relationships')
+
+    def __init__(self, attributes=None, relationships=None):
+        self.attributes = dict(attributes or {})
+        self.relationships = dict(relationships or {})
+
+    def update(self, attributes=None, relationships=None):
+        self.attributes.update(attributes or {})
+        self.relationships.update(relationships or {})
+
+
+class Collection(object):
+    """
+    The resource objects of a type in a namespace. The collection is seeded with
+    the ids 1 to `length`, whose objects are generated on demand like in stateless
+    mode, so seeding takes no memory. Only writes are kept: a Record per created or
+    updated id, in the `records` primary key index, and the seeded ids deleted.
+    Lists are ordered by id, then by creation.
+    """
+    def __init__(self, resource_type, length):
+        self.resource_type = upper_camelize_resource(resource_type)
+        self.resource_instance = resource_registry.get(self.resource_type)
+        self.length = length
+        self.records = {}
+        self.created = OrderedDict()
+        self.deleted = []
+        self._deleted = set()
+        self._next_id = length + 1
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self.length - len(self.deleted) + len(self.created)
+
+    def is_seeded(self, resource_id):
+        resource_id = str(resource_id)
+        return resource_id.isdigit() and 1 <= int(resource_id) <= self.length
+
+    def get_key(self, resource_id):
+        """Returns the id of a seeded object as an int, the key seeded ids are filtered by, and other ids as is."""
+        return int(resource_id) if self.is_seeded(resource_id) else str(resource_id)
+
+    def __contains__(self, resource_id):
+        resource_id = str(resource_id)
+        if resource_id in self.created:
+            return True
+        return self.is_seeded(resource_id) and int(resource_id) not in self._deleted
+
+    def get_nth_seeded_id(self, n):
+        """Returns the id of the `n`th (from 0) seeded object that wasn't deleted."""
+        low, high = n + 1, n + 1 + len(self.deleted)
+        while low < high:
+            middle = (low + high) // 2
+            if middle - bisect_right(self.deleted, middle) < n + 1:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get_ids(self, offset, limit):
+        """Returns the ids of the objects `offset` to `offset + limit` of the list."""
+        with self._lock:
+            resource_ids = []
+            seeded_count = self.length - len(self.deleted)
+            if offset < seeded_count:
+                resource_id = self.get_nth_seeded_id(offset)
+                while len(resource_ids) < limit and resource_id <= self.length:
+                    if resource_id not in self._deleted:
+                        resource_ids.append(str(resource_id))
+                    resource_id += 1
+            created_offset = max(offset - seeded_count, 0)
+            resource_ids.extend(itertools.islice(self.created, created_offset,
+                                                 created_offset + limit - len(resource_ids)))
+            return resource_ids
+
+    def filter_ids(self, filters, config=None):
+        """
+        Returns the ids of the objects matching `filters`, {attribute: values}, in list
+        order: objects whose attribute has any of the values, for every attribute.
+        Attributes in the resource's `indexes` are looked up in the seeded index, and
+        the others are generated for every seeded object. Values are the ones
+        `build_objects` returns with the same `config`.
+        """
+        with self._lock:
+            matching = None
+            for attribute, values in filters.iteritems():
+                keys = set(index_key(value) for value in values)
+                if attribute == 'id':
+                    resource_ids = set(self.get_key(resource_id) for resource_id in keys if resource_id in self)
+                else:
+                    resource_ids = self.match_attribute(attribute, keys, config)
+                matching = resource_ids if matching is None else matching & resource_ids
+
+            matching = matching or set()
+            seeded_ids = sorted(resource_id for resource_id in matching if type(resource_id) is int)
+            return map(str, seeded_ids) + [resource_id for resource_id in self.created if resource_id in matching]
+
+    def match_attribute(self, attribute, keys, config=None):
+        """Returns the keys (see `get_key`) of the objects whose `attribute` is indexed by any of `keys`."""
+        resource_instance = self.resource_instance
+        config = config or {}
+        attribute_overrides = config.get('attributes', {})
+        if attribute in attribute_overrides:
+            # The attributes hook applies to every object.
+            if index_key(attribute_overrides[attribute]) not in keys:
+                return set()
+            resource_ids = set(xrange(1, self.length + 1))
+            resource_ids.difference_update(self._deleted)
+            resource_ids.update(self.created)
+            return resource_ids
+
+        seed = config.get('seed')
+        is_fake = attribute in resource_instance.fake_attributes and config.get('fake', True)
+        if is_fake:
+            if attribute in resource_instance.indexes:
+                index = get_seeded_index(resource_instance, attribute, self.length, seed)
+                seeded_ids = itertools.chain.from_iterable(index.get(key, ()) for key in keys)
+            else:
+                seeded_ids = (resource_id for resource_id, value
+                              in iter_seeded_values(resource_instance, attribute, self.length, seed)
+                              if index_key(value) in keys)
+        elif index_key(resource_instance.attributes.get(attribute)) in keys:
+            seeded_ids = xrange(1, self.length + 1)
+        else:
+            seeded_ids = ()
+
+        resource_ids = set(seeded_ids)
+        resource_ids.difference_update(self._deleted)
+
+        # Written values take precedence over generated ones.
+        for resource_id, record in self.records.iteritems():
+            if attribute in record.attributes:
+                if index_key(record.attributes[attribute]) in keys:
+                    resource_ids.add(self.get_key(resource_id))
+                else:
+                    resource_ids.discard(self.get_key(resource_id))
+            elif resource_id in self.created:
+                # Created objects have generated values too, but aren't in the seeded index.
+                if is_fake:
+                    value = resource_instance.get_seeded_fake_attribute_values(attribute, [resource_id], seed)[0]
+                else:
+                    value = resource_instance.attributes.get(attribute)
+                if index_key(value) in keys:
+                    resource_ids.add(resource_id)
+        return resource_ids
+
+    def create(self, attributes, relationships=None, resource_id=None):
+        """Adds an object, with the next free id unless given one, and returns its id, or None if it exists."""
+        with self._lock:
+            if resource_id is None:
+                while str(self._next_id) in self.created:
+                    self._next_id += 1
+                resource_id = self._next_id
+                self._next_id += 1
+            resource_id = str(resource_id)
+            if resource_id in self:
+                return None
+
+            if self.is_seeded(resource_id):
+                # Recreating a deleted object starts over from its generated data.
+                self.deleted.pop(bisect_left(self.deleted, int(resource_id)))
+                self._deleted.discard(int(resource_id))
+            else:
+                self.created[resource_id] = None
+            self.records[resource_id] = Record(attributes, relationships)
+            return resource_id
+
+    def update(self, resource_id, attributes=None, relationships=None):
+        """Writes `attributes` and `relationships` to an object, returning False if it doesn't exist."""
+        resource_id = str(resource_id)
+        with self._lock:
+            if resource_id not in self:
+                return False
+            self.records.setdefault(resource_id, Record()).update(attributes, relationships)
+            return True
+
+    def delete(self, resource_id):
+        """Deletes an object, returning False if it doesn't exist."""
+        resource_id = str(resource_id)
+        with self._lock:
+            if resource_id not in self:
+                return False
+            self.records.pop(resource_id, None)
+            if resource_id in self.created:
+                del self.created[resource_id]
+            else:
+                insort(self.deleted, int(resource_id))
+                self._deleted.add(int(resource_id))
+            return True
+
+    def build_objects(self, request, resource_ids, config=None):
+        """
+        Returns the resource objects of the `resource_ids` in this collection, built
+        like in stateless mode with what was written to them on top, and the
+        `attributes` hook on top of that.
+        """
+        template = JsonAPIBuilder(request).get_template(self.resource_type, config)
+        with self._lock:
+            resource_ids = [str(resource_id) for resource_id in resource_ids if resource_id in self]
+            records = [self.records.get(resource_id) for resource_id in resource_ids]
+        if not resource_ids:
+            return []
+
+        fields = template.fields
+        disable_fake_data = bool(config and not config.get('fake', True))
+        fake_attributes_list = None if disable_fake_data else template.get_fake_attributes_list(resource_ids, config)
+        attribute_overrides = config.get('attributes', {}) if config else {}
+
+        resource_objects = []
+        for x, (resource_id, record) in enumerate(zip(resource_ids, records)):
+            attributes = dict(template.default_attributes)
+            if fake_attributes_list is not None:
+                attributes.update(fake_attributes_list[x])
+            for written_attributes in (record.attributes if record else {}, attribute_overrides):
+                attributes.update((attribute, value) for attribute, value in written_attributes.iteritems()
+                                  if fields is None or attribute in fields)
+
+            resource_object = template.build(resource_id, copy_attributes(attributes))
+            if record and record.relationships and 'relationships' in resource_object:
+                self.write_relationships(resource_object['relationships'], record.relationships)
+            resource_objects.append(resource_object)
+        return resource_objects
+
+    def write_relationships(self, relationships_object, relationships):
+        for relationship, related_ids in relationships.iteritems():
+            if relationship not in relationships_object:
+                continue
+            related_type = upper_camelize_resource(relationship)
+            relationship_object = relationships_object[relationship] = dict(relationships_object[relationship])
+            if isinstance(related_ids, (tuple, list)):
+                relationship_object['data'] = [{"id": str(related_id), "type": related_type}
+                                               for related_id in related_ids]
+                relationship_object['meta'] = {"count": len(related_ids)}
+            else:
+                relationship_object['data'] = (None if related_ids is None else
+                                               {"id": str(related_ids), "type": related_type})
+
+
+class Namespace(object):
+    """The collections of one client, e.g. an end-to-end test run."""
+    def __init__(self, name):
+        self.name = name
+        self.collections = {}
+        self._lock = threading.Lock()
+
+    def get(self, resource_type):
+        resource_type = upper_camelize_resource(resource_type)
+        try:
+            return self.collections[resource_type]
+        except KeyError:
+            with self._lock:
+                if resource_type not in self.collections:
+                    self.collections[resource_type] = Collection(resource_type, get_seed_length())
+                return self.collections[resource_type]
+
+
+class Store(object):
+    """
+    The namespaces of stateful mode, up to `max_namespaces`: the least recently used
+    namespace is dropped, with everything written to it, to make room for a new one.
+    """
+    def __init__(self, max_namespaces=100):
+        self._namespaces = LRUCache(maxsize=max_namespaces)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._namespaces)
+
+    def get_namespace(self, name=''):
+        namespace = self._namespaces.get(name)
+        if namespace is None:
+            with self._lock:
+                namespace = self._namespaces.get(name)
+                if namespace is None:
+                    namespace = self._namespaces[name] = Namespace(name)
+        return namespace
+
+    def clear(self):
+        self._namespaces.clear()
+
+
+store = Store(getattr(settings, 'MS_STATEFUL_NAMESPACES', 100))
+
+
+def get_namespace(overrides):
+    """Returns the Namespace named by the `namespace` hook in stateful mode, or None."""
+    if not stateful_enabled():
+        return None
+    return store.get_namespace(overrides.get('namespace', ''))
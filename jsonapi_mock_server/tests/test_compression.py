@@ -0,0 +1,81 @@
+import gzip
+from StringIO import StringIO
+import unittest
+
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.compression import brotli, parse_accept_encoding
+from mock_server.response_cache import response_cache
+
+
+def gunzip(content):
+    return gzip.GzipFile(fileobj=StringIO(content)).read()
+
+
+class CompressionTests(MockServerBaseTestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.path = reverse("caterer-list") + "?length=20&page_size=20"
+        self.content = self.client.get(self.path).content
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding("gzip;q=0.5, br, *;q=0"), {'gzip': 0.5, 'br': 1.0, '*': 0.0})
+
+    def test_gzip(self):
+        response = self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gunzip(response.content), self.content)
+
+    def test_encoded_content_is_cached(self):
+        first = self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip")
+        second = self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(len(response_cache), 1)
+
+        plain = self.client.get(self.path)
+        self.assertNotEqual(first['ETag'], plain['ETag'])
+        self.assertEqual(self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip",
+                                         HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_not_accepted(self):
+        response = self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip;q=0, identity")
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, self.content)
+
+    @override_settings(MS_COMPRESSION_MIN_SIZE=1024 * 1024)
+    def test_min_size(self):
+        response = self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(MS_COMPRESSION_ENCODINGS=())
+    def test_disabled(self):
+        response = self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(MS_FAKER_POOL_REFRESH=60)
+    def test_uncached(self):
+        response = self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gunzip(response.content), self.content)
+
+    def test_streamed(self):
+        path = self.path + "&stream=1"
+        response = self.client.get(path, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gunzip(b''.join(response.streaming_content)),
+                         b''.join(self.client.get(path).streaming_content))
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_brotli(self):
+        response = self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), self.content)
+
+        path = self.path + "&stream=1"
+        response = self.client.get(path, HTTP_ACCEPT_ENCODING="br")
+        self.assertEqual(brotli.decompress(b''.join(response.streaming_content)),
+                         b''.join(self.client.get(path).streaming_content))
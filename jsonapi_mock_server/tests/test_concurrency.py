@@ -0,0 +1,94 @@
+from SocketServer import ThreadingMixIn
+import threading
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.core.urlresolvers import reverse
+from django.core.wsgi import get_wsgi_application
+import requests
+
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.fake import fake_attributes_cache
+from mock_server.response_cache import response_cache
+
+
+class ThreadedWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ConcurrentRequestTests(MockServerBaseTestCase):
+    num_threads = 8
+    requests_per_thread = 25
+
+    @classmethod
+    def setUpClass(cls):
+        super(ConcurrentRequestTests, cls).setUpClass()
+        cls.server = make_server('127.0.0.1', 0, get_wsgi_application(),
+                                 server_class=ThreadedWSGIServer, handler_class=QuietWSGIRequestHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever)
+        cls.server_thread.daemon = True
+        cls.server_thread.start()
+        cls.origin = "http://127.0.0.1:{}".format(cls.server.server_port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super(ConcurrentRequestTests, cls).tearDownClass()
+
+    def _run_concurrently(self, target):
+        errors = []
+
+        def run(thread_number):
+            try:
+                target(thread_number)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(x,)) for x in range(self.num_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_attribute_overrides_are_isolated(self):
+        detail_url = self.origin + reverse("caterer-detail", args=(1,))
+        expected_name = requests.get(detail_url).json()['data']['attributes']['name']
+
+        def target(thread_number):
+            session = requests.Session()
+            for x in range(self.requests_per_thread):
+                if thread_number % 2:
+                    name = "thread-{}-{}".format(thread_number, x)
+                    response = session.get(detail_url, params={"name": name})
+                else:
+                    name = expected_name
+                    response = session.get(detail_url)
+                actual_name = response.json()['data']['attributes']['name']
+                assert actual_name == name, "expected {!r}, got {!r}".format(name, actual_name)
+
+        errors = self._run_concurrently(target)
+        self.assertEqual(errors, [])
+
+    def test_seeded_fake_data_is_deterministic(self):
+        list_url = self.origin + reverse("caterer-list")
+        expected = requests.get(list_url, params={"length": 20, "page_size": 20}).json()['data']
+
+        def target(thread_number):
+            session = requests.Session()
+            for x in range(self.requests_per_thread):
+                resource_id = (thread_number + x) % 20 + 1
+                detail_url = self.origin + reverse("caterer-detail", args=(resource_id,))
+                # Regenerate instead of hitting the cache, so fakers run concurrently.
+                fake_attributes_cache.clear()
+                response_cache.clear()
+                actual = session.get(detail_url).json()['data']['attributes']
+                assert actual == expected[resource_id - 1]['attributes'], resource_id
+
+        errors = self._run_concurrently(target)
+        self.assertEqual(errors, [])
@@ -0,0 +1,81 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+from django.core.urlresolvers import reverse
+import requests
+
+from mock_server import evented
+from mock_server.base_tests import MockServerBaseTestCase
+
+try:
+    import gevent
+except ImportError:
+    gevent = None
+
+
+def get_free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+@unittest.skipIf(gevent is None, "gevent is not installed")
+class EventedServerTests(MockServerBaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super(EventedServerTests, cls).setUpClass()
+        port = get_free_port()
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        cls.server = subprocess.Popen([sys.executable, '-m', evented.__name__, '--port', str(port), '--no-access-log'],
+                                      env=env)
+        cls.host = "127.0.0.1:{}".format(port)
+        cls.origin = "http://" + cls.host
+
+        for x in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port)).close()
+                break
+            except socket.error:
+                time.sleep(0.1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait()
+        super(EventedServerTests, cls).tearDownClass()
+
+    def assertSameResponse(self, url, params=None):
+        expected = self.client.get(url, params or {}, HTTP_HOST=self.host)
+        actual = requests.get(self.origin + url, params=params)
+
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.headers['Content-Type'], expected['Content-Type'])
+        content = b''.join(expected.streaming_content) if expected.streaming else expected.content
+        self.assertEqual(actual.content, content)
+
+    def test_detail(self):
+        self.assertSameResponse(reverse("caterer-detail", args=(1,)), {"include": "dishes"})
+
+    def test_list(self):
+        self.assertSameResponse(reverse("caterer-list"), {"length": 30, "page_size": 15, "page": 2})
+
+    def test_streamed_list(self):
+        self.assertSameResponse(reverse("caterer-list"), {"length": 2000, "page_size": 2000, "stream": 1})
+
+    def test_delays_dont_block_other_requests(self):
+        url = self.origin + reverse("caterer-detail", args=(1,))
+        threads = [threading.Thread(target=requests.get, args=(url,), kwargs={"params": {"latency": 300}})
+                   for x in range(10)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLess(time.time() - start, 1.5)
@@ -0,0 +1,168 @@
+import random
+import threading
+
+from django.core.urlresolvers import reverse
+from django.test import override_settings
+
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.cache import LRUCache
+from mock_server import fake
+from mock_server.fake import (
+    BaseFaker, ChoiceFaker, FakerValuePool, IntFaker, NullableBaseFaker, NullableBooleanFaker, NullableIntFaker,
+    StringFaker, row_counters, row_seeds, seeded_random
+)
+from resources.caterer import CatererResource
+
+
+class LegacyFaker(BaseFaker):
+    def generate_value(self):
+        return random.randint(0, 1000000)
+
+
+class NullableLegacyFaker(NullableBaseFaker, LegacyFaker):
+    pass
+
+
+class LegacyCatererResource(CatererResource):
+    fake_attributes = {'rating': LegacyFaker(), 'score': NullableLegacyFaker()}
+
+
+class SeededFakerTests(MockServerBaseTestCase):
+    def test_seeded_random__same_key(self):
+        faker = IntFaker(0, 1000000)
+        self.assertEqual(faker.generate_value(seeded_random('Caterer', 1)),
+                         faker.generate_value(seeded_random('Caterer', 1)))
+
+    def test_string_faker__seeded(self):
+        faker = StringFaker('name')
+        self.assertEqual(faker.generate_value(seeded_random('Caterer', 1, 5)),
+                         faker.generate_value(seeded_random('Caterer', 1, 5)))
+
+    def test_nullable_faker__seeded(self):
+        faker = NullableIntFaker(0, 1000000)
+        values = [faker.generate_value(seeded_random('Caterer', x)) for x in range(20)]
+        self.assertEqual(values, [faker.generate_value(seeded_random('Caterer', x)) for x in range(20)])
+
+    def test_call_faker_provider__threads(self):
+        expected = [fake.call_faker_provider('name', seed) for seed in range(50)]
+        results = []
+
+        def generate():
+            results.append([fake.call_faker_provider('name', seed) for seed in range(50)])
+
+        threads = [threading.Thread(target=generate) for x in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [expected] * 4)
+
+    def test_detail__same_data_for_same_id(self):
+        path = reverse("caterer-detail", args=(7,))
+        first = self.get_json(self.client.get(path))
+        second = self.get_json(self.client.get(path))
+        self.assertEqual(first['data']['attributes'], second['data']['attributes'])
+
+    def test_list__same_data_as_detail(self):
+        detail_path = reverse("caterer-detail", args=(7,))
+        list_path = reverse("caterer-list") + "?length=10"
+        detail = self.get_json(self.client.get(detail_path))
+        resource_list = self.get_json(self.client.get(list_path))
+        self.assertEqual(resource_list['data'][6]['attributes'], detail['data']['attributes'])
+
+
+class BatchFakerTests(MockServerBaseTestCase):
+    def test_generate_values__independent_of_batch(self):
+        resource_ids = range(1, 201)
+        for faker in (IntFaker(0, 100), NullableIntFaker(0, 100), NullableBooleanFaker(), ChoiceFaker("abc")):
+            batch = faker.generate_values(row_seeds(42, row_counters(resource_ids)))
+            single = [faker.generate_values(row_seeds(42, row_counters([resource_id])))[0]
+                      for resource_id in resource_ids]
+            self.assertEqual(batch, single)
+
+    def test_get_seeded_fake_attributes_list(self):
+        resource = CatererResource()
+        attributes_list = resource.get_seeded_fake_attributes_list(range(1, 101))
+        self.assertEqual(len(attributes_list), 100)
+        self.assertEqual(attributes_list[6], resource.get_seeded_fake_attributes(7))
+
+
+    def test_legacy_generate_value(self):
+        resource_ids = range(1, 51)
+        for faker in (LegacyFaker(), NullableLegacyFaker()):
+            batch = faker.generate_values(row_seeds(42, row_counters(resource_ids)))
+            self.assertEqual(batch, faker.generate_values(row_seeds(42, row_counters(resource_ids))))
+            self.assertEqual(batch, [faker.generate_values(row_seeds(42, row_counters([resource_id])))[0]
+                                     for resource_id in resource_ids])
+            self.assertGreater(len(set(batch)), 2)
+
+    def test_legacy_generate_value__resource(self):
+        resource = LegacyCatererResource()
+        attributes_list = resource.get_seeded_fake_attributes_list(range(1, 21))
+        self.assertEqual(attributes_list[6], resource.get_seeded_fake_attributes(7))
+        self.assertEqual(resource.get_fake_attributes(seeded_random('Caterer', 1)),
+                         resource.get_fake_attributes(seeded_random('Caterer', 1)))
+
+
+class FakerValuePoolTests(MockServerBaseTestCase):
+    def tearDown(self):
+        fake.faker_pools.clear()
+
+    def test_build__same_values(self):
+        self.assertEqual(FakerValuePool('name', 10).build().values, FakerValuePool('name', 10).build().values)
+
+    def test_string_faker__samples_pool(self):
+        pool = fake.faker_pools['name'] = FakerValuePool('name', 10).build()
+        values = StringFaker('name').generate_values(row_seeds(42, row_counters(range(100))))
+        self.assertTrue(set(values) <= set(pool.values))
+
+    @override_settings(MS_FAKER_POOLS={'name': 200})
+    def test_get_faker_pool__built_once(self):
+        builds = []
+        build = FakerValuePool.build
+
+        def counted_build(pool):
+            builds.append(pool)
+            return build(pool)
+
+        start = threading.Event()
+        pools = []
+
+        def get_pool():
+            start.wait()
+            pools.append(fake.get_faker_pool('name'))
+
+        threads = [threading.Thread(target=get_pool) for x in range(8)]
+        FakerValuePool.build = counted_build
+        try:
+            for thread in threads:
+                thread.start()
+            start.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            FakerValuePool.build = build
+
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(set(pools), set(builds))
+
+
+class LRUCacheTests(MockServerBaseTestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache['a']
+        cache['c'] = 3
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_sizeof(self):
+        cache = LRUCache(maxsize=10, sizeof=len)
+        cache['a'] = 'aaaa'
+        cache['b'] = 'bbbb'
+        cache['c'] = 'cccc'
+        cache['d'] = 'd' * 11
+        self.assertEqual(sorted(cache._items), ['b', 'c'])
+        self.assertEqual(cache.currsize, 8)
@@ -0,0 +1,85 @@
+import json
+
+from django.core.urlresolvers import reverse
+from django.core.wsgi import get_wsgi_application
+from django.test import RequestFactory
+
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.fast_path import FastPathApplication
+
+
+class FastPathApplicationTests(MockServerBaseTestCase):
+    def setUp(self):
+        self.django_application = get_wsgi_application()
+        self.application = FastPathApplication(fallback=self.django_application)
+        self.factory = RequestFactory()
+
+    def call(self, application, environ):
+        started = {}
+
+        def start_response(status, headers):
+            started['status'] = status
+            started['headers'] = headers
+
+        content = b''.join(application(dict(environ), start_response))
+        return started['status'], sorted(started['headers']), content
+
+    def assertSameResponse(self, method, path, data=None, **extra):
+        kwargs = dict(extra)
+        if data is not None:
+            kwargs.update(data=json.dumps(data), content_type="application/vnd.api+json")
+
+        request = getattr(self.factory, method)(path, **kwargs)
+        expected = self.call(self.django_application, request.environ)
+        request = getattr(self.factory, method)(path, **kwargs)
+        actual = self.call(self.application, request.environ)
+
+        self.assertEqual(actual, expected)
+
+    def test_list(self):
+        path = reverse("caterer-list") + "?length=30&page_size=15&page=2&include=dishes"
+        self.assertSameResponse('get', path)
+
+    def test_streamed_list(self):
+        self.assertSameResponse('get', reverse("caterer-list") + "?length=100&stream=1")
+
+    def test_detail(self):
+        self.assertSameResponse('get', reverse("caterer-detail", args=(1,)) + "?include=dishes&name=foo")
+
+    def test_header_hooks(self):
+        self.assertSameResponse('get', reverse("caterer-list"), HTTP_MS_LENGTH=3, HTTP_MS_SEED=7)
+
+    def test_status_hook(self):
+        self.assertSameResponse('get', reverse("caterer-detail", args=(1,)) + "?status=404")
+
+    def test_create(self):
+        data = {"data": {"type": "Caterer", "attributes": {"name": "foo"}}}
+        self.assertSameResponse('post', reverse("caterer-list"), data=data)
+
+    def test_partial_update(self):
+        data = {"data": {"type": "Caterer", "id": "1", "attributes": {"name": "foo"}}}
+        self.assertSameResponse('patch', reverse("caterer-detail", args=(1,)), data=data)
+
+    def test_destroy(self):
+        self.assertSameResponse('delete', reverse("caterer-detail", args=(1,)))
+
+    def test_options(self):
+        self.assertSameResponse('options', reverse("caterer-list"))
+        self.assertSameResponse('options', reverse("caterer-detail", args=(1,)))
+
+    def test_preflight_falls_back_to_django(self):
+        preflights = []
+
+        def fallback(environ, start_response):
+            preflights.append(environ['PATH_INFO'])
+            return self.django_application(environ, start_response)
+
+        self.application = FastPathApplication(fallback=fallback)
+        self.assertSameResponse('options', reverse("caterer-list"), HTTP_ORIGIN='http://localhost:3000',
+                                HTTP_ACCESS_CONTROL_REQUEST_METHOD='POST')
+        self.assertEqual(preflights, [reverse("caterer-list")])
+
+    def test_falls_back_to_django(self):
+        self.assertSameResponse('put', reverse("caterer-detail", args=(1,)))
+        self.assertSameResponse('get', reverse("caterer-list") + "/")
+        self.assertSameResponse('get', "/unknown")
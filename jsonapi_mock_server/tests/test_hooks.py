@@ -2,7 +2,9 @@ from django.core.urlresolvers import reverse
 from django.test import RequestFactory
 
 from mock_server.base_tests import MockServerBaseTestCase
-from mock_server.hooks import BaseHookParser, HeadersHookParser, QueryStringHookParser, MockServerHookParser
+from mock_server.hooks import (
+    BaseHookParser, HeadersHookParser, QueryStringHookParser, MockServerHookParser, Overrides
+)
 from resources.caterer import CatererViewSet, CatererResource
 
 
@@ -244,3 +246,43 @@ class MockServerHookParserTests(MockServerBaseTestCase):
         response_json = self.get_json(response)
         for k,v in attributes.iteritems():
             self.assertEqual(response_json['data']['attributes'][k], v)
+
+
+class HookSchemaTests(MockServerBaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super(HookSchemaTests, cls).setUpClass()
+        cls.factory = RequestFactory()
+
+    def setUp(self):
+        self.attributes = CatererViewSet().attributes
+        self.path = reverse("caterer-detail", args=(1,)) + "?length=5&name=abc&fields[dishes]=name"
+
+    def test_overrides_are_memoized(self):
+        first = MockServerHookParser(self.factory.get(self.path, HTTP_MS_SEED=1), self.attributes).parse_hooks()
+        second = MockServerHookParser(self.factory.get(self.path, HTTP_MS_SEED=1), self.attributes).parse_hooks()
+        self.assertIs(first, second)
+        self.assertEqual(first, {"length": 5, "seed": 1, "attributes": {"name": "abc"},
+                                 "fields": {"Dish": frozenset(["name"])}})
+
+        other = MockServerHookParser(self.factory.get(self.path, HTTP_MS_SEED=2), self.attributes).parse_hooks()
+        self.assertEqual(other['seed'], 2)
+
+    def test_query_string_takes_precedence(self):
+        request = self.factory.get(self.path, HTTP_MS_LENGTH=10, HTTP_MS_FAKE=0)
+        overrides = MockServerHookParser(request, self.attributes).parse_hooks()
+        self.assertEqual(overrides['length'], 5)
+        self.assertIs(overrides['fake'], False)
+
+    def test_overrides_are_immutable(self):
+        overrides = Overrides(length=5)
+        with self.assertRaises(AttributeError):
+            overrides.length = 10
+        with self.assertRaises(TypeError):
+            overrides['length'] = 10
+        self.assertFalse(hasattr(overrides, '__dict__'))
+
+        replaced = overrides.replace(status=404, length=None)
+        self.assertEqual(replaced, {"status": 404})
+        self.assertEqual(overrides, {"length": 5})
+        self.assertFalse(Overrides())
@@ -0,0 +1,54 @@
+import json
+
+from django.core.urlresolvers import reverse
+
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.includes import IncludeResolver, include_resolver
+
+
+class IncludeResolverTests(MockServerBaseTestCase):
+    def get_included(self, path):
+        included = self.get_json(self.client.get(path)).get('included', [])
+        return [(resource_object['type'], resource_object['id']) for resource_object in included]
+
+    def test_compile(self):
+        plan = include_resolver.compile("Caterer", "dishes.caterer,dishes,delivery_fees,unknown.dishes")
+        self.assertEqual(plan, (
+            (('dishes',), (), 'dishes', 'Dish'),
+            (('dishes', 'caterer'), ('dishes',), 'caterer', 'Caterer'),
+            (('deliveryFees',), (), 'deliveryFees', 'DeliveryFee'),
+        ))
+
+    def test_plan_is_cached(self):
+        self.assertIs(include_resolver.get_plan("Caterer", "dishes"), include_resolver.get_plan("Caterer", "dishes"))
+
+    def test_plans_are_bounded(self):
+        resolver = IncludeResolver(max_plans=2)
+        for include in ("dishes", "dishes,dishes", " dishes", "dishes.caterer"):
+            resolver.get_plan("Caterer", include)
+        self.assertEqual(len(resolver._plans), 2)
+
+    def test_each_object_included_once(self):
+        path = reverse("caterer-detail", args=(1,)) + "?include=dishes,dishes.caterer,dishes&fake=0"
+        self.assertEqual(self.get_included(path), [('Dish', '3'), ('Dish', '4'), ('Caterer', '22')])
+
+    def test_nested_ids_resolved_from_their_parents(self):
+        path = reverse("dish-detail", args=(3,)) + "?include=caterer.deliveryFees,caterer.dishes&fake=0"
+        self.assertEqual(self.get_included(path), [
+            ('Caterer', '22'), ('DeliveryFee', '1'), ('DeliveryFee', '2'), ('Dish', '4')
+        ])
+
+    def test_primary_data_not_included(self):
+        path = reverse("caterer-detail", args=(1,)) + "?include=deliveryFees.caterer&fake=0"
+        self.assertEqual(self.get_included(path), [('DeliveryFee', '1'), ('DeliveryFee', '2')])
+
+    def test_list(self):
+        path = reverse("caterer-list") + "?include=dishes.caterer&length=30&page_size=20"
+        self.assertEqual(self.get_included(path), [('Dish', '3'), ('Dish', '4'), ('Caterer', '22')])
+        self.assertEqual(self.get_included(path + "&page=2"), [('Dish', '3'), ('Dish', '4')])
+
+    def test_streamed_list(self):
+        path = reverse("caterer-list") + "?include=dishes.caterer,deliveryFees&length=20&page_size=20"
+        response = self.client.get(path + "&stream=1")
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed['included'], self.get_json(self.client.get(path))['included'])
@@ -1,8 +1,11 @@
 import json
 
 from django.core.urlresolvers import reverse
+from django.test import RequestFactory
 
 from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.encoding import dumps
+from mock_server.json_api_builder import JsonAPIResourceListBuilder, JsonAPIResourceTemplate, ResourceListFragment
 
 
 class JsonApiBuilderTests(MockServerBaseTestCase):
@@ -142,3 +145,100 @@ class JsonApiBuilderTests(MockServerBaseTestCase):
 
         self.assertEqual(expected_self_link, actual_self_link)
         self.assertEqual(expected_rel_link, actual_rel_link)
+
+    def test_resource_list__fake_disabled(self):
+        length = 3
+        path = reverse("caterer-list") + "?length={}&fake=0".format(length)
+        response = self.client.get(path)
+        response_json = self.get_json(response)
+        self.assertEqual([obj['id'] for obj in response_json['data']], ['1', '2', '3'])
+        self.assertEqual(response_json['data'][1]['links']['self'], "http://None/caterers/2")
+        self.assertEqual(response_json['data'][0]['attributes'], response_json['data'][2]['attributes'])
+
+    def test_resource_list__stream(self):
+        length = 12
+        page_size = 10
+        path = reverse("caterer-list") + "?length={}&page_size={}&stream=1".format(length, page_size)
+        response = self.client.get(path)
+        self.assertTrue(response.streaming)
+        response_json = json.loads(b''.join(response.streaming_content).decode())
+        self.assertEqual(len(response_json['data']), page_size)
+        self.assertEqual(response_json['meta']['pagination']['count'], length)
+
+    def test_page__meta_page(self):
+        path = reverse("caterer-list") + "?length=30&page_size=10&page=2"
+        response = self.client.get(path)
+        response_json = self.get_json(response)
+        self.assertEqual(response_json['meta']['pagination']['page'], 2)
+
+    def test_page__large_length(self):
+        path = reverse("caterer-list") + "?length=5000000000&page_size=10&page=400000000"
+        response = self.client.get(path)
+        response_json = self.get_json(response)
+        self.assertEqual(len(response_json['data']), 10)
+        self.assertEqual(response_json['data'][0]['id'], '3999999991')
+
+    def test_resource_list_filter_id_in__paginated(self):
+        qs = "?filter[id__in]=4,5,6,7,8&page_size=2&page=3"
+        path = reverse("caterer-list") + qs
+        response = self.client.get(path)
+        response_json = self.get_json(response)
+        self.assertEqual(response_json['meta']['pagination']['count'], 5)
+        self.assertEqual([obj['id'] for obj in response_json['data']], ['8'])
+
+    def test_page_cursor__links(self):
+        path = reverse("caterer-list") + "?length=25&page_size=10&page[cursor]=MTA"
+        response = self.client.get(path)
+        response_json = self.get_json(response)
+        self.assertEqual(int(response_json['data'][0]['id']), 11)
+        self.assertEqual(response_json['links']['next'], "http://None/caterers?page[cursor]=MjA")
+        self.assertEqual(response_json['links']['prev'], "http://None/caterers?page[cursor]=MA")
+
+    def test_templates_are_bounded(self):
+        templates = JsonAPIResourceTemplate._templates
+        maxsize = templates.maxsize
+        templates.clear()
+        templates.maxsize = 2
+        try:
+            for x in range(5):
+                self.client.get(reverse("caterer-detail", args=(1,)), HTTP_HOST="host{}.example.com".format(x))
+            self.assertEqual(len(templates), 2)
+        finally:
+            templates.maxsize = maxsize
+            templates.clear()
+
+    def test_built_objects_share_nothing(self):
+        template = JsonAPIResourceTemplate("Caterer", "http://testserver")
+        template.default_attributes = dict(template.default_attributes, tags=["a"])
+
+        first = template.build(1, template.build_attributes(None, 1))
+        first['relationships']['dishes']['data'].append({"type": "Dish", "id": "5"})
+        first['relationships']['dishes']['data'][0]['id'] = "6"
+        first['relationships']['dishes']['meta']['count'] = 3
+        first['attributes']['tags'].append("b")
+
+        second = template.build(7, template.build_attributes(None, 7))
+        self.assertEqual(second['relationships']['dishes']['data'],
+                         [{"type": "Dish", "id": "3"}, {"type": "Dish", "id": "4"}])
+        self.assertEqual(second['relationships']['dishes']['meta'], {"count": 2})
+        self.assertEqual(second['attributes']['tags'], ["a"])
+
+        listed = list(ResourceListFragment(template, [1, 2], template.split_attributes(None)[0]))
+        listed[0]['attributes']['tags'].append("c")
+        self.assertEqual(listed[1]['attributes']['tags'], ["a"])
+
+    def test_list_data_is_a_list(self):
+        request = RequestFactory().get(reverse("caterer-list"))
+        for config in (None, {"fake": False}):
+            document = JsonAPIResourceListBuilder(request, "Caterer", 5, 20, config=config).build_resource_list_object()
+            expected = json.loads(dumps(document))['data']
+            self.assertEqual(document['data'][0], expected[0])
+            self.assertEqual([resource_object['id'] for resource_object in document['data'][1:3]], ['2', '3'])
+
+            document['data'][0]['attributes']['name'] = "Changed"
+            del document['data'][4]
+            document['data'].append({"type": "Caterer", "id": "99"})
+            data = json.loads(dumps(document))['data']
+            self.assertEqual(data[0]['attributes']['name'], "Changed")
+            self.assertEqual(data[1:4], expected[1:4])
+            self.assertEqual([resource_object['id'] for resource_object in data], ['1', '2', '3', '4', '99'])
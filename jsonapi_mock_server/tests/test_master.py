@@ -0,0 +1,120 @@
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+import json
+import socket
+from SocketServer import ThreadingMixIn
+from StringIO import StringIO
+import threading
+import time
+import unittest
+
+from django.test import Client
+
+from mock_server import base_tests
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.master import MasterClient
+from resources.caterer import CatererViewSet
+from resources.delivery_fee import DeliveryFeeViewSet
+from resources.dish import DishViewSet
+
+
+class StandInMasterHandler(BaseHTTPRequestHandler):
+    """Serves the mock server's responses slowly, without resource 1, like a remote master would."""
+    protocol_version = 'HTTP/1.1'
+    delay = 0.2
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+            self.server.sockets.append(self.connection)
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append(self.path)
+        time.sleep(self.delay)
+
+        if self.path.endswith('/1'):
+            status, content = 404, {"errors": [{"detail": "Not found."}]}
+        else:
+            status, content = 200, json.loads(Client().get(self.path).content)
+            if isinstance(content['data'], list):
+                content['data'][0]['id'] = '5'
+
+        body = json.dumps(content)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/vnd.api+json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInMasterServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StandInMasterHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.sockets = []
+        self.requests = []
+
+    def server_close(self):
+        HTTPServer.server_close(self)
+        # Ends the handler threads waiting for more requests on kept-alive connections.
+        with self.lock:
+            for connection in self.sockets:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except socket.error:
+                    pass
+
+
+class MasterFetchingTests(MockServerBaseTestCase):
+    def setUp(self):
+        self.server = StandInMasterServer()
+        self.origin = "http://127.0.0.1:{}".format(self.server.server_address[1])
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_prefetch(self):
+        client = MasterClient("token", max_workers=4)
+        urls = ["{}/caterers?length={}".format(self.origin, length) for length in range(10, 18)]
+        start = time.time()
+        client.prefetch(urls)
+        self.assertLess(time.time() - start, 0.2 * 8 / 2)
+
+        requests_made = len(self.server.requests)
+        self.assertEqual(client.get(urls[0]).json()['data'][0]['id'], '5')
+        self.assertEqual(len(self.server.requests), requests_made)
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_contract_suite(self):
+        origin = self.origin
+
+        class ContractTests(base_tests.TestJsonResponses):
+            auth_token = "offline-{}".format(origin)
+            master_origin = origin
+
+        test_classes = [type(viewset.__name__ + 'ContractTests', (ContractTests,), {'viewset': viewset})
+                        for viewset in (CatererViewSet, DishViewSet, DeliveryFeeViewSet)]
+        suite = unittest.TestSuite(unittest.defaultTestLoader.loadTestsFromTestCase(test_class)
+                                   for test_class in test_classes)
+
+        start = time.time()
+        result = unittest.TextTestRunner(stream=StringIO()).run(suite)
+        elapsed = time.time() - start
+
+        self.assertTrue(result.wasSuccessful(), result.errors + result.failures)
+        self.assertEqual(result.testsRun, 9)
+        # Details of resource 1 and lists, then details of the first listed resources.
+        self.assertEqual(len(self.server.requests), 9)
+        self.assertLess(elapsed, 0.2 * 9 / 2)
+        self.assertLess(self.server.connections, 9)
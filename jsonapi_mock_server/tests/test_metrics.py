@@ -0,0 +1,90 @@
+import threading
+import time
+
+from django.core.urlresolvers import reverse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.metrics import Metrics, metrics, metrics_view
+from mock_server.response_cache import response_cache
+
+
+class MetricsTests(MockServerBaseTestCase):
+    def setUp(self):
+        metrics.clear()
+        response_cache.clear()
+
+    def get_metrics(self):
+        response = metrics_view(RequestFactory().get('/__ms/metrics'))
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.splitlines()
+
+    def test_requests(self):
+        list_path = reverse("caterer-list") + "?length=20&page_size=5&include=dishes"
+        self.client.get(list_path)
+        self.client.get(list_path)
+        self.client.get(reverse("caterer-detail", args=(1,)) + "?status=404")
+
+        lines = self.get_metrics()
+        self.assertIn('ms_requests_total{resource="Caterer",action="list",status="200"} 2', lines)
+        self.assertIn('ms_requests_total{resource="Caterer",action="retrieve",status="404"} 1', lines)
+        self.assertIn('ms_hook_requests_total{resource="Caterer",hook="length"} 2', lines)
+        self.assertIn('ms_hook_requests_total{resource="Caterer",hook="include"} 2', lines)
+        self.assertIn('ms_hook_requests_total{resource="Caterer",hook="status"} 1', lines)
+        self.assertIn('ms_request_duration_seconds_count{resource="Caterer",action="list"} 2', lines)
+        self.assertIn('ms_response_bytes_bucket{resource="Caterer",action="list",le="+Inf"} 2', lines)
+
+        # 5 caterers and 2 dishes, generated for the first request only.
+        self.assertIn('ms_generated_objects_sum{resource="Caterer",action="list"} 7', lines)
+        self.assertIn('ms_cache_hits_total{cache="response"} 1', lines)
+        self.assertIn('ms_cache_misses_total{cache="response"} 2', lines)
+
+    @override_settings(MS_METRICS=False)
+    def test_disabled(self):
+        self.client.get(reverse("caterer-list"))
+        self.assertEqual(metrics.collect(), {})
+
+    def test_shards_are_summed(self):
+        shards = Metrics()
+
+        def record():
+            for x in range(100):
+                shards.increment('ms_requests_total', ('Caterer', 'list', '200'))
+                shards.observe('ms_generated_objects', ('Caterer', 'list'), 10)
+
+        threads = [threading.Thread(target=record) for x in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        totals = shards.collect()
+        self.assertEqual(totals[('ms_requests_total', ('Caterer', 'list', '200'))], 400)
+        histogram = totals[('ms_generated_objects', ('Caterer', 'list'))]
+        self.assertEqual((histogram[2], histogram[-1]), (400, 4000))
+
+    def test_shards_of_ended_threads_are_merged(self):
+        shards = Metrics()
+
+        def record():
+            shards.increment('ms_requests_total', ('Caterer', 'list', '200'))
+
+        for x in range(20):
+            thread = threading.Thread(target=record)
+            thread.start()
+            thread.join()
+
+        # A thread's local storage is released just after join returns.
+        deadline = time.time() + 5
+        while len(shards._shards) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(shards._shards), 0)
+        self.assertEqual(shards.collect(), {('ms_requests_total', ('Caterer', 'list', '200')): 20})
+
+    def test_clear(self):
+        shards = Metrics()
+        shards.increment('ms_requests_total', ('Caterer', 'list', '200'))
+        shards.clear()
+        shards.increment('ms_requests_total', ('Caterer', 'list', '200'), 2)
+        self.assertEqual(shards.collect(), {('ms_requests_total', ('Caterer', 'list', '200')): 2})
@@ -0,0 +1,41 @@
+import json
+
+from django.core.urlresolvers import reverse
+from django.test import Client, override_settings
+
+from mock_server.base_metadata import MockServerMetadata, get_options_document
+from mock_server.base_tests import MockServerBaseTestCase
+from resources.caterer import CatererViewSet
+
+
+class OptionsTests(MockServerBaseTestCase):
+    def test_document(self):
+        response = self.client.options(reverse("caterer-detail", args=(1,)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+        view = CatererViewSet(suffix='Instance')
+        expected = json.loads(json.dumps(MockServerMetadata().determine_metadata(None, view)))
+        self.assertEqual(self.get_json(response), expected)
+        self.assertEqual(self.get_json(response)['data']['name'], 'Caterer Instance')
+        self.assertEqual(self.get_json(self.client.options(reverse("caterer-list")))['data']['name'], 'Caterer List')
+
+    def test_document_is_built_once(self):
+        content, content_type = get_options_document(CatererViewSet(suffix='List'))
+        self.assertIs(get_options_document(CatererViewSet(suffix='List'))[0], content)
+        self.assertEqual(self.client.options(reverse("caterer-list")).content, content)
+
+    def test_preflight(self):
+        cors_settings = dict(MIDDLEWARE_CLASSES=['corsheaders.middleware.CorsMiddleware'], CORS_ORIGIN_ALLOW_ALL=True,
+                             CORS_PREFLIGHT_MAX_AGE=600)
+        with override_settings(**cors_settings):
+            client = Client()
+            path = reverse("caterer-detail", args=(1,))
+            response = client.options(path, HTTP_ORIGIN='http://localhost:3000',
+                                      HTTP_ACCESS_CONTROL_REQUEST_METHOD='PATCH')
+            self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+            self.assertEqual(response['Access-Control-Max-Age'], '600')
+
+            response = client.get(path, HTTP_ORIGIN='http://localhost:3000')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Access-Control-Allow-Origin'], '*')
@@ -0,0 +1,40 @@
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.registry import ResourceRegistry
+from resources.caterer import CatererResource
+
+
+class ResourceRegistryTests(MockServerBaseTestCase):
+    def setUp(self):
+        self.registry = ResourceRegistry()
+
+    def test_get__all_name_forms_share_instance(self):
+        instance = self.registry.get("Caterer")
+        for name in ("caterer", "caterers", "Caterers"):
+            self.assertIs(self.registry.get(name), instance)
+
+    def test_get__returns_resource_instance(self):
+        instance = self.registry.get("Caterer")
+        self.assertEqual(instance.__class__.__name__, CatererResource.__name__)
+
+    def test_get__unknown_resource(self):
+        with self.assertRaises(LookupError):
+            self.registry.get("NotAResource")
+
+    def test_contains(self):
+        self.assertIn("caterers", self.registry)
+        self.assertNotIn("NotAResource", self.registry)
+
+    def test_get__returns_read_only_instance(self):
+        instance = self.registry.get("Caterer")
+        with self.assertRaises(AttributeError):
+            instance.attributes = {}
+        with self.assertRaises(TypeError):
+            instance.attributes["name"] = "Changed"
+        with self.assertRaises(TypeError):
+            instance.fake_attributes.pop("name")
+        with self.assertRaises(AttributeError):
+            instance.relationships.append(("dishes", 1))
+
+        attributes = instance.get_attributes()
+        attributes["name"] = "Changed"
+        self.assertEqual(instance.attributes["name"], CatererResource.attributes["name"])
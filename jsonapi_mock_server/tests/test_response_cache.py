@@ -0,0 +1,68 @@
+import json
+
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.response_cache import response_cache
+
+
+class ResponseCacheTests(MockServerBaseTestCase):
+    def setUp(self):
+        response_cache.clear()
+
+    def test_etag_and_cache_control(self):
+        response = self.client.get(reverse("caterer-detail", args=(1,)))
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+    def test_cached(self):
+        path = reverse("caterer-list")
+        first = self.client.get(path + "?length=5&seed=3")
+        second = self.client.get(path + "?seed=3&length=5")
+        self.assertEqual(len(response_cache), 1)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(second['Content-Type'], "application/vnd.api+json")
+
+    def test_hook_headers_are_part_of_the_key(self):
+        path = reverse("caterer-list")
+        first = self.client.get(path, HTTP_MS_LENGTH=2)
+        second = self.client.get(path, HTTP_MS_LENGTH=3)
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(len(self.get_json(second)['data']), 3)
+
+    def test_not_modified(self):
+        path = reverse("caterer-detail", args=(1,))
+        etag = self.client.get(path)['ETag']
+
+        response = self.client.get(path, HTTP_IF_NONE_MATCH='"other", W/{}'.format(etag))
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(path, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_writes_bypass_cache(self):
+        data = json.dumps({"data": {"type": "Caterer", "id": "1", "attributes": {"name": "foo"}}})
+        response = self.client.patch(reverse("caterer-detail", args=(1,)), data=data,
+                                     content_type="application/vnd.api+json")
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(len(response_cache), 0)
+
+    def test_status_hook_bypasses_cache(self):
+        response = self.client.get(reverse("caterer-detail", args=(1,)) + "?status=404")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+    @override_settings(MS_FAKER_POOL_REFRESH=60)
+    def test_non_deterministic_bypasses_cache(self):
+        path = reverse("caterer-detail", args=(1,))
+        self.assertFalse(self.client.get(path).has_header('ETag'))
+        self.assertTrue(self.client.get(path + "?fake=0").has_header('ETag'))
+
+    @override_settings(MS_RESPONSE_CACHE_CONTROL='max-age=60')
+    def test_cache_control_setting(self):
+        response = self.client.get(reverse("caterer-detail", args=(1,)))
+        self.assertEqual(response['Cache-Control'], 'max-age=60')
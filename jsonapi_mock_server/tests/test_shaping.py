@@ -0,0 +1,71 @@
+import random
+import time
+
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.hooks import parse_latency
+from mock_server.response_cache import response_cache
+from mock_server.shaping import get_shaping_defaults, sample_latency, throttle
+from resources.caterer import CatererViewSet
+
+
+class ShapingTests(MockServerBaseTestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.path = reverse("caterer-list") + "?length=20&page_size=20"
+
+    def test_parse_latency(self):
+        self.assertEqual(parse_latency("200"), ('fixed', 200, 200))
+        self.assertEqual(parse_latency("lognormal:100,800"), ('lognormal', 100, 800))
+        self.assertEqual(parse_latency("normal:100,300"), ('normal', 100, 300))
+        for invalid in ("slow", "normal:300,100", "lognormal:0,100", "uniform:1,2", "-5"):
+            self.assertIsNone(parse_latency(invalid))
+
+    def test_sample_latency_percentiles(self):
+        rng = random.Random(1)
+        for latency in (('normal', 100, 300), ('lognormal', 100, 800)):
+            samples = sorted(sample_latency(latency, rng) for x in range(20000))
+            self.assertAlmostEqual(samples[10000], 0.1, delta=0.01)
+            self.assertAlmostEqual(samples[19800] / (latency[2] / 1000.0), 1, delta=0.1)
+
+    def test_latency(self):
+        start = time.time()
+        response = self.client.get(self.path + "&latency=100")
+        self.assertGreaterEqual(time.time() - start, 0.1)
+        self.assertEqual(response.status_code, 200)
+
+    def test_throttle(self):
+        start = time.time()
+        chunks = list(throttle(['a' * 1000, 'b' * 1000], bytes_per_second=10000, interval=0.01))
+        self.assertGreaterEqual(time.time() - start, 0.19)
+        self.assertEqual(''.join(chunks), 'a' * 1000 + 'b' * 1000)
+        self.assertEqual(max(len(chunk) for chunk in chunks), 100)
+
+    def test_bandwidth(self):
+        content = self.client.get(self.path).content
+        response = self.client.get(self.path, HTTP_MS_BANDWIDTH=len(content) * 5)
+        self.assertEqual(int(response['Content-Length']), len(content))
+        start = time.time()
+        self.assertEqual(b''.join(response.streaming_content), content)
+        self.assertGreaterEqual(time.time() - start, 0.15)
+
+    @override_settings(MS_ERROR_RATE_STATUS=503)
+    def test_error_rate(self):
+        self.assertEqual(self.client.get(self.path + "&error_rate=1").status_code, 503)
+        self.assertEqual(self.client.get(self.path + "&error_rate=0").status_code, 200)
+
+    def test_resource_defaults(self):
+        class ShapedCatererViewSet(CatererViewSet):
+            shaping = {'latency': 'lognormal:50,400', 'error_rate': 0.5}
+
+        self.assertEqual(get_shaping_defaults(ShapedCatererViewSet),
+                         {'latency': ('lognormal', 50, 400), 'error_rate': 0.5})
+        self.assertEqual(get_shaping_defaults(CatererViewSet), {})
+
+        class InvalidViewSet(CatererViewSet):
+            shaping = {'bandwidth': 'fast'}
+
+        with self.assertRaises(ValueError):
+            get_shaping_defaults(InvalidViewSet)
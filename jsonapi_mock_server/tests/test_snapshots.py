@@ -0,0 +1,128 @@
+import os
+import shutil
+from StringIO import StringIO
+import tempfile
+import threading
+import unittest
+
+from django.test import override_settings
+
+from mock_server import base_tests
+from mock_server.fake import IntFaker, StringFaker
+from mock_server.snapshots import SnapshotResponse, SnapshotStore, get_definition_hash
+from mock_server.tests.test_master import StandInMasterServer
+from resources.caterer import CatererViewSet
+from resources.delivery_fee import DeliveryFeeViewSet
+from resources.dish import DishViewSet
+
+
+class SnapshotStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = SnapshotStore(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_record_and_get(self):
+        self.store.record('http://master/caterers/1', SnapshotResponse(404, u'{"errors": []}'), 'a')
+        self.store.record('http://master/caterers', SnapshotResponse(200, u'{"data": []}'), 'a')
+
+        reloaded = SnapshotStore(self.root)
+        response = reloaded.get('http://master/caterers/1')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"errors": []})
+        self.assertEqual(reloaded.get('http://master/caterers').json(), {"data": []})
+        self.assertIsNone(reloaded.get('http://master/dishes'))
+
+    def test_identical_responses_are_stored_once(self):
+        for url in ('http://master/caterers', 'http://master/caterers?page=1'):
+            self.store.record(url, SnapshotResponse(200, u'{"data": []}'), 'a')
+        self.store.record('http://master/dishes', SnapshotResponse(200, u'{"data": [{}]}'), 'b')
+
+        objects = [name for _, _, names in os.walk(os.path.join(self.root, 'objects')) for name in names]
+        self.assertEqual(len(objects), 2)
+
+    def test_checks(self):
+        self.assertFalse(self.store.is_unchanged('http://master/caterers', 'a'))
+        self.store.record_check('http://master/caterers', 'a', True)
+        self.assertTrue(SnapshotStore(self.root).is_unchanged('http://master/caterers', 'a'))
+        self.assertFalse(self.store.is_unchanged('http://master/caterers', 'b'))
+        self.store.record_check('http://master/caterers', 'a', False)
+        self.assertFalse(self.store.is_unchanged('http://master/caterers', 'a'))
+
+    def test_definition_hash(self):
+        class FirstResource(object):
+            attributes = {"name": "Caterer"}
+            fake_attributes = {"name": StringFaker("company"), "count": IntFaker(1, 20)}
+
+        class SameResource(object):
+            attributes = {"name": "Caterer"}
+            fake_attributes = {"count": IntFaker(1, 20), "name": StringFaker("company")}
+
+        class OtherResource(object):
+            attributes = {"name": "Caterer"}
+            fake_attributes = {"name": StringFaker("company"), "count": IntFaker(1, 50)}
+
+        self.assertEqual(get_definition_hash(FirstResource), get_definition_hash(SameResource))
+        self.assertNotEqual(get_definition_hash(FirstResource), get_definition_hash(OtherResource))
+
+
+class SnapshotModeTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.server = StandInMasterServer()
+        self.origin = "http://127.0.0.1:{}".format(self.server.server_address[1])
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.root)
+
+    def run_contract_suite(self, mode, run, viewsets=(CatererViewSet, DishViewSet, DeliveryFeeViewSet)):
+        origin = self.origin
+
+        class ContractTests(base_tests.TestJsonResponses):
+            # A new token per run, so master responses aren't reused from the previous run.
+            auth_token = "snapshots-{}-{}".format(origin, run)
+            master_origin = origin
+
+        test_classes = [type(viewset.__name__ + 'ContractTests', (ContractTests,), {'viewset': viewset})
+                        for viewset in viewsets]
+        suite = unittest.TestSuite(unittest.defaultTestLoader.loadTestsFromTestCase(test_class)
+                                   for test_class in test_classes)
+        requests_made = len(self.server.requests)
+        with override_settings(MS_SNAPSHOT_MODE=mode, MS_SNAPSHOT_DIR=self.root):
+            result = unittest.TextTestRunner(stream=StringIO()).run(suite)
+        self.assertTrue(result.wasSuccessful(), result.errors + result.failures)
+        return result, len(self.server.requests) - requests_made
+
+    def test_offline(self):
+        result, requests_made = self.run_contract_suite('offline', 0)
+        # Nothing recorded yet: the detail and list checks are skipped.
+        self.assertEqual((len(result.skipped), requests_made), (6, 0))
+
+        result, requests_made = self.run_contract_suite('record', 1)
+        self.assertEqual((len(result.skipped), requests_made), (0, 9))
+
+        result, requests_made = self.run_contract_suite('offline', 2)
+        self.assertEqual((result.testsRun, len(result.skipped), requests_made), (9, 0, 0))
+
+    def test_incremental(self):
+        result, requests_made = self.run_contract_suite('incremental', 0)
+        self.assertEqual((len(result.skipped), requests_made), (0, 9))
+
+        result, requests_made = self.run_contract_suite('incremental', 1)
+        self.assertEqual((len(result.skipped), requests_made), (6, 0))
+
+        # A definition change that doesn't show in GET responses.
+        changed_caterer = type('CatererViewSet', (CatererViewSet,), {
+            'attribute_metadata': {'name': {'required': True}},
+        })
+        result, requests_made = self.run_contract_suite('incremental', 2,
+                                                        (changed_caterer, DishViewSet, DeliveryFeeViewSet))
+        # Only the caterer detail, its fallback and list are fetched again.
+        self.assertEqual((len(result.skipped), requests_made), (4, 3))
@@ -0,0 +1,67 @@
+import json
+
+from django.core.urlresolvers import reverse
+
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.fake import fake_attributes_cache
+from mock_server.json_api_builder import JsonAPIResourceTemplate
+from mock_server.response_cache import response_cache
+from resources.caterer import CatererResource
+
+
+class SparseFieldsetTests(MockServerBaseTestCase):
+    def setUp(self):
+        response_cache.clear()
+        fake_attributes_cache.clear()
+        self.detail_path = reverse("caterer-detail", args=(1,))
+        self.list_path = reverse("caterer-list") + "?length=20&page_size=20"
+
+    def test_detail(self):
+        data = self.get_json(self.client.get(self.detail_path + "?fields[caterers]=name,dishes"))['data']
+        full = self.get_json(self.client.get(self.detail_path))['data']
+        self.assertEqual(data['attributes'], {'name': full['attributes']['name']})
+        self.assertEqual(data['relationships'].keys(), ['dishes'])
+
+    def test_list(self):
+        data = self.get_json(self.client.get(self.list_path + "&fields[caterers]=numberOfDrivers"))['data']
+        full = self.get_json(self.client.get(self.list_path))['data']
+        self.assertEqual([resource_object['attributes'] for resource_object in data],
+                         [{'numberOfDrivers': resource_object['attributes']['numberOfDrivers']}
+                          for resource_object in full])
+        self.assertTrue(all('relationships' not in resource_object for resource_object in data))
+
+    def test_excluded_fakers_not_generated(self):
+        called = []
+        faker = CatererResource.fake_attributes['category']
+        original = faker.generate_values
+        faker.generate_values = lambda *args: called.append(args) or original(*args)
+        try:
+            self.client.get(self.list_path + "&fields[caterers]=name")
+            self.assertEqual(called, [])
+            self.client.get(self.list_path)
+            self.assertEqual(len(called), 1)
+        finally:
+            del faker.generate_values
+
+    def test_included(self):
+        path = self.detail_path + "?include=dishes&fields[dishes]=name&fields[caterers]=name"
+        response = self.get_json(self.client.get(path))
+        self.assertNotIn('relationships', response['data'])
+        self.assertEqual([resource_object['id'] for resource_object in response['included']], ['3', '4'])
+        for resource_object in response['included']:
+            self.assertEqual(resource_object['attributes'].keys(), ['name'])
+            self.assertNotIn('relationships', resource_object)
+
+    def test_header(self):
+        response = self.get_json(self.client.get(self.detail_path, HTTP_MS_FIELDS="caterers=description;dishes"))
+        self.assertEqual(response['data']['attributes'], {'description': 'desc'})
+
+    def test_streamed(self):
+        path = self.list_path + "&fields[caterers]=name&include=dishes.caterer"
+        response = self.client.get(path + "&stream=1")
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), self.get_json(self.client.get(path)))
+
+    def test_unknown_fields_share_a_template(self):
+        template = JsonAPIResourceTemplate.get("Caterer", "http://testserver", frozenset(["name", "dishes"]))
+        for fields in (["name", "dishes", "unknown"], ["name", "dishes", "other", "dishes"]):
+            self.assertIs(JsonAPIResourceTemplate.get("Caterer", "http://testserver", frozenset(fields)), template)
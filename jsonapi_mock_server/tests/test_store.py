@@ -0,0 +1,172 @@
+import json
+import unittest
+
+from django.core.urlresolvers import reverse
+from django.test import override_settings
+
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server import store as store_module
+from mock_server.store import Collection, store
+from resources.caterer import CatererResource
+
+
+class IndexedCatererResource(CatererResource):
+    indexes = ('category',)
+
+
+class CollectionTests(unittest.TestCase):
+    def test_ids(self):
+        collection = Collection('Caterer', 10)
+        for resource_id in (1, 4, 5):
+            self.assertTrue(collection.delete(resource_id))
+        self.assertFalse(collection.delete(4))
+        self.assertEqual(collection.create({"name": "new"}), '11')
+        self.assertEqual(collection.create({"name": "new"}, resource_id='abc'), 'abc')
+        self.assertIsNone(collection.create({"name": "new"}, resource_id=2))
+
+        self.assertEqual(len(collection), 9)
+        self.assertEqual(collection.get_ids(0, 3), ['2', '3', '6'])
+        self.assertEqual(collection.get_ids(5, 3), ['9', '10', '11'])
+        self.assertEqual(collection.get_ids(7, 3), ['11', 'abc'])
+        self.assertEqual(collection.get_ids(8, 3), ['abc'])
+        self.assertNotIn('4', collection)
+
+        self.assertEqual(collection.create({}, resource_id=4), '4')
+        self.assertEqual(collection.get_ids(0, 3), ['2', '3', '4'])
+
+    def test_filter(self):
+        collection = Collection('Caterer', 50)
+        collection.resource_instance = IndexedCatererResource()
+        scanned = collection.filter_ids({'category': ['a'], 'isActive': ['true', 'null']})
+        self.assertTrue(0 < len(scanned) < 50)
+
+        collection.delete(scanned[0])
+        collection.update(scanned[1], {"category": "b"})
+        collection.create({"category": "a", "isActive": True}, resource_id='new')
+        expected = scanned[2:] + ['new']
+        self.assertEqual(collection.filter_ids({'category': ['a'], 'isActive': ['true', 'null']}), expected)
+        self.assertEqual(collection.filter_ids({'category': ['a'], 'id': [expected[0], 1000]}), expected[:1])
+        self.assertEqual(collection.filter_ids({'description': ['desc']}), collection.get_ids(0, 50))
+
+    def test_filter_with_hooks(self):
+        collection = Collection('Caterer', 50)
+        collection.resource_instance = IndexedCatererResource()
+        collection.create({}, resource_id='new')
+        for seed in (None, 42):
+            matching = collection.filter_ids({'category': ['a']}, {'seed': seed})
+            values = collection.resource_instance.get_seeded_fake_attribute_values('category', matching, seed)
+            self.assertEqual(set(values), {'a'})
+            self.assertTrue(0 < len(matching) < 50)
+        self.assertNotEqual(collection.filter_ids({'category': ['a']}),
+                            collection.filter_ids({'category': ['a']}, {'seed': 42}))
+
+        self.assertEqual(collection.filter_ids({'category': ['a']}, {'fake': False}), [])
+        self.assertEqual(collection.filter_ids({'name': ['Caterer']}, {'fake': False}), collection.get_ids(0, 51))
+        self.assertEqual(collection.filter_ids({'category': ['c']}, {'attributes': {'category': 'c'}}),
+                         collection.get_ids(0, 51))
+
+    def test_indexes_are_bounded(self):
+        collection = Collection('Caterer', 50)
+        collection.resource_instance = IndexedCatererResource()
+        indexes = store_module._indexes
+        maxsize = indexes.maxsize
+        indexes.clear()
+        indexes.maxsize = 2
+        try:
+            for seed in range(5):
+                collection.filter_ids({'category': ['a']}, {'seed': seed})
+            self.assertEqual(len(indexes), 2)
+        finally:
+            indexes.maxsize = maxsize
+            indexes.clear()
+
+
+class StatefulViewTests(MockServerBaseTestCase):
+    def setUp(self):
+        self.settings = override_settings(MS_STATEFUL=True)
+        self.settings.enable()
+        store.clear()
+
+    def tearDown(self):
+        self.settings.disable()
+        store.clear()
+
+    def send(self, method, path, data, **extra):
+        return getattr(self.client, method)(path, data=json.dumps({"data": data}),
+                                            content_type="application/vnd.api+json", **extra)
+
+    def test_writes_are_read_back(self):
+        list_path = reverse("caterer-list")
+        response = self.send('post', list_path, {"type": "Caterer", "attributes": {"name": "New"},
+                                                 "relationships": {"dishes": {"data": [{"type": "Dish", "id": "7"}]}}})
+        self.assertEqual(response.status_code, 201)
+        created = self.get_json(response)['data']
+        self.assertEqual((created['id'], created['attributes']['name']), ('11', 'New'))
+
+        detail_path = reverse("caterer-detail", args=(11,))
+        detail = self.get_json(self.client.get(detail_path + "?include=dishes"))
+        self.assertEqual(detail['data']['attributes'], created['attributes'])
+        self.assertEqual(detail['data']['relationships']['dishes']['data'], [{"type": "Dish", "id": "7"}])
+        self.assertEqual([dish['id'] for dish in detail['included']], ['7'])
+
+        response = self.send('patch', detail_path, {"type": "Caterer", "id": "11", "attributes": {"name": "Renamed"}})
+        self.assertEqual(self.get_json(response)['data']['attributes']['name'], 'Renamed')
+        self.assertEqual(self.get_json(self.client.get(detail_path))['data']['attributes']['name'], 'Renamed')
+
+        self.assertEqual(self.client.delete(reverse("caterer-detail", args=(3,))).status_code, 204)
+        self.assertEqual(self.client.get(reverse("caterer-detail", args=(3,))).status_code, 404)
+        self.assertEqual(self.client.delete(reverse("caterer-detail", args=(3,))).status_code, 404)
+
+        listed = self.get_json(self.client.get(list_path + "?page_size=20"))
+        self.assertEqual([resource['id'] for resource in listed['data']],
+                         ['1', '2', '4', '5', '6', '7', '8', '9', '10', '11'])
+        self.assertEqual(listed['data'][-1]['attributes']['name'], 'Renamed')
+        self.assertEqual(listed['meta']['pagination']['count'], 10)
+
+    def test_seeded_objects_match_stateless_ones(self):
+        path = reverse("caterer-detail", args=(2,)) + "?include=dishes"
+        stateful = self.client.get(path).content
+        with override_settings(MS_STATEFUL=False):
+            self.assertEqual(json.loads(stateful), json.loads(self.client.get(path).content))
+
+    def test_includes_read_the_store(self):
+        self.send('patch', reverse("dish-detail", args=(3,)), {"type": "Dish", "id": "3", "attributes": {"name": "Soup"}})
+        self.client.delete(reverse("dish-detail", args=(4,)))
+
+        included = self.get_json(self.client.get(reverse("caterer-detail", args=(1,)) + "?include=dishes"))['included']
+        self.assertEqual([(dish['id'], dish['attributes']['name']) for dish in included], [('3', 'Soup')])
+
+    def test_filters(self):
+        path = reverse("caterer-list")
+        self.send('patch', reverse("caterer-detail", args=(2,)), {"type": "Caterer", "id": "2",
+                                                                  "attributes": {"name": "Found"}})
+        listed = self.get_json(self.client.get(path + "?filter[name]=Found"))
+        self.assertEqual([resource['id'] for resource in listed['data']], ['2'])
+        listed = self.get_json(self.client.get(path + "?filter[id]=2,5,99"))
+        self.assertEqual([resource['id'] for resource in listed['data']], ['2', '5'])
+
+    def test_filters_with_seed(self):
+        path = reverse("caterer-list") + "?page_size=10"
+        for seed_query in ("", "&seed=42"):
+            listed = self.get_json(self.client.get(path + seed_query))['data']
+            filtered = self.get_json(self.client.get(path + seed_query + "&filter[isActive]=true"))['data']
+            self.assertEqual([resource['id'] for resource in filtered],
+                             [resource['id'] for resource in listed if resource['attributes']['isActive'] is True])
+
+    def test_namespaces(self):
+        self.client.delete(reverse("caterer-detail", args=(1,)), HTTP_MS_NAMESPACE='first')
+        self.assertEqual(self.client.get(reverse("caterer-detail", args=(1,)),
+                                         HTTP_MS_NAMESPACE='first').status_code, 404)
+        self.assertEqual(self.client.get(reverse("caterer-detail", args=(1,)) + "?namespace=first").status_code, 404)
+        self.assertEqual(self.client.get(reverse("caterer-detail", args=(1,)),
+                                         HTTP_MS_NAMESPACE='second').status_code, 200)
+        self.assertEqual(self.client.get(reverse("caterer-detail", args=(1,))).status_code, 200)
+        self.assertEqual(len(store), 3)
+
+    def test_namespaces_are_bounded(self):
+        bounded_store = type(store)(max_namespaces=2)
+        first = bounded_store.get_namespace('first')
+        bounded_store.get_namespace('second')
+        bounded_store.get_namespace('third')
+        self.assertEqual(len(bounded_store), 2)
+        self.assertIsNot(bounded_store.get_namespace('first'), first)
@@ -0,0 +1,81 @@
+import copy
+import unittest
+
+from mock_server import base_tests
+from mock_server.base_tests import get_shape, get_structure, get_structure_fingerprint, shapes_match
+
+
+def resource_object(id, name="Caterer", relationships=None):
+    return {
+        "type": "caterers",
+        "id": id,
+        "attributes": {"name": name, "tags": ["a", "b"]},
+        "relationships": relationships or {"dishes": {"data": [{"type": "dishes", "id": "1"}]}},
+    }
+
+
+class StructureFingerprintTests(unittest.TestCase):
+    def test_values_and_lengths_are_ignored(self):
+        master = {"data": [resource_object("1")], "meta": {"count": 1}}
+        mock = {"data": [resource_object(str(x), name="Other") for x in range(10)], "meta": {"count": 10}}
+        mock["data"][3]["attributes"]["tags"] = []
+        self.assertEqual(get_structure_fingerprint(master), get_structure_fingerprint(mock))
+
+    def test_types_are_compared(self):
+        master = {"data": resource_object("1"), "meta": {"count": 1}}
+        mock = copy.deepcopy(master)
+        mock["meta"]["count"] = "1"
+        self.assertNotEqual(get_structure_fingerprint(master), get_structure_fingerprint(mock))
+        self.assertFalse(shapes_match(get_shape(master), get_shape(mock)))
+
+    def test_null_matches_any_type(self):
+        master = {"data": [resource_object("1")]}
+        mock = {"data": [resource_object("1"), resource_object("2", name=None)]}
+        self.assertTrue(shapes_match(get_shape(master), get_shape(mock)))
+        mock["data"][0]["attributes"]["name"] = 1
+        self.assertFalse(shapes_match(get_shape(master), get_shape(mock)))
+
+    def test_all_items_are_compared(self):
+        master = {"data": [resource_object(str(x)) for x in range(10)]}
+        mock = copy.deepcopy(master)
+        del mock["data"][7]["attributes"]["name"]
+        self.assertNotEqual(get_structure_fingerprint(master), get_structure_fingerprint(mock))
+
+    def test_included(self):
+        master = {"data": resource_object("1"), "included": [resource_object("2")]}
+        mock = copy.deepcopy(master)
+        mock["included"].append({"type": "dishes", "id": "3"})
+        self.assertNotEqual(get_structure_fingerprint(master), get_structure_fingerprint(mock))
+
+    def test_structure(self):
+        document = {"data": [resource_object("1"), resource_object("2"), {"type": "caterers", "id": "3"}]}
+        structure = get_structure(document)
+        self.assertEqual(len(structure["data"]), 2)
+        self.assertIn({"type": "string", "id": "string"}, structure["data"])
+        self.assertEqual(document["data"][0]["id"], "1")
+
+
+class AssertJsonStructureEqualTests(unittest.TestCase):
+    def setUp(self):
+        self.test = base_tests.TestJsonResponses('test_faker')
+        self.test.master_url, self.test.path = "http://master/caterers", "/caterers"
+
+    def test_equal(self):
+        self.test.assertJsonStructureEqual({"data": [resource_object("1")]},
+                                           {"data": [resource_object("1"), resource_object("2")]})
+
+    def test_null(self):
+        self.test.assertJsonStructureEqual({"data": [resource_object("1")]},
+                                           {"data": [resource_object("1", name=None)]})
+
+    def test_different_type(self):
+        with self.assertRaises(AssertionError) as context:
+            self.test.assertJsonStructureEqual({"data": [resource_object("1")]},
+                                               {"data": [resource_object(1)]})
+        self.assertIn("number", str(context.exception))
+
+    def test_different(self):
+        mock = {"data": [resource_object("1"), resource_object("2", relationships={"dishes": {}})]}
+        with self.assertRaises(AssertionError) as context:
+            self.test.assertJsonStructureEqual({"data": [resource_object("1")]}, mock)
+        self.assertIn("diff:", str(context.exception))
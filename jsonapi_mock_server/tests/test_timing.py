@@ -0,0 +1,71 @@
+import logging
+
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+
+from mock_server.base_tests import MockServerBaseTestCase
+from mock_server.response_cache import response_cache
+from mock_server.timing import RequestTimer, logger, no_phase, phase
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super(RecordingHandler, self).__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def parse_server_timing(header):
+    phases = [metric.strip().split(';dur=') for metric in header.split(',')]
+    return [(name, float(duration)) for name, duration in phases]
+
+
+class ServerTimingTests(MockServerBaseTestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.path = reverse("caterer-list") + "?include=dishes&length=20"
+
+    def test_disabled(self):
+        response = self.client.get(self.path)
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertIs(phase('fake'), no_phase)
+
+    @override_settings(MS_SERVER_TIMING=True)
+    def test_header(self):
+        phases = parse_server_timing(self.client.get(self.path)['Server-Timing'])
+        names = [name for name, _ in phases]
+        for name in ('hooks', 'lookup', 'fake', 'include', 'encode'):
+            self.assertIn(name, names)
+        self.assertEqual(names[-1], 'total')
+        self.assertLessEqual(sum(duration for name, duration in phases[:-1]), phases[-1][1] + 0.1)
+
+    @override_settings(MS_SERVER_TIMING=True)
+    def test_other_actions(self):
+        detail_path = reverse("caterer-detail", args=(1,))
+        for response in (self.client.get(detail_path), self.client.delete(detail_path),
+                         self.client.get(self.path + "&stream=1")):
+            self.assertTrue(response.has_header('Server-Timing'))
+
+    @override_settings(MS_SLOW_REQUEST_THRESHOLD=0)
+    def test_slow_request_log(self):
+        handler = RecordingHandler()
+        logger.addHandler(handler)
+        try:
+            response = self.client.get(self.path)
+        finally:
+            logger.removeHandler(handler)
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertTrue(handler.messages[0].startswith('Slow request: GET {} took'.format(self.path)))
+        self.assertIn('include', handler.messages[0])
+
+    def test_nested_phases_are_exclusive(self):
+        timer = RequestTimer()
+        timer.enter('include')
+        timer.enter('fake')
+        timer.exit()
+        timer.exit()
+        total = timer.total
+        self.assertEqual(timer.order, ['include', 'fake'])
+        self.assertLessEqual(sum(timer.durations.values()), total)
@@ -0,0 +1,134 @@
+import functools
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger('jsonapi_mock_server')
+
+_local = threading.local()
+
+
+class RequestTimer(object):
+    """
+    Accumulates the time a request spends in each phase. Phases are exclusive:
+    time spent in a phase entered from another one (e.g. generating fake data
+    while resolving includes) only counts towards the inner phase, so the phases
+    add up to at most the total.
+    """
+    def __init__(self):
+        self.start = time.time()
+        self.durations = {}
+        self.order = []
+        self._stack = []
+        self._resumed = self.start
+
+    def enter(self, name):
+        now = time.time()
+        if self._stack:
+            self._add(self._stack[-1], now - self._resumed)
+        self._stack.append(name)
+        self._resumed = now
+
+    def exit(self):
+        now = time.time()
+        self._add(self._stack.pop(), now - self._resumed)
+        self._resumed = now
+
+    def _add(self, name, seconds):
+        if name not in self.durations:
+            self.durations[name] = 0.0
+            self.order.append(name)
+        self.durations[name] += seconds
+
+    @property
+    def total(self):
+        return time.time() - self.start
+
+    def get_phases(self, total):
+        """Returns the (phase, milliseconds) of each phase, then `total`, in order."""
+        return [(name, self.durations[name] * 1000) for name in self.order] + [('total', total * 1000)]
+
+    def to_header(self, total):
+        return ', '.join('{};dur={:.2f}'.format(name, ms) for name, ms in self.get_phases(total))
+
+
+class Phase(object):
+    __slots__ = ('timer', 'name')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer.enter(self.name)
+
+    def __exit__(self, *exc_info):
+        self.timer.exit()
+
+
+class NoPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+no_phase = NoPhase()
+
+
+def phase(name):
+    """
+    Returns a context manager timing the `name` phase of the current request, or one
+    that does nothing if the request isn't timed.
+    """
+    timer = getattr(_local, 'timer', None)
+    if timer is None:
+        return no_phase
+    return Phase(timer, name)
+
+
+def server_timing_enabled():
+    return getattr(settings, 'MS_SERVER_TIMING', False)
+
+
+def get_slow_request_threshold():
+    """Returns the duration in seconds above which requests are logged, or None."""
+    threshold = getattr(settings, 'MS_SLOW_REQUEST_THRESHOLD', None)
+    return None if threshold is None else threshold / 1000.0
+
+
+def time_action(action):
+    """
+    Times the phases of a viewset action. With `MS_SERVER_TIMING`, they are sent in
+    a `Server-Timing` header; requests slower than `MS_SLOW_REQUEST_THRESHOLD`
+    milliseconds are logged with them.
+    """
+    @functools.wraps(action)
+    def timed_action(view, request, *args, **kwargs):
+        send_header = server_timing_enabled()
+        threshold = get_slow_request_threshold()
+        if not send_header and threshold is None:
+            return action(view, request, *args, **kwargs)
+
+        timer = _local.timer = RequestTimer()
+        try:
+            response = action(view, request, *args, **kwargs)
+        finally:
+            _local.timer = None
+
+        # Streamed content is generated after the action returns, so only the
+        # phases up to the first byte are counted for streamed responses.
+        total = timer.total
+        if send_header:
+            response['Server-Timing'] = timer.to_header(total)
+        if threshold is not None and total >= threshold:
+            logger.warning("Slow request: %s %s took %.1fms (%s)", request.method, request.get_full_path(),
+                           total * 1000, ', '.join('{} {:.1f}ms'.format(name, ms)
+                                                   for name, ms in timer.get_phases(total)[:-1]))
+        return response
+    return timed_action
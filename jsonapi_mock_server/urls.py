@@ -0,0 +1,7 @@
+from django.conf.urls import url
+
+from metrics import metrics_view
+
+urlpatterns = [
+    url(r'^__ms/metrics$', metrics_view, name='ms-metrics'),
+]
@@ -1,6 +1,9 @@
-import importlib
+import base64
+import copy
 import inflection
+import itertools
 import sys
+import time
 
 
 def upper_camelize_resource(resource_type):
@@ -12,9 +15,45 @@ def camelize_resource(resource_type):
 def underscore_resource(resource_type):
     return inflection.underscore(inflection.pluralize(resource_type))
 
+class FrozenDict(dict):
+    """A dict that raises TypeError on any change. Copies are plain dicts."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("{} is read-only".format(type(self).__name__))
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self), memo)
+
 def get_instance_of_resource(resource_type):
-    resource_module_str = inflection.underscore(resource_type)
-    module = importlib.import_module('resources.'+resource_module_str)
-    class_ = getattr(module, resource_type+"Resource")
-    instance = class_()
-    return instance
+    from registry import resource_registry
+    return resource_registry.get(resource_type)
+
+def encode_cursor(offset):
+    return base64.urlsafe_b64encode(str(offset)).rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        offset = int(base64.urlsafe_b64decode(str(cursor) + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError):
+        return 0
+    return max(offset, 0)
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def cooperative_yield():
+    """
+    Lets other requests run. When serving cooperatively (see evented.py), time.sleep
+    is patched to switch to other greenlets; otherwise this only releases the GIL.
+    """
+    time.sleep(0)
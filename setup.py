@@ -4,7 +4,7 @@ install_requires = [
     'django >=1.7, <2',
     'django-cors-headers',
     'djangorestframework',
-    'faker',
+    'faker >=0.8.0',
     'inflection',
     'jsondiff',
     'requests',
@@ -19,6 +19,11 @@ setup(
     author='ZeroCater',
     packages=find_packages(),
     install_requires=install_requires,
+    extras_require={
+        'brotli': ['brotli'],
+        'gevent': ['gevent'],
+        'numpy': ['numpy'],
+    },
     licence='MIT',
     url='https://github.com/ZeroCater/jsonapi-mock-server',
     keywords='jsonapi mock server',